@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+docai-web2md 离线基准测试
+
+不需要网络：HTML/PDF 语料由 corpus.py 确定性生成，Jina / Firecrawl / 源站由
+stub_server.py 的本地替身服务器提供（延迟与失败率可配置）。每个用例在独立子进程中
+运行，报告吞吐、p50/p95 延迟和峰值 RSS，并与保存的基线比较，退化超过容差时以
+非零状态退出。
+
+用法:
+    python benchmarks/bench_convert.py                      # 运行全部用例并与基线比较
+    python benchmarks/bench_convert.py --cases 'to_markdown*' --quick
+    python benchmarks/bench_convert.py --save-baseline      # 更新基线
+"""
+
+import argparse
+import fnmatch
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+TOOLS_DIR = BENCH_DIR.parent / "skills" / "docai-web2md" / "tools"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(TOOLS_DIR))
+
+# 比较基线时，低于这些绝对差值的变化视为噪声
+LATENCY_FLOOR_MS = 5.0
+RSS_FLOOR_MB = 10.0
+
+
+def _html_case(method, kind, iterations):
+    def run(quick):
+        import corpus
+        from convert import WebToMarkdown
+
+        html = corpus.HTML_GENERATORS[kind](seed=1)
+        converter = WebToMarkdown()
+        fn = getattr(converter, method)
+        return _timed(lambda: fn(html), _iterations(iterations, quick))
+
+    return run
+
+
+def _pdf_case(name, iterations):
+    def run(quick):
+        import corpus
+        from convert import WebToMarkdown
+
+        data = corpus.pdf_bytes(corpus.PDF_SIZES[name])
+        with WebToMarkdown() as converter:
+            return _timed(
+                lambda: converter._process_pdf(data), _iterations(iterations, quick)
+            )
+
+    return run
+
+
+def _stub_converter(server, **kwargs):
+    """指向替身服务器的转换器（不启动浏览器）"""
+    from convert import WebToMarkdown
+
+    converter = WebToMarkdown(**kwargs)
+    converter.JINA_BASE_URLS = (f"{server.url}/jina",)
+    converter.FIRECRAWL_URL = f"{server.url}/firecrawl"
+    converter.firecrawl_api_key = "benchmark"
+    converter._try_playwright = lambda url, pure_text: None
+    return converter
+
+
+# 替身服务器的默认后端特征：Jina 较慢但稳定，Firecrawl 更慢且偶尔失败
+STUB_LATENCY = {"origin": 0.02, "jina": 0.06, "firecrawl": 0.1}
+STUB_FAILURES = {"firecrawl": 0.2}
+
+
+def _parallel_convert_case(iterations):
+    def run(quick):
+        from stub_server import StubServer
+
+        with (
+            StubServer(STUB_LATENCY, STUB_FAILURES) as server,
+            _stub_converter(server) as converter,
+        ):
+            kinds = ["blog", "docs", "wechat"]
+            urls = iter(
+                f"{server.url}/site/{kinds[i % 3]}-{i}.html" for i in range(10**6)
+            )
+            return _timed(
+                lambda: converter._parallel_convert(next(urls), False),
+                _iterations(iterations, quick),
+            )
+
+    return run
+
+
+def _batch_case(urls, jobs, cpu_offload=False, rate_limit=None):
+    """批量转换；rate_limit 为源站每秒请求数，超过时替身服务器返回 429"""
+
+    def run(quick):
+        from stub_server import StubServer
+
+        count = max(8, urls // 4) if quick else urls
+        origin_limit = {"origin": rate_limit} if rate_limit else None
+        with StubServer(STUB_LATENCY, STUB_FAILURES, rate_limit=origin_limit) as server:
+            kinds = ["blog", "docs", "wechat"]
+            batch = [
+                f"{server.url}/site/{kinds[i % 3]}-{i % 16}.html" for i in range(count)
+            ]
+            for url in set(batch):  # 预先生成语料，不计入转换耗时
+                server.content(url.rsplit("/", 1)[-1])
+            with _stub_converter(server, cpu_offload=cpu_offload) as converter:
+                started = time.perf_counter()
+                records = list(
+                    converter.convert_many(
+                        batch, use_python=True, max_workers=jobs, per_host=jobs
+                    )
+                )
+                wall = time.perf_counter() - started
+        failed = sum(not r["ok"] for r in records)
+        if failed:
+            raise RuntimeError(f"批量转换中有 {failed} 个失败")
+        return [r["elapsed"] for r in records], wall
+
+    return run
+
+
+def _startup_case(args, iterations):
+    """冷启动：每次在新的解释器中运行，以 -X importtime 统计 convert 模块的导入耗时
+
+    args 为 None 时只导入模块，否则以这些参数运行 convert.py（如 --help），记录总耗时。
+    """
+
+    def run(quick):
+        samples = []
+        started = time.perf_counter()
+        for _ in range(_iterations(iterations, quick)):
+            if args is None:
+                command = [sys.executable, "-X", "importtime", "-c", "import convert"]
+            else:
+                command = [sys.executable, str(TOOLS_DIR / "convert.py"), *args]
+            t = time.perf_counter()
+            completed = subprocess.run(
+                command, cwd=TOOLS_DIR, capture_output=True, text=True, check=True
+            )
+            elapsed = time.perf_counter() - t
+            if args is None:
+                elapsed = _import_time(completed.stderr, "convert")
+            samples.append(elapsed)
+        return samples, time.perf_counter() - started
+
+    return run
+
+
+def _import_time(importtime_log, module):
+    """从 -X importtime 的输出中取出模块的累计导入耗时（秒）"""
+    for line in importtime_log.splitlines():
+        fields = [field.strip() for field in line.split("|")]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1]) / 1e6
+    raise RuntimeError(f"-X importtime 输出中没有 {module}")
+
+
+CASES = {
+    "startup[import]": _startup_case(None, 10),
+    "startup[--help]": _startup_case(["--help"], 10),
+    **{
+        f"to_markdown[{kind}]": _html_case("_to_markdown", kind, n)
+        for kind, n in [("wechat", 20), ("blog", 30), ("docs", 10), ("spa", 3)]
+    },
+    **{
+        f"to_plain_text[{kind}]": _html_case("_to_plain_text", kind, n)
+        for kind, n in [("wechat", 20), ("blog", 30), ("docs", 10), ("spa", 3)]
+    },
+    "process_pdf[small]": _pdf_case("pdf-small", 30),
+    "process_pdf[large]": _pdf_case("pdf-large", 3),
+    "parallel_convert": _parallel_convert_case(30),
+    "batch[64x8]": _batch_case(64, 8),
+    "batch[64x8,offload]": _batch_case(64, 8, cpu_offload=True),
+    "batch[64x8,429]": _batch_case(64, 8, rate_limit=4),
+}
+
+
+def _iterations(iterations, quick):
+    return max(2, iterations // 5) if quick else iterations
+
+
+def _timed(fn, iterations):
+    """预热一次后计时运行 iterations 次，返回 (各次耗时秒数, 总耗时)"""
+    fn()
+    samples = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return samples, time.perf_counter() - started
+
+
+def _percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(p * len(ordered)) - 1)]
+
+
+def _peak_rss_mb(who=resource.RUSAGE_SELF):
+    """峰值 RSS（MB）：RUSAGE_SELF 为用例进程本身；RUSAGE_CHILDREN 为已退出的子进程
+    中峰值最大的一个（进程池子进程、启动耗时用例的子进程），不是各子进程之和
+    """
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(name, quick=False):
+    """在当前进程中运行单个用例，返回指标字典"""
+    samples, wall = CASES[name](quick)
+    return {
+        "case": name,
+        "iterations": len(samples),
+        "throughput": round(len(samples) / wall, 2),
+        "p50_ms": round(_percentile(samples, 0.5) * 1000, 2),
+        "p95_ms": round(_percentile(samples, 0.95) * 1000, 2),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "child_rss_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    }
+
+
+def _run_isolated(name, quick):
+    """在独立子进程中运行用例，使峰值 RSS 只反映该用例"""
+    command = [sys.executable, __file__, "--run-case", name]
+    if quick:
+        command.append("--quick")
+    completed = subprocess.run(command, capture_output=True, text=True, check=False)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{name} 失败:\n{completed.stderr.strip()}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """与基线比较，返回退化描述列表"""
+    regressions = []
+    for result in results:
+        base = baseline.get(result["case"])
+        if base is None:
+            continue
+        for metric, floor in (
+            ("p50_ms", LATENCY_FLOOR_MS),
+            ("p95_ms", LATENCY_FLOOR_MS),
+            ("peak_rss_mb", RSS_FLOOR_MB),
+            ("child_rss_mb", RSS_FLOOR_MB),
+        ):
+            current, previous = result.get(metric), base.get(metric)
+            if current is None or not previous:
+                continue  # 基线中没有该指标（如早期基线没有 child_rss_mb）
+            if current > previous * (1 + tolerance) and current - previous > floor:
+                regressions.append(
+                    f"{result['case']} {metric}: {previous} -> {current} "
+                    f"(+{(current / previous - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def _print_table(results, baseline):
+    header = (
+        f"{'case':<26}{'n':>5}{'ops/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+        f"{'RSS MB':>9}{'child MB':>10}{'Δp50':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        base = baseline.get(r["case"])
+        delta = ""
+        if base and base["p50_ms"]:
+            delta = f"{(r['p50_ms'] / base['p50_ms'] - 1) * 100:+.0f}%"
+        print(
+            f"{r['case']:<26}{r['iterations']:>5}{r['throughput']:>10}"
+            f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['peak_rss_mb']:>9}"
+            f"{r.get('child_rss_mb', ''):>10}{delta:>8}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="docai-web2md 离线基准测试")
+    parser.add_argument("--cases", default="*", help="用例名通配符（默认全部）")
+    parser.add_argument("--quick", action="store_true", help="减少迭代次数（冒烟）")
+    parser.add_argument(
+        "--baseline",
+        default=str(DEFAULT_BASELINE),
+        help="基线文件（默认 benchmarks/baseline.json）",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="把本次结果写入基线文件"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.3,
+        help="允许的退化比例（默认 0.3，即 30%%）",
+    )
+    parser.add_argument("--json", help="把本次结果写入 JSON 文件")
+    parser.add_argument("--list", action="store_true", help="列出所有用例")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(run_case(args.run_case, args.quick)))
+        return 0
+    if args.list:
+        print("\n".join(CASES))
+        return 0
+
+    names = [name for name in CASES if fnmatch.fnmatchcase(name, args.cases)]
+    if not names:
+        parser.error(f"没有匹配 {args.cases!r} 的用例")
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {r["case"]: r for r in json.load(f)["results"]}
+
+    results = []
+    for name in names:
+        print(f"运行 {name} ...", file=sys.stderr, flush=True)
+        results.append(_run_isolated(name, args.quick))
+    _print_table(results, baseline)
+
+    payload = {"python": sys.version.split()[0], "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+    if args.save_baseline:
+        # 只更新本次运行的用例，保留基线中的其余用例
+        baseline.update((r["case"], r) for r in results)
+        payload["results"] = [baseline[name] for name in CASES if name in baseline]
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+            f.write("\n")
+        print(f"\n基线已保存到 {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions and args.quick:
+        # 快速模式迭代次数少、与基线不可比，只提示不判定失败
+        print("\n快速模式结果仅供参考，未与基线判定退化")
+        return 0
+    if regressions:
+        print(f"\n性能退化（超过基线 {args.tolerance:.0%}）:")
+        for line in regressions:
+            print(f"  REGRESSION {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+"""
+基准测试语料
+
+按真实页面的结构确定性地生成 HTML 与 PDF（同一 seed 生成的内容完全相同），
+不依赖网络，也不在仓库中保存第三方页面：
+
+- wechat: 微信公众号文章（#js_content、大量 <section>/<span style>、懒加载图片）
+- blog:   博客文章（<article>、代码块、导航/侧栏/页脚、广告与分享按钮）
+- docs:   文档站点（数百个侧栏链接、表格、代码、嵌套列表）
+- spa:    SPA 页面转储（数 MB，深层嵌套的 div、内联 JSON 状态、重复卡片）
+- pdf-small / pdf-large: 3 页与 300 页的 PDF
+"""
+
+import json
+import random
+
+_WORDS = (
+    "context engineering agent model token prompt memory retrieval latency "
+    "throughput browser parser markdown document pipeline cache network "
+    "render layout schema vector index query result stream batch worker "
+    "process thread socket request response header payload encoding"
+).split()
+
+_HANZI = "上下文工程智能体模型提示记忆检索延迟吞吐浏览器解析文档流水线缓存网络渲染布局"
+
+
+def _sentence(rng, words=12, chinese=False):
+    if chinese:
+        return "".join(rng.choice(_HANZI) for _ in range(words * 2)) + "。"
+    text = " ".join(rng.choice(_WORDS) for _ in range(words))
+    return text.capitalize() + "."
+
+
+def _paragraph(rng, sentences=4, chinese=False):
+    return " ".join(
+        _sentence(rng, rng.randint(8, 20), chinese) for _ in range(sentences)
+    )
+
+
+def wechat_html(seed=0, sections=120):
+    rng = random.Random(seed)
+    parts = []
+    for i in range(sections):
+        style = f"font-size: {rng.choice([14, 15, 16])}px; color: #{rng.randrange(16**6):06x};"
+        parts.append(
+            f'<section style="{style}"><p><span style="{style}">'
+            f"{_paragraph(rng, 3, chinese=True)}</span></p>"
+        )
+        if i % 7 == 0:
+            parts.append(
+                f'<p><img data-src="https://mmbiz.qpic.cn/{seed}/{i}.png" '
+                f'class="rich_pages wxw-img" style="width: 100%;"></p>'
+            )
+        if i % 11 == 0:
+            parts.append(f"<h2><strong>{_sentence(rng, 4, chinese=True)}</strong></h2>")
+        parts.append("<p><br></p></section>")
+    return (
+        "<html><head><title>公众号文章</title>"
+        '<script>var msg_title = "x";</script></head><body>'
+        '<div id="js_article"><h1 class="rich_media_title" id="activity-name">'
+        f"{_sentence(rng, 6, chinese=True)}</h1>"
+        '<div class="rich_media_meta_list"><span>作者</span></div>'
+        '<div class="rich_media_content" id="js_content">'
+        + "".join(parts)
+        + '</div><div class="reward_area"><button>赞赏</button></div>'
+        '<div class="qr_code_pc">二维码</div></div></body></html>'
+    )
+
+
+def blog_html(seed=0, paragraphs=80):
+    rng = random.Random(seed)
+    body = []
+    for i in range(paragraphs):
+        if i % 10 == 0:
+            body.append(f"<h2>{_sentence(rng, 5)}</h2>")
+        body.append(f"<p>{_paragraph(rng)} <a href='/post/{i}'>link</a></p>")
+        if i % 9 == 4:
+            code = "\n".join(
+                f"    result_{j} = process(item_{j}, retries={j})" for j in range(12)
+            )
+            body.append(f"<pre><code class='language-python'>{code}</code></pre>")
+        if i % 13 == 6:
+            body.append(
+                "<div class='advertisement ad-banner'><a href='#'>Sponsored</a></div>"
+            )
+        if i % 17 == 8:
+            items = "".join(f"<li>{_sentence(rng, 6)}</li>" for _ in range(5))
+            body.append(f"<ul>{items}</ul>")
+    nav = "".join(f"<li><a href='/c/{i}'>Category {i}</a></li>" for i in range(30))
+    return (
+        "<html><head><title>Blog</title><style>body{margin:0}</style></head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header>"
+        f"<main><article><h1>{_sentence(rng, 7)}</h1>"
+        + "".join(body)
+        + "<div class='share-buttons'><button>Share</button></div>"
+        "</article></main>"
+        f"<aside class='sidebar'>{_paragraph(rng, 6)}</aside>"
+        "<footer><p>Copyright</p></footer>"
+        "<script>window.analytics = {};</script></body></html>"
+    )
+
+
+def docs_html(seed=0, sections=40):
+    rng = random.Random(seed)
+    sidebar = "".join(
+        f"<li><a href='/docs/{i}'>{rng.choice(_WORDS)}::{rng.choice(_WORDS)}</a></li>"
+        for i in range(600)
+    )
+    body = []
+    for i in range(sections):
+        body.append(f"<h2 id='s{i}'>{_sentence(rng, 4)}</h2><p>{_paragraph(rng)}</p>")
+        rows = "".join(
+            f"<tr><td><code>{rng.choice(_WORDS)}_{j}</code></td>"
+            f"<td>{_sentence(rng, 8)}</td></tr>"
+            for j in range(8)
+        )
+        body.append(
+            f"<table><thead><tr><th>Name</th><th>Description</th></tr>"
+            f"</thead><tbody>{rows}</tbody></table>"
+        )
+        nested = "".join(
+            f"<li>{_sentence(rng, 5)}<ul><li>{_sentence(rng, 5)}</li></ul></li>"
+            for _ in range(4)
+        )
+        body.append(f"<ol>{nested}</ol>")
+        body.append(
+            f"<pre><code>fn example_{i}() -> Result&lt;()&gt; {{ Ok(()) }}</code></pre>"
+        )
+    return (
+        "<html><head><title>Docs</title></head><body>"
+        f"<nav class='sidebar'><ul>{sidebar}</ul></nav>"
+        "<main><div class='content'>" + "".join(body) + "</div></main>"
+        "<footer>Docs footer</footer></body></html>"
+    )
+
+
+def spa_html(seed=0, cards=4000):
+    rng = random.Random(seed)
+    state = {
+        "props": {
+            "items": [
+                {"id": i, "title": _sentence(rng, 6), "tags": rng.sample(_WORDS, 4)}
+                for i in range(cards // 4)
+            ]
+        }
+    }
+    body = []
+    for i in range(cards):
+        depth = rng.randint(3, 8)
+        inner = (
+            f"<span class='title'>{_sentence(rng, 6)}</span><p>{_sentence(rng, 14)}</p>"
+        )
+        for d in range(depth):
+            inner = (
+                f"<div class='css-{rng.randrange(16**6):06x} layer-{d}'>{inner}</div>"
+            )
+        body.append(inner)
+        if i % 50 == 0:
+            body.append(
+                "<div class='popup modal'><button>Accept cookies</button></div>"
+            )
+    return (
+        "<html><head><title>App</title></head><body><div id='__next'>"
+        "<div id='root'>" + "".join(body) + "</div></div>"
+        "<script id='__NEXT_DATA__' type='application/json'>"
+        + json.dumps(state)
+        + "</script></body></html>"
+    )
+
+
+HTML_GENERATORS = {
+    "wechat": wechat_html,
+    "blog": blog_html,
+    "docs": docs_html,
+    "spa": spa_html,
+}
+
+
+def pdf_bytes(pages, seed=0):
+    """生成带文本的 PDF（需要 pymupdf）"""
+    import fitz
+
+    rng = random.Random(seed)
+    doc = fitz.open()
+    doc.set_metadata({"title": f"Benchmark Paper ({pages} pages)"})
+    for _ in range(pages):
+        page = doc.new_page()
+        text = "\n".join(_sentence(rng, 14) for _ in range(45))
+        page.insert_textbox(fitz.Rect(40, 40, 560, 800), text, fontsize=8)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+PDF_SIZES = {"pdf-small": 3, "pdf-large": 300}
+
+
+def jina_markdown(html_name, seed=0):
+    """Jina 替身返回的 Markdown"""
+    rng = random.Random(seed)
+    title = f"# {html_name.title()} {_sentence(rng, 5)}"
+    return title + "\n\n\n\n" + "\n\n".join(_paragraph(rng) for _ in range(40))
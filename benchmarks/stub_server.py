@@ -0,0 +1,211 @@
+"""
+本地替身服务器：代替 Jina Reader、Firecrawl 和源站，延迟与失败率可配置
+
+路由:
+    GET/HEAD /site/<kind>-<seed>.html   源站 HTML（kind 见 corpus.HTML_GENERATORS）
+    GET      /site/<pdf-small|pdf-large>.pdf   源站 PDF
+    GET      /jina/<url>                Jina Reader（返回 Markdown）
+    POST     /firecrawl                 Firecrawl scrape API（返回 JSON）
+
+超过 rate_limit 配置的速率时返回 429（带 Retry-After），模拟限流的源站或 API。
+
+用法:
+    with StubServer(latency={"jina": 0.05}, failure_rate={"firecrawl": 0.2}) as server:
+        converter.JINA_BASE_URLS = (server.url + "/jina",)
+        converter.FIRECRAWL_URL = server.url + "/firecrawl"
+        converter.convert(server.url + "/site/blog-0.html")
+"""
+
+import http.server
+import json
+import random
+import re
+import threading
+import time
+
+import corpus
+
+BACKENDS = ("origin", "jina", "firecrawl")
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    # 批量用例的并发连接可能同时到达，加大监听队列（默认 5）以免连接被拒
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class StubServer:
+    """在后台线程中运行的替身服务器"""
+
+    def __init__(
+        self, latency=None, failure_rate=None, jitter=0.2, seed=0, rate_limit=None
+    ):
+        """
+        Args:
+            latency: {后端: 秒}，后端为 origin / jina / firecrawl
+            failure_rate: {后端: 0~1}，按该比例返回 503
+            jitter: 延迟的随机浮动比例（±）
+            seed: 随机数种子（延迟浮动与失败注入可复现）
+            rate_limit: {后端: 每秒请求数}，超过时返回 429 和 Retry-After
+        """
+        self.latency = dict.fromkeys(BACKENDS, 0.0)
+        self.latency.update(latency or {})
+        self.failure_rate = dict.fromkeys(BACKENDS, 0.0)
+        self.failure_rate.update(failure_rate or {})
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self.rate_limit = dict(rate_limit or {})
+        self.rejected = dict.fromkeys(BACKENDS, 0)  # 各后端返回 429 的次数
+        self._buckets = {}  # 后端 -> [令牌数, 上次补充时间]
+        self._content = {}
+        self._content_lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def start(self):
+        stub = self
+
+        class Handler(_StubHandler):
+            server_stub = stub
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def content(self, name):
+        """按名称生成（并缓存）语料内容，返回 (bytes, content_type)"""
+        with self._content_lock:
+            if name not in self._content:
+                self._content[name] = _generate(name)
+            return self._content[name]
+
+    def admit(self, backend):
+        """按 rate_limit 的令牌桶判断是否放行请求（容量为 1 秒的请求数）"""
+        rate = self.rate_limit.get(backend)
+        if rate is None:
+            return True
+        now = time.monotonic()
+        with self._rng_lock:
+            bucket = self._buckets.setdefault(backend, [rate, now])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            self.rejected[backend] += 1
+            return False
+
+    def delay(self, backend):
+        """按配置的延迟和失败率模拟后端，返回是否应失败"""
+        with self._rng_lock:
+            factor = 1 + self._rng.uniform(-self.jitter, self.jitter)
+            failed = self._rng.random() < self.failure_rate[backend]
+        if self.latency[backend]:
+            time.sleep(self.latency[backend] * factor)
+        return failed
+
+
+def _generate(name):
+    match = re.fullmatch(r"([a-z]+)-(\d+)\.html", name)
+    if match and match.group(1) in corpus.HTML_GENERATORS:
+        html = corpus.HTML_GENERATORS[match.group(1)](seed=int(match.group(2)))
+        return html.encode("utf-8"), "text/html; charset=utf-8"
+    match = re.fullmatch(r"(pdf-[a-z]+)\.pdf", name)
+    if match and match.group(1) in corpus.PDF_SIZES:
+        return corpus.pdf_bytes(corpus.PDF_SIZES[match.group(1)]), "application/pdf"
+    return None
+
+
+class _StubHandler(http.server.BaseHTTPRequestHandler):
+    server_stub = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self._site(head=True)
+
+    def do_GET(self):
+        if self.path.startswith("/jina/"):
+            self._jina()
+        else:
+            self._site(head=False)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path != "/firecrawl":
+            self._send(404, b"not found", "text/plain")
+            return
+        if not self.server_stub.admit("firecrawl"):
+            self._reject()
+            return
+        if self.server_stub.delay("firecrawl"):
+            self._send(503, b"unavailable", "text/plain")
+            return
+        name = request.get("url", "").rsplit("/", 1)[-1]
+        payload = {
+            "success": True,
+            "data": {"markdown": corpus.jina_markdown(name, seed=len(name))},
+        }
+        self._send(200, json.dumps(payload).encode("utf-8"), "application/json")
+
+    def _jina(self):
+        if not self.server_stub.admit("jina"):
+            self._reject()
+            return
+        if self.server_stub.delay("jina"):
+            self._send(503, b"unavailable", "text/plain")
+            return
+        name = self.path.rsplit("/", 1)[-1]
+        body = corpus.jina_markdown(name, seed=len(name)).encode("utf-8")
+        self._send(200, body, "text/markdown; charset=utf-8")
+
+    def _site(self, head):
+        if not self.path.startswith("/site/"):
+            self._send(404, b"not found", "text/plain", head)
+            return
+        if not head and not self.server_stub.admit("origin"):
+            self._reject()
+            return
+        if not head and self.server_stub.delay("origin"):
+            self._send(503, b"unavailable", "text/plain")
+            return
+        content = self.server_stub.content(self.path[len("/site/") :])
+        if content is None:
+            self._send(404, b"not found", "text/plain", head)
+            return
+        self._send(200, *content, head=head)
+
+    def _reject(self):
+        self._send(429, b"too many requests", "text/plain", retry_after=1)
+
+    def _send(self, status, body, content_type, head=False, retry_after=None):
+        self.send_response(status)
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
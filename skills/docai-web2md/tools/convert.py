@@ -19,605 +19,5193 @@ arXiv 特殊处理：
 
 用法:
     python convert.py <url> [--pure-text] [--output <file>]
+    python convert.py --input <urls.txt|-> [--jobs N] [--per-host N] [--output <file>]
+    python convert.py serve [--listen <socket 路径|host:port>]
 
 示例:
     python convert.py https://www.breezedeus.com/article/ai-agent-context-engineering
     python convert.py https://arxiv.org/abs/2601.04500v1 --output paper.md
     python convert.py https://x.com/user/status/123 --pure-text
+    python convert.py --input urls.txt --jobs 16 --output results.jsonl
+    python convert.py serve &  # 常驻守护进程，之后的调用自动复用
 """
 
+# 启动路径只导入标准库中的轻量模块：requests / urllib3 在首次发起请求时、
+# BeautifulSoup / markdownify 在首次解析 HTML 时、asyncio 在异步引擎的方法中才导入，
+# 命令行 --help、缓存命中与交给守护进程的转换都不承担这些开销
 import sys
 import argparse
+import functools
+import importlib.util
 import logging
 from pathlib import Path
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
-from markdownify import markdownify as md
 import tempfile
-from urllib.parse import urlparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+import contextvars
+from collections import Counter, defaultdict, deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    wait,
+)
+import codecs
+import contextlib
+import hashlib
+import heapq
+import http.client
+import http.server
+import ipaddress
+import itertools
+import json
+import queue
+import random
+import signal
+import socket
+import socketserver
+import sqlite3
+import threading
+import time
 import re
 import os
+import shutil
+import weakref
 
 logger = logging.getLogger(__name__)
 
 
-class WebToMarkdown:
-    """网页转 Markdown 转换器（并行优先级方法）"""
+# 当前线程/任务的取消令牌：转换的总时间预算，竞速中为竞速令牌（随 contextvars
+# 传递到后端工作线程）
+_current_token = contextvars.ContextVar("docai_cancel_token", default=None)
+# 当前转换的结果信息（胜出后端等），由 convert_many 等调用方按需收集
+_current_info = contextvars.ContextVar("docai_convert_info", default=None)
+# 当前转换的计时追踪（ConversionTrace），未启用追踪时为 None
+_current_trace = contextvars.ContextVar("docai_trace", default=None)
 
-    # 超时常量（秒）
-    TIMEOUT_HEAD = 3
-    TIMEOUT_JINA = 8
-    TIMEOUT_FIRECRAWL = 10
-    TIMEOUT_REQUESTS = 15
-    TIMEOUT_PLAYWRIGHT = 15000  # 毫秒
 
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update(
-            {"User-Agent": "Mozilla/5.0 (compatible; DocAI-Converter/1.0)"}
+def _record(**fields):
+    """向当前转换的结果信息中记录字段（无收集方时忽略）"""
+    info = _current_info.get()
+    if info is not None:
+        info.update(fields)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.info.update(fields)
+
+
+def _span(name, **attrs):
+    """在当前追踪中记录一个阶段的耗时（未启用追踪时为空操作）"""
+    trace = _current_trace.get()
+    if trace is None:
+        return contextlib.nullcontext({})
+    return trace.span(name, **attrs)
+
+
+def _count(name):
+    """在当前追踪中累加一个计数（未启用追踪时为空操作）"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(name)
+
+
+class _Cancelled(BaseException):
+    """后端被取消（竞速已有胜者或截止时间已到）
+
+    与 asyncio.CancelledError 一样继承 BaseException，
+    避免被各后端的 ``except Exception`` 当作普通失败记录日志。
+    """
+
+
+# 默认提取配置（见 ExtractionProfile）：通用与微信公众号的标题/正文选择器（按优先级）
+# 和噪音规则，站点配置在其上叠加
+_DEFAULT_PROFILE_SPEC = {
+    "title": ["title", "h1#activity-name", ".rich_media_title", "h1"],
+    "content": [
+        "#js_content",  # 微信公众号
+        ".rich_media_content",  # 微信公众号
+        "#activity-detail",  # 微信公众号
+        "article",  # 标准文章
+        "main",  # 标准主内容
+        ".post-content",  # 博客
+        ".article-content",  # 博客
+    ],
+    "remove": {
+        "tags": ["script", "style", "nav", "footer", "header", "iframe", "aside"],
+        # 短的 class 单词（按 -、_、驼峰拆分后整词匹配，header、upload、shadow
+        # 等不会因包含 "ad" 被误删；adbox 这类常见的无分隔组合单独列出）
+        "classes": [
+            "ad",
+            "ads",
+            "adsbygoogle",
+            "adbox",
+            "adslot",
+            "adunit",
+            "adwrap",
+            "adwrapper",
+            "adcontainer",
+            "like",
+            "likes",
+            "btn",
+        ],
+        # 较长的关键词按子串匹配，sharebar、commentlist、cookiebanner 等组合名同样移除
+        "patterns": [
+            "advert|sponsor|banner|cookie|consent|popup|modal"
+            "|share|sharing|comment|button|reward"
+        ],
+    },
+}
+
+# 快速渲染模式下拦截的资源类型（正文提取用不到）
+_BLOCKED_RESOURCE_TYPES = frozenset(["image", "media", "font"])
+# 快速渲染模式下拦截的统计 / 广告 / 跟踪域名（含子域名）
+_TRACKER_DOMAINS = frozenset(
+    [
+        "google-analytics.com",
+        "googletagmanager.com",
+        "googlesyndication.com",
+        "googleadservices.com",
+        "doubleclick.net",
+        "facebook.net",
+        "connect.facebook.net",
+        "hotjar.com",
+        "segment.io",
+        "segment.com",
+        "mixpanel.com",
+        "amplitude.com",
+        "clarity.ms",
+        "scorecardresearch.com",
+        "quantserve.com",
+        "newrelic.com",
+        "nr-data.net",
+        "hm.baidu.com",
+        "cnzz.com",
+        "51.la",
+        "growingio.com",
+    ]
+)
+
+
+def _is_blocked_request(resource_type, url):
+    """快速渲染模式下是否拦截该请求"""
+    if resource_type in _BLOCKED_RESOURCE_TYPES:
+        return True
+    labels = (urlparse(url).hostname or "").lower().split(".")
+    return any(".".join(labels[i:]) in _TRACKER_DOMAINS for i in range(len(labels)))
+
+
+# 静态 HTML 中的 SPA 外壳特征（空挂载点、框架状态、要求启用 JavaScript 的提示）
+_SPA_SHELL_RE = re.compile(
+    r"""id=["'](?:root|app|__next|__nuxt)["']|window\.__NUXT__|__NEXT_DATA__"""
+    r"|enable javascript|启用\s*javascript",
+    re.I,
+)
+
+# 页面快照：[正文选择器是否已有文本, 元素数, 文本长度]，后两者用于判断 DOM 是否稳定
+_SNAPSHOT_JS = """(selector) => {
+    const body = document.body;
+    const found = Array.from(document.querySelectorAll(selector))
+        .some((el) => el.textContent.trim().length > 0);
+    return [found, body ? body.getElementsByTagName("*").length : 0,
+            body ? body.textContent.length : 0];
+}"""
+
+
+class _SettleTracker:
+    """智能等待：正文已出现且 DOM 在 quiet 秒内不再变化即视为渲染完成
+
+    始终没有出现正文选择器的页面，DOM 稳定 fallback_quiet 秒后同样视为完成。
+    """
+
+    def __init__(self, quiet, fallback_quiet):
+        self.quiet = quiet
+        self.fallback_quiet = fallback_quiet
+        self._signature = None
+        self._since = None
+
+    def ready(self, snapshot, now=None):
+        """传入 _SNAPSHOT_JS 的结果，返回是否已就绪"""
+        has_content, *signature = snapshot
+        now = time.monotonic() if now is None else now
+        if signature != self._signature:
+            self._signature, self._since = signature, now
+            return False
+        quiet = self.quiet if has_content else self.fallback_quiet
+        return now - self._since >= quiet
+
+
+_html_parser = None
+
+
+def _parse_html(html):
+    """解析 HTML，优先使用更快的 lxml 解析器（未安装时回退到 html.parser）"""
+    from bs4 import BeautifulSoup
+
+    global _html_parser
+    if _html_parser is None:
+        try:
+            import lxml  # noqa: F401
+
+            _html_parser = "lxml"
+        except ImportError:
+            _html_parser = "html.parser"
+    return BeautifulSoup(html, _html_parser)
+
+
+def _import_fitz():
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        raise ImportError("PDF 处理需要 PyMuPDF。\n" "请运行: pip install pymupdf")
+    return fitz
+
+
+def _open_pdf(fitz, source):
+    """打开 PDF：bytes 从内存打开，路径按文件打开（MuPDF 按需读取，不整体载入）"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(str(source), filetype="pdf")
+
+
+def _extract_pdf_pages(path, start, stop):
+    """提取 PDF 第 [start, stop) 页的文本（在进程池子进程中运行）
+
+    Returns:
+        list: [(页面文本, 提取耗时秒数), ...]
+    """
+    fitz = _import_fitz()
+    pages = []
+    with _open_pdf(fitz, path) as doc:
+        for index in range(start, stop):
+            started = time.monotonic()
+            text = doc[index].get_text()
+            pages.append((text, time.monotonic() - started))
+    return pages
+
+
+_worker_converter = None
+
+
+def _init_worker():
+    """进程池子进程的初始化：预先导入解析库，首个任务不再承担导入开销"""
+    _parse_html("<p></p>")
+    try:
+        _import_fitz()
+    except ImportError:
+        pass
+
+
+def _local_converter():
+    """在当前进程中执行 CPU 密集型方法的转换器（不使用进程池）"""
+    global _worker_converter
+    if _worker_converter is None:
+        _worker_converter = WebToMarkdown(cpu_workers=1)
+    return _worker_converter
+
+
+def _run_in_worker(method, args, traced):
+    """在进程池子进程中执行转换器的 CPU 密集型方法（_html_result / _process_pdf）
+
+    Returns:
+        tuple: (结果, 子进程追踪的起始时间, 子进程记录的阶段列表)
+    """
+    trace = ConversionTrace() if traced else None
+    reset = _current_trace.set(trace)
+    try:
+        result = getattr(_local_converter(), method)(*args)
+    finally:
+        _current_trace.reset(reset)
+    if trace is None:
+        return result, None, []
+    return result, trace.started, trace.spans
+
+
+def _wire_bytes(response):
+    """响应体已从网络读取的字节数（压缩前），无法获取时返回 None"""
+    try:
+        return int(response.raw.tell())
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+# 常见二进制格式的魔数（图片、音视频、压缩包、字体、可执行文件）
+_BINARY_MAGIC = (
+    b"\x89PNG",
+    b"GIF8",
+    b"\xff\xd8\xff",
+    b"RIFF",
+    b"ID3",
+    b"OggS",
+    b"fLaC",
+    b"PK\x03\x04",
+    b"\x1f\x8b",
+    b"7z\xbc\xaf",
+    b"Rar!",
+    b"wOFF",
+    b"wOF2",
+    b"\x7fELF",
+)
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?\s*([\w.:-]+)""", re.I)
+_HEADER_CHARSET_RE = re.compile(r"""charset\s*=\s*["']?([\w.:-]+)""", re.I)
+# 按 WHATWG 编码标准，GB2312 / GBK 声明实际按 GB18030 解码
+_CHARSET_ALIASES = {"gb2312": "gb18030", "gbk": "gb18030"}
+
+
+def _sniff_content(head):
+    """按响应体开头的魔数判断内容类型
+
+    Returns:
+        str | None: "pdf"、"html"（HTML 及其他文本），不支持的二进制内容返回 None
+    """
+    if b"%PDF-" in head[:1024]:
+        return "pdf"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "html"
+    if head.startswith(_BINARY_MAGIC) or head[4:8] == b"ftyp" or b"\x00" in head[:1024]:
+        return None
+    return "html"
+
+
+def _html_encoding(content_type, head):
+    """HTML 字符集：BOM > Content-Type 的 charset > <meta> 声明 > UTF-8"""
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    match = _HEADER_CHARSET_RE.search(content_type)
+    name = match.group(1) if match else None
+    if name is None:
+        match = _META_CHARSET_RE.search(head[:4096])
+        name = match.group(1).decode("ascii", "ignore") if match else None
+    if name:
+        try:
+            name = codecs.lookup(name).name
+            return _CHARSET_ALIASES.get(name, name)
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+# 简单选择器：标签名、#id、.class 的组合（如 div#main.post.body）
+_SELECTOR_RE = re.compile(r"([a-zA-Z][\w-]*)?(?:#([\w-]+))?((?:\.[\w-]+)*)")
+# class 名拆分为单词：按 -、_ 和驼峰边界（adSlot -> ad, slot）
+_CLASS_WORD_SPLIT_RE = re.compile(r"[-_]+|(?<=[a-z0-9])(?=[A-Z])")
+
+
+def _compile_selector(selector):
+    """简单选择器编译为 (标签名, id, class 集合)"""
+    match = _SELECTOR_RE.fullmatch(selector.strip())
+    if not match or not any(match.groups()):
+        raise ValueError(f"不支持的选择器 {selector!r}（仅支持 tag#id.class 形式）")
+    name, id_, classes = match.groups()
+    return name and name.lower(), id_, frozenset(classes.split(".")[1:])
+
+
+def _matches(tag, selector):
+    name, id_, classes = selector
+    if name and tag.name != name:
+        return False
+    if id_ and tag.get("id") != id_:
+        return False
+    return not classes or classes.issubset(tag.get("class") or ())
+
+
+def _match_first(tag, selectors, matches):
+    """记录 tag 命中的、尚无匹配的选择器（每个节点都会调用，检查内联以减少开销）"""
+    for i, (name, id_, classes) in enumerate(selectors):
+        if matches[i] is not None:
+            continue
+        if name and tag.name != name:
+            continue
+        if id_ and tag.get("id") != id_:
+            continue
+        if classes and not classes.issubset(tag.get("class") or ()):
+            continue
+        matches[i] = tag
+
+
+def _first_with_text(elems):
+    """第一个有可见文本的元素"""
+    for elem in elems:
+        if elem and next(elem.stripped_strings, None) is not None:
+            return elem
+    return None
+
+
+class ExtractionProfile:
+    """站点提取配置：标题/正文选择器、噪音规则和渲染提示
+
+    由声明式配置编译而来，转换时只做集合与字典查找::
+
+        {
+            "title": ["h1.post-title"],  # 标题选择器，排在默认选择器之前
+            "content": ["div.article-body"],  # 正文选择器，排在默认选择器之前
+            "remove": {
+                "tags": ["form"],  # 移除的标签
+                "classes": ["related"],  # class 拆分出的单词（按 -、_、驼峰）命中即移除
+                "patterns": ["^promo"],  # 对小写 class 名 re.search 的正则
+                "selectors": ["div#comments"],  # 移除匹配选择器的元素
+            },
+            "render": "browser",  # "browser"（SPA）/ "static"，缺省按探测结果判定
+        }
+
+    选择器只支持简单选择器（标签名、#id、.class 及其组合）。站点配置在默认配置
+    之上叠加：选择器排在默认选择器之前，噪音规则取并集。
+    """
+
+    KEYS = frozenset(["title", "content", "remove", "render"])
+    REMOVE_KEYS = frozenset(["tags", "classes", "patterns", "selectors"])
+    # 每个配置缓存的 class 名判定结果数，超过即清空
+    NOISE_CACHE_SIZE = 4096
+
+    def __init__(self, spec, base=None):
+        """
+        Args:
+            spec: 声明式配置（见类说明）
+            base: 叠加的基础配置（编译后的 ExtractionProfile），None 表示不叠加
+        """
+        unknown = set(spec) - self.KEYS
+        remove = spec.get("remove") or {}
+        unknown |= set(remove) - self.REMOVE_KEYS
+        if unknown:
+            raise ValueError(f"未知的配置项: {', '.join(sorted(unknown))}")
+        render = spec.get("render")
+        if render not in (None, "browser", "static"):
+            raise ValueError(f"render 应为 browser 或 static: {render!r}")
+
+        content = [s.strip() for s in spec.get("content") or ()]
+        self.render = render
+        # 站点自己的正文选择器（纯文本提取优先使用）
+        self.site_content = tuple(_compile_selector(s) for s in content)
+        self.title = tuple(_compile_selector(s) for s in spec.get("title") or ())
+        self.content = self.site_content
+        # 渲染就绪判定使用的 CSS 选择器（与 content 一致）
+        self.content_css = ", ".join(content)
+        self.noise_tags = frozenset(t.lower() for t in remove.get("tags") or ())
+        self.noise_words = frozenset(w.lower() for w in remove.get("classes") or ())
+        self.noise_patterns = tuple(remove.get("patterns") or ())
+        self.noise_selectors = tuple(
+            _compile_selector(s) for s in remove.get("selectors") or ()
         )
-        # 配置重试策略：仅针对 429/5xx，最多 2 次，指数退避
-        retry = Retry(
-            total=2,
-            backoff_factor=1,
-            status_forcelist=[429, 500, 502, 503, 504],
-            allowed_methods=["HEAD", "GET", "POST"],
+        if base is not None:
+            self.title += base.title
+            self.content += base.content
+            self.content_css = ", ".join(
+                filter(None, [self.content_css, base.content_css])
+            )
+            self.noise_tags |= base.noise_tags
+            self.noise_words |= base.noise_words
+            self.noise_patterns += base.noise_patterns
+            self.noise_selectors += base.noise_selectors
+        self._noise_re = None
+        if self.noise_patterns:
+            self._noise_re = re.compile(
+                "|".join(f"(?:{p})" for p in self.noise_patterns)
+            )
+        self._noise_classes = {}  # class 名 -> 是否噪音
+
+    def __getstate__(self):
+        # 交给进程池时不传输判定缓存
+        return {**self.__dict__, "_noise_classes": {}}
+
+    def is_noise(self, tag):
+        """tag 是否为噪音元素（噪音标签、class 命中噪音规则或匹配移除选择器）"""
+        if tag.name in self.noise_tags:
+            return True
+        classes = tag.get("class")
+        if classes:
+            if isinstance(classes, str):
+                classes = [classes]
+            cache = self._noise_classes
+            for name in classes:
+                noise = cache.get(name)
+                if noise is None:
+                    noise = self._is_noise_class(name)
+                if noise:
+                    return True
+        if self.noise_selectors:
+            return any(_matches(tag, s) for s in self.noise_selectors)
+        return False
+
+    def _is_noise_class(self, name):
+        """按 class 单词与正则判定并缓存"""
+        cache = self._noise_classes
+        noise = cache.get(name)
+        if noise is None:
+            words = (w.lower() for w in _CLASS_WORD_SPLIT_RE.split(name))
+            noise = not self.noise_words.isdisjoint(words) or (
+                self._noise_re is not None
+                and self._noise_re.search(name.lower()) is not None
+            )
+            if len(cache) >= self.NOISE_CACHE_SIZE:
+                cache.clear()
+            cache[name] = noise
+        return noise
+
+
+_DEFAULT_PROFILE = ExtractionProfile(_DEFAULT_PROFILE_SPEC)
+
+
+def _prune_noise(root, profile=_DEFAULT_PROFILE, empty_paragraphs=True):
+    """一次遍历清理 root 的子树（root 本身保留）
+
+    先序：命中 profile 噪音规则的元素连同子树移除；
+    后序：子节点处理完毕后，移除没有可见文本的空段落（empty_paragraphs 为 False 时
+    跳过，提取纯文本时空段落本就不产生输出）。
+    """
+    from bs4 import Tag
+
+    is_noise = profile.is_noise
+    stack = [(root, False)]
+    while stack:
+        node, children_done = stack.pop()
+        if children_done:
+            if node.name == "p" and next(node.stripped_strings, None) is None:
+                node.decompose()
+            continue
+        if empty_paragraphs:
+            stack.append((node, True))
+        for child in list(node.contents):
+            if not isinstance(child, Tag):
+                continue
+            if is_noise(child):
+                child.decompose()
+            else:
+                stack.append((child, False))
+
+
+class _CancelToken:
+    """协作式取消令牌：共享截止时间 + 取消回调
+
+    竞速中每个后端共享同一个令牌。胜者出现或截止时间到达时调用 cancel()，
+    注册的回调会立即中断失败方正在进行的 HTTP 读取或浏览器页面。
+    """
+
+    def __init__(self, deadline=None):
+        self.deadline = deadline  # time.monotonic() 绝对时间，None 表示不限
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        if self._event.is_set():
+            return True
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def cancel(self):
+        """发出取消信号并执行所有已注册的回调（幂等）"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.debug("取消回调失败: %s", e)
+
+    def on_cancel(self, callback):
+        """注册取消回调，返回注销函数；已取消时立即执行回调"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._discard(callback)
+        callback()
+        return lambda: None
+
+    def _discard(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def remaining(self):
+        """距截止时间的剩余秒数，无截止时间时返回 None"""
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def timeout(self, default):
+        """以剩余时间收紧单次操作的超时（秒）"""
+        remaining = self.remaining()
+        if remaining is None:
+            return default
+        return max(0.001, min(default, remaining))
+
+    def check(self):
+        """已取消则抛出 _Cancelled"""
+        if self.cancelled:
+            raise _Cancelled()
+
+    def sleep(self, seconds):
+        """等待 seconds 秒，期间被取消时立即抛出 _Cancelled"""
+        self._event.wait(seconds)
+        self.check()
+
+
+class _DeadlineWatcher:
+    """在截止时间到达时取消令牌
+
+    所有转换的时间预算共用一个后台线程（按截止时间排序的堆），而不是每次调用
+    各启动一个定时器线程。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []  # [截止时间, 序号, 令牌]，令牌为 None 表示已注销
+        self._seq = itertools.count()
+        self._discarded = 0
+        self._thread = None
+
+    def watch(self, token):
+        """到达 token.deadline 时调用 token.cancel()，返回注销函数"""
+        entry = [token.deadline, next(self._seq), token]
+        with self._cond:
+            heapq.heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="docai-deadline", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify()
+        return lambda: self._discard(entry)
+
+    def _discard(self, entry):
+        with self._cond:
+            if entry[2] is None:
+                return
+            entry[2] = None
+            self._discarded += 1
+            # 已注销的条目过多时重建堆，避免截止时间很长的令牌堆积
+            if self._discarded > 64 and self._discarded * 2 > len(self._heap):
+                self._heap = [e for e in self._heap if e[2] is not None]
+                heapq.heapify(self._heap)
+                self._discarded = 0
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._heap and self._heap[0][2] is None:
+                    heapq.heappop(self._heap)
+                    self._discarded -= 1
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                delay = self._heap[0][0] - time.monotonic()
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                token = heapq.heappop(self._heap)[2]
+            token.cancel()  # 在锁外执行取消回调
+
+
+_deadline_watcher = _DeadlineWatcher()
+
+
+@contextlib.contextmanager
+def _child_token(timeout):
+    """派生子令牌：截止时间不晚于当前令牌，当前令牌取消时一并取消"""
+    parent = _current_token.get()
+    deadline = time.monotonic() + timeout
+    if parent is not None and parent.deadline is not None:
+        deadline = min(deadline, parent.deadline)
+    token = _CancelToken(deadline=deadline)
+    unregister = parent.on_cancel(token.cancel) if parent is not None else lambda: None
+    try:
+        yield token
+    finally:
+        unregister()
+
+
+def _budget_remaining():
+    """当前时间预算的剩余秒数，不限时返回 None"""
+    token = _current_token.get()
+    return None if token is None else token.remaining()
+
+
+def _budget_timeout(timeout):
+    """以当前时间预算的剩余时间收紧单次操作的超时（秒）"""
+    token = _current_token.get()
+    return timeout if token is None else token.timeout(timeout)
+
+
+class ConversionTrace:
+    """单次转换的分阶段计时
+
+    记录每个后端尝试、HTTP 请求的 DNS / 建连 / TLS / 首字节 / 下载、浏览器启动 /
+    导航 / 等待渲染、HTML 解析 / 清理 / Markdown 生成以及 PDF 逐页提取的耗时和字节数
+    （下载为线上字节数，即压缩后的大小），并统计 HTTP 请求数与其中复用已有连接的请求数。
+    竞速中的各后端线程共享同一个追踪对象。
+
+    用法:
+        trace = ConversionTrace()
+        converter.convert(url, trace=trace)
+        print(trace.to_dict())
+    """
+
+    def __init__(self, url=None):
+        self.url = url
+        self.info = {}  # 胜出后端等（与 _record 记录的字段一致）
+        self.spans = []
+        self.counts = Counter()  # HTTP 请求数（requests）与新建连接数（connections）
+        self._counts_lock = threading.Lock()
+        self.started = time.monotonic()
+        self.elapsed = None
+
+    @contextlib.contextmanager
+    def span(self, name, **attrs):
+        """记录 with 块的耗时；块内可向产出的字典补充属性（如字节数）"""
+        start = time.monotonic()
+        try:
+            yield attrs
+        except BaseException as e:
+            attrs.setdefault("error", type(e).__name__)
+            raise
+        finally:
+            self.add(name, time.monotonic() - start, start=start, **attrs)
+
+    def add(self, name, duration, start=None, **attrs):
+        """记录一个已知耗时的阶段"""
+        if start is None:
+            start = time.monotonic() - duration
+        self.spans.append(
+            {
+                "name": name,
+                "start": round(start - self.started, 4),
+                "duration": round(duration, 4),
+                **attrs,
+            }
         )
-        adapter = HTTPAdapter(max_retries=retry)
-        self.session.mount("https://", adapter)
-        self.session.mount("http://", adapter)
-        # 从环境变量获取 Firecrawl API 密钥
-        self.firecrawl_api_key = os.environ.get("FIRECRAWL_API_KEY")
 
-    def __enter__(self):
+    def count(self, name, n=1):
+        with self._counts_lock:
+            self.counts[name] += n
+
+    def finish(self):
+        self.elapsed = time.monotonic() - self.started
+
+    @property
+    def backend(self):
+        return self.info.get("backend")
+
+    @property
+    def bytes(self):
+        """下载的总字节数"""
+        return sum(span.get("bytes") or 0 for span in self.spans)
+
+    @property
+    def http(self):
+        """HTTP 请求数、新建连接数与复用已有连接的请求数"""
+        requests, connections = self.counts["requests"], self.counts["connections"]
+        return {
+            "requests": requests,
+            "connections": connections,
+            "reused": max(0, requests - connections),
+        }
+
+    def to_dict(self):
+        elapsed = self.elapsed
+        if elapsed is None:
+            elapsed = time.monotonic() - self.started
+        return {
+            "url": self.url,
+            **self.info,
+            "elapsed": round(elapsed, 4),
+            "bytes": self.bytes,
+            "http": self.http,
+            "spans": sorted(self.spans, key=lambda span: span["start"]),
+        }
+
+
+class ConvertResult(str):
+    """转换结果
+
+    字符串值为所请求的表示（Markdown 或纯文本），与 convert() 以往返回的 str 相同；
+    同时保留抓取到的原始内容和元数据，另一种表示与逐页文本在首次访问时生成并缓存，
+    一次抓取即可得到所有表示。
+
+    用法:
+        result = converter.convert(url)
+        result.markdown, result.text, result.pages, result.title
+        result.backend, result.content_type, result.url, result.elapsed
+
+    Attributes:
+        raw: 抓取到的原始内容（HTML、Jina / Firecrawl 的 Markdown 或 PDF 临时文件路径）；
+            命中结果缓存时为缓存的内容
+        content_type: 原始内容的类型（text/html、text/markdown、application/pdf 等）
+        url: 实际抓取的 URL（arXiv / Twitter 改写之后）
+        info: 转换信息（胜出后端、是否命中缓存等，字段与 convert_many 的结果记录一致）
+        elapsed: 转换耗时（秒）
+        trace: 本次转换的 ConversionTrace（启用追踪时）
+    """
+
+    def __new__(
+        cls,
+        value,
+        pure_text=False,
+        derive=None,
+        *,
+        raw=None,
+        content_type=None,
+        url=None,
+        pages=None,
+    ):
+        """
+        Args:
+            value: pure_text 对应的表示
+            derive: derive(pure_text) 从原始内容生成指定表示，None 表示无法再生成
+                （此时另一种表示由已有表示近似得到）
+            pages: 逐页产出 (页码, 文本) 的函数（PDF），默认整篇为一页
+        """
+        self = super().__new__(cls, value)
+        self._views = {pure_text: str(value)}
+        self._derive = derive
+        self._iter_pages = pages
+        self._pages = None
+        self._lock = threading.RLock()
+        self.raw = raw
+        self.content_type = content_type
+        self.url = url
+        self.info = {}
+        self.elapsed = None
+        self.trace = None
         return self
 
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.session.close()
+    def __reduce__(self):
+        # 序列化（跨进程、pickle）时退化为普通字符串
+        return str, (str(self),)
+
+    def _view(self, pure_text):
+        with self._lock:
+            if pure_text not in self._views:
+                value = self._derive(pure_text) if self._derive else None
+                if not value:
+                    value = self._views[not pure_text]
+                self._views[pure_text] = value
+            return self._views[pure_text]
+
+    @property
+    def markdown(self):
+        """Markdown 表示"""
+        return self._view(False)
+
+    @property
+    def text(self):
+        """纯文本表示"""
+        return self._view(True)
+
+    @property
+    def pages(self):
+        """逐页文本 [(页码, 文本), ...]：PDF 按页提取，其余内容整篇为一页"""
+        with self._lock:
+            if self._pages is None:
+                if self._iter_pages is not None:
+                    self._pages = list(self._iter_pages())
+                else:
+                    self._pages = [(1, self.text)]
+            return self._pages
+
+    @property
+    def title(self):
+        """标题（Markdown 中的第一个一级标题）"""
+        match = re.search(r"^# +(.+?)\s*$", self.markdown, re.MULTILINE)
+        return match.group(1) if match else None
+
+    @property
+    def backend(self):
+        """产出结果的后端（cache 表示命中结果缓存）"""
+        return self.info.get("backend")
+
+
+class _DnsCache:
+    """进程内 DNS 缓存：发往同一主机的新连接共享一次解析结果（各线程共享）
+
+    getaddrinfo 不返回记录的 TTL，解析结果固定缓存 TTL 秒；某个主机的所有地址都
+    连接失败时清除该主机的缓存，下次重新解析。
+    """
+
+    TTL = 60.0
+    MAX_HOSTS = 1024
+
+    def __init__(self):
+        self._entries = {}  # (主机, 端口) -> (地址列表, 过期时间)
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port, family=0):
+        """返回 (地址列表, 是否命中缓存)，解析失败时抛出 socket.gaierror"""
+        key = (host, port, family)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[1] > now:
+            return entry[0], True
+        infos = socket.getaddrinfo(host, port, family, socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            if len(self._entries) >= self.MAX_HOSTS:
+                self._entries = {k: v for k, v in self._entries.items() if v[1] > now}
+            self._entries[key] = (addresses, now + self.TTL)
+        return addresses, False
+
+    def forget(self, host, port, family=0):
+        with self._lock:
+            self._entries.pop((host, port, family), None)
+
+
+_dns_cache = _DnsCache()
+
+
+class _TracedConnectionMixin:
+    """urllib3 连接：经进程内 DNS 缓存建连，并在启用追踪时记录 DNS / 建连 / TLS 耗时、
+    请求数与新建连接数（其余请求复用了 keep-alive 连接）
+    """
+
+    _new_conn_time = 0.0
+    _tls = False
+
+    def _new_conn(self):
+        from urllib3.util.connection import allowed_gai_family
+
+        start = time.monotonic()
+        host, family = self._dns_host, allowed_gai_family()
+        with _span("http.dns", host=host) as span:
+            try:
+                addresses, span["cached"] = _dns_cache.resolve(host, self.port, family)
+            except OSError:
+                addresses = None  # 解析失败由下方建连按 urllib3 的方式报错
+        try:
+            with _span("http.connect", host=host):
+                if addresses:
+                    sock = self._connect_any(host, family, addresses)
+                else:
+                    sock = super()._new_conn()
+            _count("connections")
+            return sock
+        finally:
+            self._new_conn_time = time.monotonic() - start
+
+    def _connect_any(self, host, family, addresses):
+        """依次连接解析出的地址（TLS 的 SNI 与证书校验仍使用主机名）"""
+        for i, address in enumerate(addresses):
+            self._dns_host = address
+            try:
+                return super()._new_conn()
+            except Exception:
+                if i == len(addresses) - 1:
+                    _dns_cache.forget(host, self.port, family)
+                    raise
+            finally:
+                self._dns_host = host
+
+    def request(self, *args, **kwargs):
+        _count("requests")
+        return super().request(*args, **kwargs)
+
+    def connect(self):
+        trace = _current_trace.get()
+        if trace is None or not self._tls:
+            return super().connect()
+        start = time.monotonic()
+        super().connect()
+        # TLS 握手耗时 = connect 总耗时 - DNS 与建连耗时
+        trace.add(
+            "http.tls",
+            max(0.0, time.monotonic() - start - self._new_conn_time),
+            host=self.host,
+        )
+
+
+def _keepalive_socket_options(idle):
+    """TCP_NODELAY（urllib3 的默认选项）加 TCP keepalive：空闲 idle 秒后探测，
+    及早发现被中间设备静默断开的池化连接
+    """
+    options = [
+        (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+        (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+    for name, value in (
+        ("TCP_KEEPIDLE", idle),
+        ("TCP_KEEPINTVL", max(1, idle // 3)),
+        ("TCP_KEEPCNT", 3),
+    ):
+        if hasattr(socket, name):  # macOS / Windows 没有全部选项
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+@functools.cache
+def _traced_http_adapter():
+    """连接池使用带 DNS 缓存与追踪的连接类的 HTTPAdapter（首次创建 Session 时才定义）"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    class _TracedHTTPConnection(_TracedConnectionMixin, HTTPConnection):
+        pass
+
+    class _TracedHTTPSConnection(_TracedConnectionMixin, HTTPSConnection):
+        _tls = True
+
+    class _TracedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = _TracedHTTPConnection
+
+    class _TracedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = _TracedHTTPSConnection
+
+    class _TracedHTTPAdapter(HTTPAdapter):
+        def __init__(self, socket_options=None, **kwargs):
+            self.socket_options = socket_options
+            super().__init__(**kwargs)
+
+        def init_poolmanager(self, *args, **kwargs):
+            if self.socket_options is not None:
+                kwargs.setdefault("socket_options", self.socket_options)
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": _TracedHTTPConnectionPool,
+                "https": _TracedHTTPSConnectionPool,
+            }
+
+        def resize(self, maxsize):
+            """扩大每个主机的连接池；旧连接池中的空闲连接关闭，进行中的请求不受影响"""
+            if maxsize <= self._pool_maxsize:
+                return
+            old = self.poolmanager
+            self.init_poolmanager(self._pool_connections, maxsize, self._pool_block)
+            old.clear()
+
+    return _TracedHTTPAdapter
+
+
+class _HttpcoreTrace:
+    """把 httpcore 的建连 / TLS 耗时、请求数与新建连接数记录到追踪中（httpx 的 trace 扩展）"""
+
+    _STAGES = {
+        "connection.connect_tcp": "http.connect",
+        "connection.start_tls": "http.tls",
+    }
+
+    def __init__(self, trace):
+        self.trace = trace
+        self._started = {}
+
+    def __call__(self, event, info):
+        stage, _, status = event.rpartition(".")
+        if stage.endswith(".send_request_headers") and status == "started":
+            self.trace.count("requests")
+        if stage not in self._STAGES:
+            return
+        if status == "started":
+            self._started[stage] = time.monotonic()
+        elif stage in self._started:
+            start = self._started.pop(stage)
+            self.trace.add(self._STAGES[stage], time.monotonic() - start, start=start)
+            if stage == "connection.connect_tcp" and status == "complete":
+                self.trace.count("connections")
+
+    async def acall(self, event, info):
+        """异步客户端使用的回调"""
+        self(event, info)
+
+
+@functools.cache
+def _http2_adapter():
+    """经 httpx（HTTP/2）发送请求的 requests 适配器（首次创建 Session 时才定义）
+
+    挂载到 Jina Reader / Firecrawl 等 API 地址：发往同一主机的并发请求复用一个
+    HTTP/2 连接。响应以流的形式返回，原始字节交给 urllib3 解压，解压、大小上限、
+    字节统计和取消（关闭响应即中止读取）与 HTTP/1.1 连接池一致；5xx 按 max_retries
+    重试。verify / cert / proxies 与 requests 的含义相同，每种组合使用一个 httpx 客户端。
+    """
+    import io
+    import ssl
+
+    import httpx
+    import requests
+    from requests.adapters import BaseAdapter, HTTPAdapter
+    from requests.utils import DEFAULT_CA_BUNDLE_PATH, select_proxy
+    from urllib3 import HTTPResponse
+    from urllib3.exceptions import MaxRetryError, ProtocolError, ReadTimeoutError
+
+    class _RawStream(io.RawIOBase):
+        """httpx 响应的线上字节流，读取时才从连接接收数据"""
+
+        def __init__(self, response, url):
+            self._response = response
+            self._chunks = response.iter_raw()
+            self._pending = b""
+            self._url = url
+            self._eof = False
+            self._aborted = False
+
+        def readable(self):
+            return True
+
+        def readinto(self, buffer):
+            while not self._pending:
+                if self._aborted:
+                    raise ProtocolError("响应读取已中止")
+                if self._eof:
+                    return 0
+                try:
+                    self._pending = next(self._chunks)
+                except StopIteration:
+                    self._eof = True
+                    return 0
+                except httpx.TimeoutException as e:
+                    raise ReadTimeoutError(None, self._url, str(e))
+                except (httpx.HTTPError, KeyError) as e:
+                    # 被其他线程关闭（取消）时 httpcore 可能抛出 KeyError
+                    raise ProtocolError(str(e), e)
+            size = min(len(buffer), len(self._pending))
+            buffer[:size] = self._pending[:size]
+            self._pending = self._pending[size:]
+            return size
+
+        def close(self):
+            self._response.close()
+            if self._eof:
+                super().close()
+            else:
+                # 读完之前被关闭（取消或放弃重试）：之后的读取抛出 ProtocolError，
+                # 而不是让 urllib3 当作读取完毕、返回截断的内容
+                self._aborted = True
+
+    class _Http2Adapter(BaseAdapter):
+        def __init__(self, max_retries, keepalive_expiry=30.0, client=None):
+            """
+            Args:
+                client: 自定义 httpx.Client（用于所有请求，忽略 verify / cert / proxies）
+            """
+            super().__init__()
+            self.max_retries = max_retries
+            self.keepalive_expiry = keepalive_expiry
+            self._client = client
+            self._clients = {}  # (verify, cert, 代理) -> httpx.Client
+            self._clients_lock = threading.Lock()
+
+        def send(
+            self,
+            request,
+            stream=False,
+            timeout=None,
+            verify=True,
+            cert=None,
+            proxies=None,
+        ):
+            # 始终流式返回：非流式请求由 requests 读取响应体
+            if isinstance(timeout, tuple):
+                connect, read = timeout
+                timeout = httpx.Timeout(read, connect=connect)
+            client = self._client_for(
+                verify, cert, select_proxy(request.url, proxies or {})
+            )
+            retries = self.max_retries
+            while True:
+                raw = self._send_once(client, request, timeout)
+                has_retry_after = bool(raw.headers.get("Retry-After"))
+                if not retries.is_retry(request.method, raw.status, has_retry_after):
+                    break
+                try:
+                    retries = retries.increment(request.method, request.url, raw)
+                except MaxRetryError as e:
+                    if not retries.raise_on_status:
+                        break
+                    raw.close()
+                    raise requests.exceptions.RetryError(e, request=request)
+                raw.close()
+                retries.sleep(raw)
+            return HTTPAdapter.build_response(self, request, raw)
+
+        def _client_for(self, verify, cert, proxy):
+            if self._client is not None:
+                return self._client
+            if isinstance(cert, list):
+                cert = tuple(cert)
+            key = (verify, cert, proxy)
+            with self._clients_lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = self._clients[key] = httpx.Client(
+                        http2=True,
+                        verify=self._ssl_context(verify, cert),
+                        proxy=proxy,
+                        trust_env=False,  # 代理与证书已由 requests 按环境变量解析
+                        limits=httpx.Limits(
+                            max_connections=None,
+                            max_keepalive_connections=None,
+                            keepalive_expiry=self.keepalive_expiry,
+                        ),
+                    )
+            return client
+
+        @staticmethod
+        def _ssl_context(verify, cert):
+            """按 requests 的 verify / cert 参数构造 SSLContext"""
+            if verify is False:
+                context = ssl.create_default_context()
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            elif isinstance(verify, str) and os.path.isdir(verify):
+                context = ssl.create_default_context(capath=verify)
+            else:
+                cafile = verify if isinstance(verify, str) else DEFAULT_CA_BUNDLE_PATH
+                context = ssl.create_default_context(cafile=cafile)
+            if cert:
+                if isinstance(cert, str):
+                    context.load_cert_chain(cert)
+                else:
+                    context.load_cert_chain(*cert)
+            return context
+
+        @staticmethod
+        def _send_once(client, request, timeout):
+            trace = _current_trace.get()
+            extensions = {"trace": _HttpcoreTrace(trace)} if trace is not None else {}
+            try:
+                response = client.send(
+                    client.build_request(
+                        request.method,
+                        request.url,
+                        headers=request.headers,
+                        content=request.body,
+                        timeout=timeout,
+                        extensions=extensions,
+                    ),
+                    stream=True,
+                )
+            except httpx.TimeoutException as e:
+                raise requests.exceptions.Timeout(e, request=request)
+            except httpx.TransportError as e:
+                raise requests.exceptions.ConnectionError(e, request=request)
+            return HTTPResponse(
+                body=_RawStream(response, request.url),
+                headers=list(response.headers.multi_items()),
+                status=response.status_code,
+                version=20 if response.http_version == "HTTP/2" else 11,
+                version_string=response.http_version,
+                reason=response.reason_phrase,
+                preload_content=False,
+                request_method=request.method,
+                request_url=request.url,
+            )
+
+        def close(self):
+            with self._clients_lock:
+                clients, self._clients = list(self._clients.values()), {}
+            for client in clients:
+                client.close()
+            if self._client is not None:
+                self._client.close()
+
+    return _Http2Adapter
+
+
+@functools.cache
+def _converter_session():
+    """经转换器发送请求的 requests.Session（供 WeSpy 等第三方库使用，首次使用时才定义）
+
+    与转换器的 Session 共享连接池、DNS 缓存和追踪；每个请求经主机限速器发送
+    （429 时退让后重试），超时受当前时间预算约束。
+    """
+    import requests
+
+    class _ConverterSession(requests.Session):
+        def __init__(self, converter):
+            super().__init__()
+            self._converter = converter
+            for prefix, adapter in converter.session.adapters.items():
+                self.mount(prefix, adapter)
+
+        def request(self, method, url, **kwargs):
+            timeout = kwargs.pop("timeout", None) or self._converter.TIMEOUT_REQUESTS
+            send = functools.partial(super().request, method)
+            return self._converter._send(
+                method, url, timeout, "http.request", send=send, **kwargs
+            )
+
+        def close(self):
+            pass  # 适配器属于转换器的 Session，由转换器关闭
+
+    return _ConverterSession
+
+
+@functools.cache
+def _budget_retry():
+    """重试等待受当前时间预算约束的 urllib3 Retry（首次创建 Session 时才定义）
+
+    剩余时间不够退避等待时不再重试；Retry-After 的等待也以剩余时间为上限。
+    """
+    from urllib3.util.retry import Retry
+
+    class _BudgetRetry(Retry):
+        def is_exhausted(self):
+            remaining = _budget_remaining()
+            if remaining is not None and remaining <= self.get_backoff_time():
+                return True
+            return super().is_exhausted()
+
+        def get_retry_after(self, response):
+            retry_after = super().get_retry_after(response)
+            remaining = _budget_remaining()
+            if retry_after is None or remaining is None:
+                return retry_after
+            return min(retry_after, remaining)
+
+    return _BudgetRetry
+
+
+def _locked_cached_property(func):
+    """线程安全的 functools.cached_property：并发的首次访问只创建一次"""
+    name = func.__name__
+    lock = threading.Lock()  # 只在首次创建时争用，各实例共用
+
+    @functools.wraps(func)
+    def get(self):
+        with lock:
+            if name not in self.__dict__:
+                self.__dict__[name] = func(self)
+            return self.__dict__[name]
+
+    return functools.cached_property(get)
+
+
+def _default_cache_dir():
+    """默认缓存目录：$DOCAI_CACHE_DIR 或 $XDG_CACHE_HOME/docai-web2md"""
+    if os.environ.get("DOCAI_CACHE_DIR"):
+        return Path(os.environ["DOCAI_CACHE_DIR"]).expanduser()
+    base = os.environ.get("XDG_CACHE_HOME") or "~/.cache"
+    return Path(base).expanduser() / "docai-web2md"
+
+
+def _normalize_url(url):
+    """规范化 URL 作为缓存键：小写 scheme/host，去掉默认端口和片段，查询参数排序"""
+    parsed = urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme, netloc.rsplit(":", 1)[-1]) in (("http", "80"), ("https", "443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return urlunparse((scheme, netloc, parsed.path or "/", parsed.params, query, ""))
+
+
+class CacheEntry:
+    """缓存条目"""
+
+    __slots__ = ("value", "meta", "fresh")
+
+    def __init__(self, value, meta, fresh):
+        self.value = value  # bytes
+        self.meta = meta  # dict
+        self.fresh = fresh  # 是否仍在 TTL 内
+
+
+class ResultCache:
+    """转换结果磁盘缓存（SQLite 后端）
+
+    同时存放转换结果（按规范化 URL + 模式）与原始 HTTP 响应（带 ETag /
+    Last-Modified，用于条件请求再验证）。每个条目有独立 TTL，总字节数超过
+    max_bytes 时按最近访问时间淘汰（LRU）。
+
+    任何实现了 get / set / delete 的对象都可以作为 WebToMarkdown 的 cache 参数。
+    """
+
+    def __init__(self, path=None, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            path: SQLite 文件路径，默认位于 _default_cache_dir()
+            max_bytes: 缓存总字节数上限
+        """
+        if path is None:
+            path = _default_cache_dir() / "cache.sqlite3"
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, timeout=10
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                meta TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                expires REAL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)"
+        )
+        self._conn.commit()
+
+    def get(self, key, allow_stale=False):
+        """读取条目；过期条目仅在 allow_stale 时返回（用于再验证）"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, meta, expires FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, meta, expires = row
+            fresh = expires is None or expires > now
+            if not fresh and not allow_stale:
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return CacheEntry(bytes(value), json.loads(meta), fresh)
+
+    def set(self, key, value, ttl=None, meta=None):
+        """写入条目
+
+        Args:
+            key: 缓存键
+            value: bytes 或 str（str 以 UTF-8 存储）
+            ttl: 有效期（秒），None 表示不过期（仅受 LRU 淘汰）
+            meta: 附加元数据（可 JSON 序列化）
+        """
+        if isinstance(value, str):
+            value = value.encode("utf-8")
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, value, json.dumps(meta or {}), len(value), expires, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+
+    @contextlib.contextmanager
+    def lock(self, key, timeout=60):
+        """跨进程互斥锁：共享同一缓存目录的进程对同一 key 只转换一次
+
+        基于缓存目录下 locks/ 中的 flock 锁文件；等待超过 timeout 秒后不再等待，
+        照常执行（yield False）。不支持 fcntl 的平台上为空操作。
+
+        Yields:
+            bool: 是否持有锁
+        """
+        try:
+            import fcntl
+        except ImportError:
+            yield False
+            return
+
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        lock_path = self.path.parent / "locks" / f"{digest}.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+        deadline = time.monotonic() + timeout
+        fd = None
+        while fd is None:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                fd = None
+                if time.monotonic() >= deadline:
+                    logger.debug("等待缓存锁超时，不再等待: %s", key)
+                    yield False
+                    return
+                time.sleep(0.05)
+                continue
+            # 持锁方释放时会删除锁文件；拿到的若是已删除的旧文件则重试
+            try:
+                current = os.stat(lock_path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(fd).st_ino:
+                os.close(fd)
+                fd = None
+
+        try:
+            yield True
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(lock_path)
+            os.close(fd)
+
+    def total_bytes(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()[0]
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总字节数降到上限的 90% 以下（调用方持锁）"""
+        total = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute(
+            "SELECT key, size FROM entries ORDER BY accessed ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= target:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# 常见的二级公共后缀，用于推断可注册域名（example.co.uk → example.co.uk）
+_SECOND_LEVEL_SUFFIXES = frozenset(
+    [
+        "co.uk",
+        "org.uk",
+        "ac.uk",
+        "gov.uk",
+        "com.cn",
+        "net.cn",
+        "org.cn",
+        "gov.cn",
+        "edu.cn",
+        "ac.cn",
+        "com.hk",
+        "com.tw",
+        "co.jp",
+        "ne.jp",
+        "or.jp",
+        "co.kr",
+        "com.au",
+        "net.au",
+        "org.au",
+        "com.br",
+        "co.in",
+        "com.sg",
+    ]
+)
+
+
+def _registrable_domain(url):
+    """推断 URL 的可注册域名（如 blog.example.com → example.com）"""
+    host = (urlparse(url).hostname or "").lower().rstrip(".")
+    labels = host.split(".")
+    if len(labels) <= 2 or host.replace(".", "").isdigit():
+        return host
+    if ".".join(labels[-2:]) in _SECOND_LEVEL_SUFFIXES:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+# BackendStats 中记录 Jina 镜像延迟与成功率所用的键（不会与域名冲突）
+_JINA_STATS_KEY = "@jina-mirrors"
+
+
+class BackendStats:
+    """各域名下每个后端的胜率、失败率和延迟统计
+
+    每个域名保留最近 WINDOW 次竞速的胜者，每个后端保留最近 WINDOW 次完成结果
+    （成功与否、耗时）。数据足够时 plan() 给出自适应路由方案。
+    指定 path 时以 JSON 持久化（原子替换写入）。
+    """
+
+    WINDOW = 50
+    MIN_RACES = 5  # 至少观察到这么多次竞速才启用自适应路由
+    MIN_WIN_SHARE = 0.6  # 最优后端的胜出比例下限
+    MIN_SUCCESS_RATE = 0.8  # 最优后端的成功率下限
+    HEDGE_DELAY_RANGE = (0.5, 10.0)  # 对冲延迟（秒）的取值范围
+    SAVE_EVERY = 20  # 每累计这么多次更新写盘一次
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._domains = {}
+        self._dirty = 0
+        if self.path and self.path.exists():
+            try:
+                self._domains = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError) as e:
+                logger.warning("后端统计读取失败，已忽略: %s", e)
+
+    def _domain(self, domain):
+        return self._domains.setdefault(domain, {"wins": [], "backends": {}})
+
+    def record(self, domain, backend, ok, elapsed):
+        """记录一次后端完成结果"""
+        with self._lock:
+            outcomes = self._domain(domain)["backends"].setdefault(backend, [])
+            outcomes.append([1 if ok else 0, round(elapsed, 3)])
+            del outcomes[: -self.WINDOW]
+            self._touch()
+
+    def record_win(self, domain, backend):
+        """记录一次竞速的胜者"""
+        with self._lock:
+            wins = self._domain(domain)["wins"]
+            wins.append(backend)
+            del wins[: -self.WINDOW]
+            self._touch()
+
+    def _touch(self):
+        self._dirty += 1
+        if self.path and self._dirty >= self.SAVE_EVERY:
+            self._save_locked()
+
+    def plan(self, domain, candidates):
+        """给出自适应路由方案
+
+        Returns:
+            dict | None: {后端: 启动延迟秒数或 None}，最优后端立即启动，
+            次优后端在最优后端的 p95 延迟后对冲启动，其余仅在两者都失败后启动；
+            数据不足或没有明显占优的后端时返回 None（全量竞速）
+        """
+        with self._lock:
+            stats = self._domains.get(domain)
+            if not stats or len(stats["wins"]) < self.MIN_RACES:
+                return None
+            wins = Counter(w for w in stats["wins"] if w in candidates)
+            ranked = [name for name, _ in wins.most_common()]
+            if not ranked:
+                return None
+            best = ranked[0]
+            if wins[best] / len(stats["wins"]) < self.MIN_WIN_SHARE:
+                return None
+            outcomes = stats["backends"].get(best, [])
+            latencies = sorted(elapsed for ok, elapsed in outcomes if ok)
+            if not outcomes or len(latencies) / len(outcomes) < self.MIN_SUCCESS_RATE:
+                return None
+
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        low, high = self.HEDGE_DELAY_RANGE
+        delays = {name: None for name in candidates}
+        delays[best] = 0
+        # 次优：其次常胜者，否则按候选顺序取第一个
+        second = next((name for name in ranked[1:] + candidates if name != best), None)
+        if second is not None:
+            delays[second] = min(high, max(low, p95))
+        return delays
+
+    def rank(self, domain, candidates):
+        """按最近成功率（降序）和中位延迟（升序）排列候选后端
+
+        没有记录的候选视为健康，排在有记录的健康后端之后，彼此保持原顺序。
+
+        Returns:
+            list: [(后端, 成功请求的 p95 延迟秒数或 None), ...]
+        """
+        with self._lock:
+            stats = self._domains.get(domain, {}).get("backends", {})
+            outcomes = {name: list(stats.get(name, [])) for name in candidates}
+
+        def key(item):
+            index, name = item
+            results = outcomes[name]
+            if not results:
+                return (-1.0, float("inf"), index)
+            latencies = sorted(elapsed for ok, elapsed in results if ok)
+            success = round(len(latencies) / len(results), 1)
+            median = latencies[len(latencies) // 2] if latencies else float("inf")
+            return (-success, median, index)
+
+        ranked = []
+        for _, name in sorted(enumerate(candidates), key=key):
+            latencies = sorted(elapsed for ok, elapsed in outcomes[name] if ok)
+            p95 = (
+                latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                if latencies
+                else None
+            )
+            ranked.append((name, p95))
+        return ranked
+
+    def save(self):
+        """写盘（未指定 path 时无操作）"""
+        with self._lock:
+            if self.path and self._dirty:
+                self._save_locked()
+
+    def _save_locked(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self._domains), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._dirty = 0
+        except OSError as e:
+            logger.warning("后端统计保存失败: %s", e)
+
+
+def _is_endpoint_failure(status):
+    """HTTP 状态码是否表示服务端点本身不可用（限流、配额、5xx），而非单个 URL 的问题"""
+    return status in (401, 402, 429) or status >= 500
+
+
+def _blames_url(error):
+    """请求异常是否只与单个 URL 有关（如 404），连接错误、超时等归咎于端点"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and not _is_endpoint_failure(status)
+
+
+class CircuitBreakers:
+    """各远程端点（Jina 镜像、Firecrawl）的熔断器
+
+    端点连续失败 failure_threshold 次后熔断（open），冷却期内不再调用；
+    冷却期结束后进入半开（half-open）状态，只放行一个探测请求：探测成功则恢复，
+    失败则重新熔断，冷却期加倍（不超过 max_cooldown）。
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=30.0, max_cooldown=300.0):
+        """
+        Args:
+            failure_threshold: 连续失败多少次后熔断
+            cooldown: 首次熔断的冷却时间（秒）
+            max_cooldown: 冷却时间上限（秒）
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def _endpoint(self, name):
+        return self._endpoints.setdefault(
+            name, {"failures": 0, "trips": 0, "open_until": None, "probing": False}
+        )
+
+    def _state(self, endpoint):
+        if endpoint["open_until"] is None:
+            return "closed"
+        if time.monotonic() < endpoint["open_until"]:
+            return "open"
+        return "half-open"
+
+    def state(self, name):
+        """端点状态：closed / open / half-open"""
+        with self._lock:
+            return self._state(self._endpoint(name))
+
+    def available(self, name):
+        """端点当前是否可调用（不占用半开状态的探测名额）"""
+        with self._lock:
+            endpoint = self._endpoint(name)
+            state = self._state(endpoint)
+            return state == "closed" or (
+                state == "half-open" and not endpoint["probing"]
+            )
+
+    def allow(self, name):
+        """申请调用端点；半开状态下只有第一个调用方获得探测名额
+
+        获准后必须以 record() 报告结果。
+        """
+        with self._lock:
+            endpoint = self._endpoint(name)
+            state = self._state(endpoint)
+            if state == "closed":
+                return True
+            if state == "half-open" and not endpoint["probing"]:
+                endpoint["probing"] = True
+                return True
+            return False
+
+    def record(self, name, ok):
+        """报告一次调用结果；ok 为 None 表示无结论（如被取消），只释放探测名额"""
+        with self._lock:
+            endpoint = self._endpoint(name)
+            probing = endpoint["probing"]
+            endpoint["probing"] = False
+            if ok is None:
+                return
+            if ok:
+                endpoint.update(failures=0, trips=0, open_until=None)
+                if probing:
+                    logger.info("%s 探测成功，熔断恢复", name)
+                return
+            endpoint["failures"] += 1
+            if probing or endpoint["failures"] >= self.failure_threshold:
+                cooldown = min(
+                    self.max_cooldown, self.cooldown * 2 ** endpoint["trips"]
+                )
+                endpoint["trips"] += 1
+                endpoint["open_until"] = time.monotonic() + cooldown
+                logger.warning(
+                    "%s 连续失败 %d 次，熔断 %.0f 秒",
+                    name,
+                    endpoint["failures"],
+                    cooldown,
+                )
+
+    def snapshot(self):
+        """各端点的状态、连续失败次数和剩余冷却秒数"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "state": self._state(endpoint),
+                    "failures": endpoint["failures"],
+                    "retry_in": (
+                        round(max(0.0, endpoint["open_until"] - now), 1)
+                        if endpoint["open_until"] is not None
+                        else 0.0
+                    ),
+                }
+                for name, endpoint in self._endpoints.items()
+            }
+
+
+def _parse_retry_after(value):
+    """解析 Retry-After 响应头（秒数或 HTTP 日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    import email.utils
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class RateLimiter:
+    """按主机的令牌桶限速器，所有并发转换共享
+
+    每个主机（源站、各 Jina 镜像、Firecrawl）一个令牌桶，请求前预约令牌，
+    桶空时按速率排队。默认不限速，可用 limits 为主机配置固定速率。收到 429
+    （或带 Retry-After 的 503）时按 Retry-After（没有时指数退避）暂停该主机的所有请求，
+    并把速率降为当时实际请求速率（或已学到的速率）的一半；之后每次未被限流的响应
+    把速率加回 rate_step（不超过配置速率），再次被限流时再减半（AIMD），
+    从而收敛到端点实际允许的速率。
+    """
+
+    def __init__(
+        self, limits=None, burst=4, min_rate=0.2, rate_step=0.1, max_retry_after=120.0
+    ):
+        """
+        Args:
+            limits: 按主机（含子域名）配置的每秒请求数，如 {"r.jina.ai": 2.0}
+            burst: 令牌桶容量（限速主机允许的突发请求数）
+            min_rate: 限流后速率下限（每秒请求数）
+            rate_step: 每次未被限流的响应恢复的速率（每秒请求数）
+            max_retry_after: 采纳的 Retry-After 上限（秒）
+        """
+        self.limits = dict(limits or {})
+        self.burst = burst
+        self.min_rate = min_rate
+        self.rate_step = rate_step
+        self.max_retry_after = max_retry_after
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _configured_rate(self, host):
+        labels = host.split(".")
+        for i in range(len(labels)):
+            rate = self.limits.get(".".join(labels[i:]))
+            if rate is not None:
+                return rate
+        return None
+
+    def _bucket(self, host):
+        bucket = self._hosts.get(host)
+        if bucket is None:
+            if len(self._hosts) >= 4096:
+                # 只保留受限主机，未限速主机的请求记录可以丢弃
+                self._hosts = {
+                    h: b for h, b in self._hosts.items() if b["rate"] is not None
+                }
+            rate = self._configured_rate(host)
+            bucket = self._hosts[host] = {
+                "rate": rate,
+                "tokens": float(self.burst),
+                "updated": time.monotonic(),
+                "paused_until": 0.0,
+                "strikes": 0,
+                "sent": deque(maxlen=64),
+            }
+        return bucket
+
+    def _wait(self, bucket, now):
+        """按当前状态预约一个令牌需要等待的秒数（先补充令牌）"""
+        if bucket["rate"] is not None:
+            elapsed = max(0.0, now - bucket["updated"])
+            bucket["tokens"] = min(
+                self.burst, bucket["tokens"] + elapsed * bucket["rate"]
+            )
+            bucket["updated"] = max(bucket["updated"], now)
+        wait = max(0.0, bucket["paused_until"] - now)
+        if bucket["rate"] is not None and bucket["tokens"] < 1:
+            wait = max(wait, (1 - bucket["tokens"]) / bucket["rate"])
+        return wait
+
+    def reserve(self, host, max_wait=None):
+        """预约向 host 发送一次请求
+
+        Args:
+            max_wait: 最多愿意等待的秒数，超过时不预约
+
+        Returns:
+            float: 发送前需要等待的秒数；超过 max_wait 时返回 None
+        """
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host)
+            wait = self._wait(bucket, now)
+            if max_wait is not None and wait > max_wait:
+                return None
+            if bucket["rate"] is not None:
+                bucket["tokens"] -= 1
+            bucket["sent"].append(now + wait)
+            return wait
+
+    def delay(self, host):
+        """向 host 发送请求前需要等待的秒数（不预约，供调度排序）"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._hosts.get(host)
+            return 0.0 if bucket is None else self._wait(bucket, now)
+
+    def observe(self, host, status, retry_after=None):
+        """报告一次响应：429 时暂停主机并降低速率，其余响应（未被限流）逐步恢复速率"""
+        pause = _parse_retry_after(retry_after) if status in (429, 503) else None
+        if status != 429 and pause is None:
+            self._recover(host)
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(host)
+            if pause is None:
+                pause = 2.0 ** bucket["strikes"]
+            pause = min(pause, self.max_retry_after)
+            if now < bucket["paused_until"]:
+                # 同一轮限流中其他在途请求的 429：只延长暂停，不重复降速
+                bucket["paused_until"] = max(bucket["paused_until"], now + pause)
+                bucket["updated"] = bucket["paused_until"]
+                return
+            bucket["strikes"] += 1
+            current = bucket["rate"]
+            if current is None:
+                current = self._observed_rate(bucket, now)
+            bucket["rate"] = max(self.min_rate, current / 2)
+            # 暂停期间不积累令牌：恢复时只放行一个请求，之后按新速率发送
+            bucket["paused_until"] = max(bucket["paused_until"], now + pause)
+            bucket["tokens"] = 1.0
+            bucket["updated"] = bucket["paused_until"]
+            rate = bucket["rate"]
+        logger.info(
+            "%s 限流（%s），暂停 %.1f 秒，速率降至 %.2f/s", host, status, pause, rate
+        )
+
+    def _observed_rate(self, bucket, now):
+        """近期实际请求速率：最近 1 秒内发出的请求数"""
+        return max(1, sum(now - 1 < t <= now for t in bucket["sent"]))
+
+    def _recover(self, host):
+        with self._lock:
+            bucket = self._hosts.get(host)
+            if bucket is None or bucket["rate"] is None:
+                return
+            bucket["strikes"] = 0
+            bucket["rate"] += self.rate_step
+            ceiling = self._configured_rate(host)
+            if ceiling is not None:
+                bucket["rate"] = min(bucket["rate"], ceiling)
+
+    def snapshot(self):
+        """受限主机的当前速率和剩余暂停秒数"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                host: {
+                    "rate": round(bucket["rate"], 2),
+                    "paused_for": round(max(0.0, bucket["paused_until"] - now), 1),
+                }
+                for host, bucket in self._hosts.items()
+                if bucket["rate"] is not None
+            }
+
+
+class _BrowserPool:
+    """常驻无头浏览器池
+
+    sync Playwright 对象只能在创建它的线程中使用，因此每个浏览器进程由一个专属
+    工作线程持有，渲染任务通过队列派发给空闲的工作线程。每个任务使用独立的
+    BrowserContext（隔离 Cookie，创建开销为毫秒级），浏览器进程在渲染 N 个页面
+    或浏览器进程树内存超过上限后回收重启。
+    """
+
+    # 启动 Playwright 驱动时串行化，以便按前后子进程的差异识别各工作线程自己的驱动
+    _driver_lock = threading.Lock()
+
+    def __init__(self, max_browsers=2, max_pages=50, max_memory_mb=None):
+        self.max_browsers = max_browsers
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._jobs = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._workers = []
+        self._idle = 0
+        self._inflight = {}
+        self._closed = False
+
+    def render(self, url, render_page, token, timeout=None):
+        """在池中的浏览器上渲染页面
+
+        同一竞速（同一 token）内对同一 URL 的并发渲染会合并为一次。
+
+        Args:
+            url: 页面 URL
+            render_page: 接收 Playwright Page、返回 HTML 的函数
+            token: 当前 _CancelToken
+            timeout: 令牌没有截止时间时的等待上限（秒），None 表示不限
+
+        Returns:
+            str: 渲染后的 HTML
+
+        Raises:
+            TimeoutError: 等待超过 timeout（浏览器卡死或排队过久）
+        """
+        key = (url, id(token))
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("浏览器池已关闭")
+            future = self._inflight.get(key)
+            if future is None:
+                future = Future()
+                self._inflight[key] = future
+                future.add_done_callback(lambda _: self._inflight.pop(key, None))
+                # 渲染在池工作线程中执行，携带调用方的上下文（追踪等）
+                ctx = contextvars.copy_context()
+                self._jobs.put((render_page, token, future, ctx))
+                if self._idle == 0 and len(self._workers) < self.max_browsers:
+                    self._spawn_worker()
+                else:
+                    self._idle -= 1
+
+        remaining = token.remaining()
+        try:
+            return future.result(timeout=timeout if remaining is None else remaining)
+        except TimeoutError:
+            if remaining is not None:
+                raise _Cancelled()
+            future.cancel()  # 仍在排队时不再渲染
+            raise TimeoutError(f"浏览器渲染超时（{timeout} 秒）")
+
+    def _spawn_worker(self):
+        worker = threading.Thread(
+            target=self._worker_loop,
+            name=f"docai-browser-{len(self._workers)}",
+            daemon=True,
+        )
+        self._workers.append(worker)
+        worker.start()
+
+    def _worker_loop(self):
+        """工作线程：持有一个浏览器进程，串行执行渲染任务"""
+        try:
+            from playwright.sync_api import sync_playwright
+        except ImportError as e:
+            self._fail_pending(e)
+            return
+
+        with contextlib.ExitStack() as stack:
+            with self._driver_lock:
+                known = self._driver_pids() if self.max_memory_mb else None
+                p = stack.enter_context(sync_playwright())
+                driver = self._own_driver(known)
+            browser = None
+            pages = 0
+            try:
+                while True:
+                    job = self._jobs.get()
+                    if job is None:
+                        break
+                    render_page, token, future, ctx = job
+                    if not future.set_running_or_notify_cancel():
+                        self._mark_idle()
+                        continue
+                    if token.cancelled:
+                        future.set_exception(_Cancelled())
+                        self._mark_idle()
+                        continue
+
+                    try:
+                        if browser is None:
+                            browser = ctx.run(self._launch, p)
+                            pages = 0
+                        context = browser.new_context()
+                        try:
+                            future.set_result(ctx.run(render_page, context.new_page()))
+                        finally:
+                            context.close()
+                    except BaseException as e:
+                        future.set_exception(e)
+                        if browser is not None and not browser.is_connected():
+                            browser = None  # 浏览器崩溃，下个任务重新启动
+                    pages += 1
+
+                    if browser is not None and self._should_recycle(pages, driver):
+                        logger.info("回收浏览器进程（已渲染 %d 个页面）", pages)
+                        browser.close()
+                        browser = None
+                    self._mark_idle()
+            finally:
+                if browser is not None:
+                    browser.close()
+
+    @staticmethod
+    def _launch(playwright):
+        with _span("browser.launch"):
+            return playwright.chromium.launch()
+
+    def _mark_idle(self):
+        with self._lock:
+            self._idle += 1
+
+    def _should_recycle(self, pages, driver=None):
+        if self.max_pages and pages >= self.max_pages:
+            return True
+        if self.max_memory_mb:
+            rss = self._browser_rss_mb(driver)
+            return rss is not None and rss > self.max_memory_mb
+        return False
+
+    @staticmethod
+    def _driver_pids():
+        """当前进程中以 run-driver 启动的 Playwright 驱动进程 PID，缺少 psutil 时返回 None"""
+        try:
+            import psutil
+        except ImportError:
+            return None
+        try:
+            children = psutil.Process().children()
+        except psutil.Error:
+            return None
+        pids = set()
+        for child in children:
+            try:
+                if "run-driver" in child.cmdline():
+                    pids.add(child.pid)
+            except psutil.Error:
+                continue  # 已退出或无权访问
+        return pids
+
+    def _own_driver(self, known):
+        """启动驱动后新出现的驱动进程 PID（即当前工作线程的驱动），无法确定时返回 None"""
+        if known is None:
+            return None
+        started = self._driver_pids()
+        started = started - known if started is not None else set()
+        if len(started) != 1:
+            logger.debug("未能识别浏览器工作线程的驱动进程: %s", started)
+            return None
+        return started.pop()
+
+    @staticmethod
+    def _browser_rss_mb(driver):
+        """一个工作线程的浏览器进程树（Playwright 驱动及其启动的 Chromium）的常驻内存，MB
+
+        只统计该工作线程的驱动进程（PID 为 driver）及其子进程，不计入其他工作线程
+        的浏览器和进程池等其他子进程；驱动进程未知或已退出时返回 None。
+        """
+        if driver is None:
+            return None
+        try:
+            import psutil
+        except ImportError:
+            return None
+        try:
+            root = psutil.Process(driver)
+            tree = [root, *root.children(recursive=True)]
+        except psutil.Error:
+            return None
+        rss = 0
+        for process in tree:
+            try:
+                rss += process.memory_info().rss
+            except psutil.Error:
+                continue
+        return rss / (1024 * 1024)
+
+    def _fail_pending(self, error):
+        """Playwright 不可用时，让排队中的任务立即失败"""
+        with self._lock:
+            self._workers = [
+                w for w in self._workers if w is not threading.current_thread()
+            ]
+        while True:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None and job[2].set_running_or_notify_cancel():
+                job[2].set_exception(error)
+
+    def close(self):
+        """关闭所有浏览器进程（等待工作线程退出）"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for _ in workers:
+            self._jobs.put(None)
+        for worker in workers:
+            worker.join(timeout=10)
+
+
+class _AsyncBrowserPool:
+    """asyncio 版常驻浏览器池
+
+    async Playwright 的对象绑定在事件循环上，同一浏览器可以并发打开多个页面，
+    不需要专属线程。并发页面数受 max_concurrency 限制；浏览器渲染 N 个页面后，
+    新任务改用新启动的浏览器，旧浏览器在其上的页面全部结束后关闭。
+    """
+
+    def __init__(self, max_concurrency=4, max_pages=50):
+        self.max_concurrency = max_concurrency
+        self.max_pages = max_pages
+        self._playwright = None
+        self._browser = None
+        self._pages = 0
+        self._active = Counter()  # 浏览器 -> 在途页面数
+        self._semaphore = None
+        self._lock = None
+        self._closed = False
+
+    async def render(self, render_page):
+        """在池中的浏览器上渲染页面
+
+        Args:
+            render_page: 接收 Playwright Page、返回 HTML 的协程函数
+
+        Returns:
+            str: 渲染后的 HTML
+        """
+        import asyncio
+
+        if self._closed:
+            raise RuntimeError("浏览器池已关闭")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._lock = asyncio.Lock()
+
+        async with self._semaphore:
+            browser = await self._acquire()
+            try:
+                context = await browser.new_context()
+                try:
+                    return await render_page(await context.new_page())
+                finally:
+                    await context.close()
+            finally:
+                await self._release(browser)
+
+    async def _acquire(self):
+        async with self._lock:
+            if self._browser is not None and not self._browser.is_connected():
+                self._browser = None  # 浏览器崩溃，重新启动
+            if self._browser is None:
+                if self._playwright is None:
+                    from playwright.async_api import async_playwright
+
+                    self._playwright = await async_playwright().start()
+                with _span("browser.launch"):
+                    self._browser = await self._playwright.chromium.launch()
+                self._pages = 0
+            browser = self._browser
+            self._active[browser] += 1
+            self._pages += 1
+            if self.max_pages and self._pages >= self.max_pages:
+                logger.info("回收浏览器进程（已渲染 %d 个页面）", self._pages)
+                self._browser = None  # 后续任务使用新浏览器
+            return browser
+
+    async def _release(self, browser):
+        self._active[browser] -= 1
+        if self._active[browser] == 0 and browser is not self._browser:
+            del self._active[browser]
+            await self._close_browser(browser)
+
+    @staticmethod
+    async def _close_browser(browser):
+        try:
+            await browser.close()
+        except Exception as e:
+            logger.debug("关闭浏览器失败: %s", e)
+
+    async def close(self):
+        """关闭所有浏览器进程和 Playwright 驱动"""
+        self._closed = True
+        browsers = set(self._active)
+        if self._browser is not None:
+            browsers.add(self._browser)
+        self._browser = None
+        self._active.clear()
+        for browser in browsers:
+            await self._close_browser(browser)
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+
+class WebToMarkdown:
+    """网页转 Markdown 转换器（并行优先级方法）"""
+
+    # 超时常量（秒）
+    TIMEOUT_JINA = 8
+    TIMEOUT_FIRECRAWL = 10
+    TIMEOUT_REQUESTS = 15
+    TIMEOUT_PLAYWRIGHT = 15000  # 毫秒
+    TIMEOUT_BROWSER = 60  # 浏览器池中单次渲染的等待上限（含排队与启动浏览器）
+    TIMEOUT_RACE = 30  # 并行竞速的共享截止时间
+    # 单次转换的总时间预算（秒），convert 未指定 deadline 时使用，None 表示不限。
+    # 各后端、重试、渲染和等待都以剩余预算为上限，用尽时返回已得到的最佳结果
+    DEADLINE = None
+    # 渲染等待在预算截止前留出的余量（秒），用于读取已渲染的页面内容
+    RENDER_CONTENT_RESERVE = 0.25
+
+    # Playwright 渲染方式：
+    #   fast: 拦截图片/媒体/字体和跟踪脚本，正文出现且 DOM 稳定后即返回
+    #   full: 加载全部资源，等待 networkidle 后再固定等待 2 秒
+    RENDER_MODE = "fast"
+    # 按域名（含子域名）覆盖渲染设置：{"example.com": {"mode": "full"}}，
+    # 可设置 mode 和 wait_for（就绪判定使用的 CSS 选择器，替代默认正文选择器）
+    RENDER_OVERRIDES = {}
+    # 按域名（含子域名，最具体的优先）的提取配置（见 ExtractionProfile），
+    # 可用 profiles 参数或 $DOCAI_PROFILES（JSON 文件路径）扩充或覆盖
+    # Twitter/X 的 URL 在查找配置前已改写为预览代理（x.com -> fixupx.com，
+    # twitter.com -> fxtwitter.com），转换时生效的是代理主机的配置
+    PROFILES = {
+        "x.com": {"render": "browser"},
+        "twitter.com": {"render": "browser"},
+        "fixupx.com": {"render": "browser"},
+        "fxtwitter.com": {"render": "browser"},
+        "medium.com": {"render": "browser"},
+        "substack.com": {"render": "browser"},
+        "github.com": {"render": "browser"},
+        "reddit.com": {"render": "browser"},
+        "weixin.qq.com": {"render": "static"},
+    }
+    RENDER_SETTLE_QUIET = 0.5  # 正文出现后 DOM 无变化多久（秒）视为就绪
+    RENDER_SETTLE_FALLBACK = 2.0  # 没有正文选择器的页面 DOM 无变化多久视为就绪
+
+    # HTTP 重试：429/5xx 最多重试 2 次。429 由 rate_limiter 按 Retry-After 暂停该主机
+    # 后重试（所有并发转换一起退让），5xx 按指数退避重试
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    RETRY_TOTAL = 2
+
+    USER_AGENT = "Mozilla/5.0 (compatible; DocAI-Converter/1.0)"
+    # HTTP 传输：每个主机保留的 keep-alive 连接数（convert_many 按 max_workers 扩大，
+    # 超出的并发请求不再建连后丢弃）、缓存连接池的主机数、TCP keepalive 探测前的空闲秒数
+    # 与空闲连接的保留时间（异步与 HTTP/2 客户端）
+    HTTP_POOL_MAXSIZE = 16
+    HTTP_POOL_HOSTS = 32
+    HTTP_KEEPALIVE_IDLE = 30
+    HTTP_KEEPALIVE_EXPIRY = 30.0
+    # 一次竞速同时请求的主机数（源站、Jina、Firecrawl），异步连接池按并发转换数乘以该值
+    RACE_HOSTS = 3
+    # Jina Reader 镜像（可用 jina_mirrors 参数或 $DOCAI_JINA_MIRRORS 覆盖）。
+    # 各镜像对冲竞速：近期最快最稳的先发起，超过对冲延迟仍未返回再发起下一个
+    JINA_BASE_URLS = ("https://r.jinaai.cn", "https://r.jina.ai")
+    JINA_HEDGE_DELAY = 1.0  # 首选镜像没有延迟记录时的对冲延迟（秒）
+    JINA_HEDGE_DELAY_RANGE = (0.3, 3.0)  # 按首选镜像 p95 延迟计算的对冲延迟取值范围
+    FIRECRAWL_URL = "https://api.firecrawl.dev/v0/scrape"
+
+    # 自适应路由：即使有足够历史数据，也以该概率走全量竞速以刷新统计
+    EXPLORE_RATE = 0.05
+
+    # 页数达到该值时，PDF 按页段在进程池中并行提取
+    PDF_PARALLEL_MIN_PAGES = 32
+    PDF_PAGES_PER_TASK_MIN = 8
+    # 启用 cpu_offload 时，达到该字符数的 HTML 交给进程池解析（更小的页面不值得跨进程传输）
+    HTML_OFFLOAD_MIN_CHARS = 16 * 1024
+
+    # 各主机是否需要浏览器渲染的判定有效期（秒），启用缓存时跨进程持久化
+    RENDER_DECISION_TTL = 7 * 24 * 3600
+    # 静态抓取的结果达到该字符数即视为内容充实，据此把主机判定为静态
+    RICH_CONTENT_CHARS = 500
+
+    # 直接下载（_get_with_requests）各类内容的大小上限（字节，按解压后计），超过即中止
+    MAX_DOWNLOAD_BYTES = {"html": 20 * 1024 * 1024, "pdf": 200 * 1024 * 1024}
+    DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+    # 缓存有效期（秒）
+    CACHE_TTL = 24 * 3600
+    CACHE_TTL_IMMUTABLE = 30 * 24 * 3600  # 带版本号的 arXiv 论文等不会变化的内容
+    # 条件请求缓存的 PDF 大小上限（字节），更大的 PDF 每次重新下载
+    HTTP_CACHE_PDF_MAX_BYTES = 32 * 1024 * 1024
+    # 等待其他进程转换同一 URL 的最长时间（秒），超时后自行转换
+    CACHE_LOCK_TIMEOUT = 60
+    # 所有方法均失败的 URL 在该时间（秒）内直接返回失败，不再重试
+    NEGATIVE_TTL = 300
+
+    def __init__(
+        self,
+        max_browsers=2,
+        browser_max_pages=50,
+        browser_max_memory_mb=None,
+        cache=None,
+        cpu_workers=None,
+        cpu_offload=False,
+        backend_stats=None,
+        trace_hook=None,
+        circuit_breakers=None,
+        jina_mirrors=None,
+        render_mode=None,
+        render_overrides=None,
+        max_download_bytes=None,
+        rate_limiter=None,
+        pool_maxsize=None,
+        http2=None,
+        profiles=None,
+    ):
+        """
+        Args:
+            cache: 结果缓存（如 ResultCache()），None 表示不缓存
+            cpu_workers: CPU 密集型任务（HTML 解析、PDF 提取）进程池大小，默认 CPU 核数
+            cpu_offload: 为 True 时 HTML 转换与页数较少的 PDF 提取也交给进程池，
+                多个转换的解析不再争用同一个 GIL（适合批量与守护进程；单次转换时
+                进程启动开销大于收益）。页数较多的 PDF 始终按页段并行提取
+            backend_stats: 各域名的后端胜率/延迟统计（BackendStats），
+                默认仅保存在内存中；传入带路径的 BackendStats 可跨进程持久化
+            max_browsers: 浏览器池中常驻浏览器进程数（即最大并发渲染数）
+            browser_max_pages: 单个浏览器渲染多少页面后回收重启
+            browser_max_memory_mb: 单个浏览器进程树的内存上限（需要 psutil），超过即回收
+            trace_hook: 每次转换结束后以 ConversionTrace 调用，用于导出到指标系统；
+                设置后所有转换都会记录追踪
+            circuit_breakers: Jina 镜像与 Firecrawl 的熔断器（CircuitBreakers），
+                默认使用默认阈值新建
+            jina_mirrors: Jina Reader 镜像地址列表（或逗号分隔的字符串），
+                默认读取 $DOCAI_JINA_MIRRORS，均未设置时使用 JINA_BASE_URLS
+            render_mode: Playwright 渲染方式 "fast" / "full"，默认 RENDER_MODE
+            render_overrides: 按域名覆盖渲染设置，与 RENDER_OVERRIDES 合并
+            max_download_bytes: 各类内容的下载大小上限 {"html": 字节, "pdf": 字节}，
+                与 MAX_DOWNLOAD_BYTES 合并
+            rate_limiter: 按主机的限速器（RateLimiter），所有并发转换共享，
+                默认新建（不限速，遇到 429 后按 Retry-After 暂停并学习速率）
+            pool_maxsize: 每个主机的连接池大小，默认 HTTP_POOL_MAXSIZE，
+                convert_many 按 max_workers 自动扩大
+            http2: 是否经 HTTP/2 请求 Jina Reader / Firecrawl（需要 h2），默认关闭
+                （AsyncWebToMarkdown 默认安装了 h2 即启用）
+            profiles: 站点提取配置 {域名: 配置}（或其 JSON 文件路径），与 PROFILES
+                合并，默认读取 $DOCAI_PROFILES
+        """
+        # 从环境变量获取 Firecrawl API 密钥
+        self.firecrawl_api_key = os.environ.get("FIRECRAWL_API_KEY")
+        jina_mirrors = jina_mirrors or os.environ.get("DOCAI_JINA_MIRRORS")
+        if jina_mirrors:
+            if isinstance(jina_mirrors, str):
+                jina_mirrors = jina_mirrors.split(",")
+            self.JINA_BASE_URLS = tuple(
+                m.strip().rstrip("/") for m in jina_mirrors if m.strip()
+            )
+        # 常驻浏览器池：首次渲染时才启动浏览器
+        self.browser_pool = _BrowserPool(
+            max_browsers=max_browsers,
+            max_pages=browser_max_pages,
+            max_memory_mb=browser_max_memory_mb,
+        )
+        self.cache = cache
+        self.cpu_workers = cpu_workers
+        self.cpu_offload = cpu_offload
+        self._process_pool = None
+        self._process_pool_lock = threading.Lock()
+        self._closed = False  # 关闭后不再创建进程池，结果对象的表示在当前进程中生成
+        self.backend_stats = backend_stats or BackendStats()
+        self.trace_hook = trace_hook
+        # 进行中的转换（单飞）：同一 URL + 模式的并发调用共享一次转换
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+        self.circuit_breakers = circuit_breakers or CircuitBreakers()
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.pool_maxsize = pool_maxsize or self.HTTP_POOL_MAXSIZE
+        if http2 and importlib.util.find_spec("h2") is None:
+            raise ImportError("h2 未安装。\n请运行: pip install h2")
+        self.http2 = bool(http2)
+        self.render_mode = render_mode or self.RENDER_MODE
+        self.render_overrides = {**self.RENDER_OVERRIDES, **(render_overrides or {})}
+        profiles = profiles or os.environ.get("DOCAI_PROFILES")
+        if isinstance(profiles, (str, os.PathLike)):
+            with open(profiles, encoding="utf-8") as f:
+                profiles = json.load(f)
+        self.profiles = self._compile_profiles({**self.PROFILES, **(profiles or {})})
+        self.max_download_bytes = {
+            **self.MAX_DOWNLOAD_BYTES,
+            **(max_download_bytes or {}),
+        }
+        # 近期所有方法均失败的转换：{缓存键: 过期时间}
+        self._failures = {}
+        self._failures_lock = threading.Lock()
+        # 各主机是否需要浏览器渲染：{主机: (是否需要, 过期时间)}
+        self._render_hosts = {}
+        self._render_hosts_lock = threading.Lock()
+        self._host_locks = {}  # 未判定主机的首次抓取串行进行
+        self._unserialized_hosts = set()  # 首次抓取未能判定的主机，不再串行
+
+    @_locked_cached_property
+    def session(self):
+        """requests 会话（首次发起请求时创建，并在此时才导入 requests）"""
+        import requests
+
+        from urllib3.util.request import ACCEPT_ENCODING
+
+        session = requests.Session()
+        # 声明 urllib3 能解码的全部压缩格式：gzip、deflate，安装 brotli / zstandard
+        # 后还有 br / zstd
+        session.headers.update(
+            {
+                "User-Agent": self.USER_AGENT,
+                "Accept-Encoding": ", ".join(ACCEPT_ENCODING.split(",")),
+            }
+        )
+        # 配置重试策略：仅针对 5xx，最多 2 次，指数退避（不超出时间预算）；
+        # 429 不在此重试，由 _send 交给 rate_limiter 处理
+        retry = _budget_retry()(
+            total=self.RETRY_TOTAL,
+            backoff_factor=1,
+            status_forcelist=sorted(self.RETRY_STATUSES - {429}),
+            allowed_methods=["HEAD", "GET", "POST"],
+        )
+        adapter = _traced_http_adapter()(
+            max_retries=retry,
+            pool_connections=self.HTTP_POOL_HOSTS,
+            pool_maxsize=self.pool_maxsize,
+            socket_options=_keepalive_socket_options(self.HTTP_KEEPALIVE_IDLE),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if self.http2:
+            # API 请求集中发往少数主机，经 HTTP/2 多路复用同一个连接
+            api = _http2_adapter()(
+                max_retries=retry, keepalive_expiry=self.HTTP_KEEPALIVE_EXPIRY
+            )
+            for prefix in self._api_prefixes():
+                session.mount(prefix, api)
+        return session
+
+    def _api_prefixes(self):
+        """Jina Reader 镜像与 Firecrawl 的地址前缀（挂载 HTTP/2 适配器）"""
+        firecrawl = urlparse(self.FIRECRAWL_URL)
+        return [
+            *(f"{base}/" for base in self.JINA_BASE_URLS),
+            f"{firecrawl.scheme}://{firecrawl.netloc}/",
+        ]
+
+    def _reserve_connections(self, concurrency):
+        """按并发数扩大每个主机的连接池"""
+        if concurrency <= self.pool_maxsize:
+            return
+        self.pool_maxsize = concurrency
+        if "session" in self.__dict__:
+            for adapter in set(self.session.adapters.values()):
+                if hasattr(adapter, "resize"):
+                    adapter.resize(concurrency)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if "session" in self.__dict__:
+            self.session.close()
+        if "_scratch_root" in self.__dict__:
+            shutil.rmtree(self.__dict__.pop("_scratch_root"), ignore_errors=True)
+        self.browser_pool.close()
+        with self._process_pool_lock:
+            self._closed = True
+            pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        self.backend_stats.save()
+
+    def convert(
+        self,
+        url,
+        pure_text=False,
+        use_python=False,
+        refresh=False,
+        trace=None,
+        deadline=None,
+    ):
+        """转换 URL 到 Markdown（并行优先级方法）
+
+        并行发起 Jina Reader / Firecrawl / Python，取最快成功的结果。
+        微信公众号和 --use-python 模式走直连路径。
+
+        Args:
+            url: 网页 URL
+            pure_text: 是否返回纯文本（无格式）
+            use_python: 强制使用Python方法
+            refresh: 忽略已缓存的结果，重新获取并更新缓存
+            trace: ConversionTrace，传入时记录本次转换的分阶段耗时
+            deadline: 总时间预算（秒），默认 DEADLINE。所有后端、重试、渲染和等待
+                共享该预算，用尽时停止并返回已得到的最佳结果（可能为 None）
+
+        Returns:
+            ConvertResult: Markdown 或纯文本内容（str 子类，可按需取得另一种表示、
+            逐页文本和元数据，见 ConvertResult）；所有方法均失败时为 None
+        """
+        url = self._prepare_url(url)
+        with self._tracing(url, trace), self._budget(deadline):
+            key = (self._cache_key(url, pure_text, use_python), refresh)
+            return self._coalesce(
+                key, self._convert, url, pure_text, use_python, refresh
+            )
+
+    @contextlib.contextmanager
+    def _budget(self, deadline, loop=None):
+        """在总时间预算的令牌上下文中执行转换
+
+        截止时间到达时令牌被取消，正在进行的 HTTP 读取和竞速立即中断。同步调用由
+        共用的 _deadline_watcher 线程触发；异步引擎传入事件循环，用 loop.call_later
+        触发，不为每个调用创建线程。
+        """
+        if deadline is None:
+            deadline = self.DEADLINE
+        if deadline is None:
+            yield None
+            return
+
+        token = _CancelToken(deadline=time.monotonic() + deadline)
+        if loop is not None:
+            unwatch = loop.call_later(deadline, token.cancel).cancel
+        else:
+            unwatch = _deadline_watcher.watch(token)
+        reset = _current_token.set(token)
+        try:
+            yield token
+        finally:
+            _current_token.reset(reset)
+            unwatch()
+
+    @staticmethod
+    def _budget_exhausted():
+        """当前时间预算是否已用尽"""
+        token = _current_token.get()
+        return token is not None and token.cancelled
+
+    def _note_budget(self, url):
+        """时间预算已用尽时记录到结果信息中"""
+        if self._budget_exhausted():
+            logger.warning("超出时间预算，返回已得到的结果: %s", url)
+            _record(deadline_exceeded=True)
+
+    def _coalesce(self, key, fn, *args):
+        """单飞：同一 key 的并发调用只执行一次 fn，其余调用方共享结果或异常"""
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+
+        if not leader:
+            logger.debug("合并进行中的转换: %s", key[0])
+            try:
+                result, info = flight.result(timeout=_budget_remaining())
+            except TimeoutError:
+                logger.warning("超出时间预算，不再等待进行中的转换: %s", key[0])
+                _record(deadline_exceeded=True)
+                return None
+            _record(**info, coalesced=True)
+            return result
+
+        # 单独收集本次转换的结果信息，以便转交给等待的调用方
+        info = {}
+        reset = _current_info.set(info)
+        started = time.monotonic()
+        try:
+            result = fn(*args)
+            self._annotate(result, info, started)
+        except BaseException as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result((result, info))
+        finally:
+            _current_info.reset(reset)
+            with self._flights_lock:
+                del self._flights[key]
+            _record(**info)
+        return result
+
+    @staticmethod
+    def _annotate(result, info, started):
+        """为转换结果补充转换信息、耗时和追踪"""
+        if isinstance(result, ConvertResult):
+            result.info = info
+            result.elapsed = time.monotonic() - started
+            result.trace = _current_trace.get()
+
+    def _cached_result(self, entry, pure_text, url):
+        """命中结果缓存：只缓存了所请求的表示，纯文本由 Markdown 提取"""
+        value = entry.value.decode("utf-8")
+
+        def derive(want_text):
+            if want_text and not pure_text:
+                return self._markdown_to_plain_text(value)
+            return None
+
+        content_type = "text/plain" if pure_text else "text/markdown"
+        return ConvertResult(
+            value, pure_text, derive, raw=value, content_type=content_type, url=url
+        )
+
+    @staticmethod
+    def _lazy_result(derive, pure_text, **meta):
+        """以 derive(pure_text) 为值构造 ConvertResult；内容为空时原样返回（视为失败）
+
+        derive 从原始内容生成指定表示，另一种表示在首次访问时再由它生成。
+        """
+        value = derive(pure_text)
+        if not value:
+            return value
+        return ConvertResult(value, pure_text, derive, **meta)
+
+    def _page_result(self, html, pure_text, url):
+        """HTML 页面的转换结果（Markdown / 纯文本按需从 HTML 生成）"""
+        return self._lazy_result(
+            functools.partial(self._html_result, html, profile=self._profile(url)),
+            pure_text,
+            raw=html,
+            content_type="text/html",
+            url=url,
+        )
+
+    def _convert(self, url, pure_text, use_python, refresh):
+        """带结果缓存和失败缓存的转换（url 已校验并完成改写）"""
+        key = self._cache_key(url, pure_text, use_python)
+        if not refresh:
+            if self.cache is not None:
+                entry = self.cache.get(key)
+                if entry is not None:
+                    _record(backend="cache")
+                    return self._cached_result(entry, pure_text, url)
+            if self._failed_recently(key):
+                logger.info("近期所有方法均失败，跳过: %s", url)
+                _record(negative_cached=True)
+                return None
+
+        # 共享缓存目录的其他进程可能正在转换同一 URL：等它写入缓存后直接读取
+        with self._cache_lock(key) as locked:
+            if locked and not refresh:
+                entry = self.cache.get(key)
+                if entry is not None:
+                    _record(backend="cache", coalesced=True)
+                    return self._cached_result(entry, pure_text, url)
+            try:
+                result = self._convert_uncached(url, pure_text, use_python)
+            except _Cancelled:
+                result = None
+            self._note_budget(url)
+            self._store_result(key, url, result, refresh)
+        return result
+
+    def _store_result(self, key, url, result, refresh):
+        """成功结果写入缓存；所有方法均失败时在 NEGATIVE_TTL 内记住失败
+
+        超出时间预算时两者都不写入：返回的只是已得到的结果（如 SPA 外壳的首屏内容），
+        失败也不代表 URL 不可用。
+        """
+        info = _current_info.get() or {}
+        partial = self._budget_exhausted() or info.get("deadline_exceeded")
+        if result:
+            if self.cache is not None and not partial:
+                self.cache.set(key, result, ttl=self._cache_ttl(url))
+            if refresh:
+                self._forget_failure(key)
+            return
+        if partial:
+            return
+
+        expires = time.monotonic() + self.NEGATIVE_TTL
+        with self._failures_lock:
+            if len(self._failures) >= 1024:
+                now = time.monotonic()
+                self._failures = {k: t for k, t in self._failures.items() if t > now}
+            self._failures[key] = expires
+        if self.cache is not None:
+            # 写入共享缓存，同一缓存目录的其他进程也不再重试
+            self.cache.set(f"failed:{key}", b"", ttl=self.NEGATIVE_TTL)
+
+    def _failed_recently(self, key):
+        with self._failures_lock:
+            expires = self._failures.get(key)
+            if expires is not None:
+                if expires > time.monotonic():
+                    return True
+                del self._failures[key]
+        return self.cache is not None and self.cache.get(f"failed:{key}") is not None
+
+    def _forget_failure(self, key):
+        with self._failures_lock:
+            self._failures.pop(key, None)
+        if self.cache is not None:
+            self.cache.delete(f"failed:{key}")
+
+    def _cache_lock(self, key):
+        """缓存支持跨进程锁时（ResultCache.lock）返回该锁，否则为空操作"""
+        lock = getattr(self.cache, "lock", None)
+        if lock is None:
+            return contextlib.nullcontext(False)
+        return lock(key, timeout=_budget_timeout(self.CACHE_LOCK_TIMEOUT))
+
+    @contextlib.contextmanager
+    def _tracing(self, url, trace):
+        """在追踪上下文中执行转换，结束后交给 trace_hook"""
+        if trace is None and self.trace_hook is not None:
+            trace = ConversionTrace()
+        if trace is None:
+            yield None
+            return
+
+        if trace.url is None:
+            trace.url = url
+        reset = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            _current_trace.reset(reset)
+            trace.finish()
+            if self.trace_hook is not None:
+                try:
+                    self.trace_hook(trace)
+                except Exception as e:
+                    logger.warning("trace_hook 失败: %s", e)
+
+    def _prepare_url(self, url):
+        """校验 URL 并完成站点改写（arXiv -> HTML，Twitter/X -> 预览代理）"""
+        url = url.strip()
+
+        # URL 校验
+        parsed = urlparse(url)
+        if parsed.scheme not in ("http", "https") or not parsed.netloc:
+            raise ValueError(f"无效的 URL: {url}")
+
+        # arXiv 特殊处理：转换为 HTML URL
+        if self._is_arxiv(url):
+            url = self._convert_arxiv_to_html(url)
+
+        # 推特 X.com 特殊处理：如果URL是twitter/x.com，转换为fxtwitter/fixupx以获取元数据渲染的内容
+        if self._is_twitter(url):
+            url = self._convert_twitter_to_proxy(url)
+        return url
+
+    def _convert_uncached(self, url, pure_text, use_python):
+        """按站点类型路由到各转换方法（url 已校验并完成 arXiv/Twitter 改写）"""
+        # 微信公众号：优先使用 WeSpy，失败则回退到 Playwright / Python
+        if self._is_wechat(url):
+            result = self._attempt("wespy", self._try_wespy, url, pure_text)
+            if result:
+                _record(backend="wespy")
+                return result
+            result = self._attempt("playwright", self._try_playwright, url, pure_text)
+            if result:
+                _record(backend="playwright")
+                return result
+            _record(backend="python")
+            return self._attempt("python", self._python_convert, url, pure_text)
+
+        # 强制 Python 模式
+        if use_python:
+            if self._is_arxiv(url):
+                _record(backend="arxiv-pdf")
+                return self._attempt("arxiv-pdf", self._handle_arxiv, url, pure_text)
+            _record(backend="python")
+            return self._attempt("python", self._python_convert, url, pure_text)
+
+        # 并行发起多种方法，取最快成功的
+        result = self._parallel_convert(url, pure_text)
+        if result:
+            return result
+
+        # 所有并行方法都失败，arXiv 尝试 PDF 回退
+        if self._is_arxiv(url):
+            _record(backend="arxiv-pdf")
+            return self._attempt("arxiv-pdf", self._handle_arxiv, url, pure_text)
+
+        return None
+
+    @staticmethod
+    def _attempt(name, fn, *args):
+        """运行单个后端并记录其耗时"""
+        with _span("backend", backend=name) as span:
+            result = fn(*args)
+            span["ok"] = bool(result)
+            return result
+
+    def convert_many(
+        self,
+        urls,
+        pure_text=False,
+        use_python=False,
+        max_workers=8,
+        per_host=2,
+        refresh=False,
+        trace=False,
+        deadline=None,
+    ):
+        """批量转换多个 URL，按完成顺序逐条产出结果
+
+        复用同一个转换器（Session、浏览器池），全局并发不超过 max_workers，
+        同一主机的并发不超过 per_host；单个 URL 失败不影响其余 URL。
+        每个主机的连接池至少扩大到 max_workers（Jina 等 API 主机同时承载全部并发）。
+        被限流（rate_limiter 暂停或令牌用尽）的主机的 URL 留在队列中，
+        先派发其他主机的 URL，不让等待限流的任务占用并发名额。
+
+        Args:
+            urls: URL 可迭代对象（可以是逐行读取的文件，空行和 # 注释行会被跳过）
+            pure_text: 是否返回纯文本（无格式）
+            use_python: 强制使用Python方法
+            max_workers: 全局最大并发转换数
+            per_host: 单个主机的最大并发转换数
+            refresh: 忽略已缓存的结果
+            trace: 为 True 时每条结果附带 "trace"（分阶段耗时）
+            deadline: 每个 URL 的总时间预算（秒），从开始转换该 URL 时计算
+
+        Yields:
+            dict: {"url", "ok", "backend", "elapsed", "content", "error"}
+
+        Raises:
+            ValueError: max_workers 或 per_host 小于 1（调用时立即检查）
+        """
+        for name, value in (("max_workers", max_workers), ("per_host", per_host)):
+            if not isinstance(value, int) or value < 1:
+                raise ValueError(f"{name} 应为不小于 1 的整数: {value!r}")
+        return self._convert_many(
+            urls, pure_text, use_python, max_workers, per_host, refresh, trace, deadline
+        )
+
+    def _convert_many(
+        self,
+        urls,
+        pure_text,
+        use_python,
+        max_workers,
+        per_host,
+        refresh,
+        trace,
+        deadline,
+    ):
+        self._reserve_connections(max_workers)
+        urls = iter(urls)
+        waiting = defaultdict(deque)  # 主机 -> 待转换 URL
+        buffered = 0
+        exhausted = False
+        active = Counter()
+        running = {}
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="docai-batch"
+        ) as executor:
+            while True:
+                # 有界预读，支持流式输入
+                while not exhausted and buffered < max_workers * 16:
+                    try:
+                        url = next(urls).strip()
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    if url and not url.startswith("#"):
+                        waiting[self._host(url)].append(url)
+                        buffered += 1
+
+                # 只为未达到单主机并发上限、且未被限流的主机派发任务
+                throttled = []
+                for host in list(waiting):
+                    delay = self.rate_limiter.delay(host)
+                    if delay > 0:
+                        throttled.append(delay)
+                        continue
+                    pending = waiting[host]
+                    while (
+                        pending
+                        and active[host] < per_host
+                        and len(running) < max_workers
+                    ):
+                        url = pending.popleft()
+                        buffered -= 1
+                        active[host] += 1
+                        future = executor.submit(
+                            self._convert_one,
+                            url,
+                            pure_text,
+                            use_python,
+                            refresh,
+                            trace,
+                            deadline,
+                        )
+                        running[future] = host
+                    if not pending:
+                        del waiting[host]
+
+                # 没有在途任务时等到最早解除限流的主机；否则在其解除时重新派发
+                retry_in = min(throttled, default=None)
+                if not running:
+                    if retry_in is None:
+                        break
+                    time.sleep(retry_in)
+                    continue
+
+                done, _ = wait(running, timeout=retry_in, return_when=FIRST_COMPLETED)
+                for future in done:
+                    active[running.pop(future)] -= 1
+                    yield future.result()
+
+    def _cache_key(self, url, pure_text, use_python):
+        """结果缓存键：规范化 URL + 输出模式"""
+        mode = f"{'text' if pure_text else 'md'}-{'python' if use_python else 'auto'}"
+        return f"result:{mode}:{_normalize_url(url)}"
+
+    def _cache_ttl(self, url):
+        """按内容类型决定缓存有效期"""
+        if self._is_arxiv(url) and re.search(r"v\d+(\.pdf)?$", url):
+            return self.CACHE_TTL_IMMUTABLE
+        return self.CACHE_TTL
+
+    def _convert_one(
+        self, url, pure_text, use_python, refresh=False, trace=False, deadline=None
+    ):
+        """转换单个 URL，捕获所有异常并返回结果记录（供批量转换使用）
+
+        trace 为 True 时结果记录中附带 "trace"（ConversionTrace.to_dict()）。
+        """
+        info = {"url": url, "ok": False, "backend": None}
+        reset = _current_info.set(info)
+        started = time.monotonic()
+        conversion_trace = ConversionTrace() if trace else None
+        try:
+            content = self.convert(
+                url,
+                pure_text=pure_text,
+                use_python=use_python,
+                refresh=refresh,
+                trace=conversion_trace,
+                deadline=deadline,
+            )
+            info["ok"] = bool(content)
+            info["content"] = content
+            if content:
+                info["error"] = None
+            elif info.get("deadline_exceeded"):
+                info["error"] = "超出时间预算"
+            else:
+                info["error"] = "所有方法均不可用"
+        except Exception as e:
+            info["content"] = None
+            info["error"] = str(e)
+        finally:
+            _current_info.reset(reset)
+        info["elapsed"] = round(time.monotonic() - started, 3)
+        if conversion_trace is not None:
+            info["trace"] = conversion_trace.to_dict()
+        return info
+
+    def _parallel_convert(self, url, pure_text):
+        """并行尝试多种方法，返回最快成功的结果
+
+        某个域名积累了足够的历史数据后，只启动历史最优的方法，
+        超过其 p95 延迟仍未返回时对冲启动次优方法，两者都失败再回退到全量竞速。
+        """
+        backends = []
+        if self._endpoint_available("jina"):
+            backends.append(("jina", self._try_jina_reader))
+        if self.firecrawl_api_key and self._endpoint_available("firecrawl"):
+            backends.append(("firecrawl", self._try_firecrawl))
+        backends.append(("python", self._python_convert))
+        backends.append(("playwright", self._try_playwright))
+
+        domain = _registrable_domain(url)
+        delays = self._race_delays(domain, [name for name, _ in backends])
+        with _child_token(self.TIMEOUT_RACE) as token:
+            name, result = self._race(
+                [(name, fn, (url, pure_text)) for name, fn in backends],
+                token,
+                delays=delays,
+                observer=lambda backend, ok, elapsed: self.backend_stats.record(
+                    domain, backend, ok, elapsed
+                ),
+            )
+        if result:
+            self.backend_stats.record_win(domain, name)
+            _record(backend=name)
+        return result
+
+    def _endpoint_available(self, backend):
+        """远程后端是否还有未熔断的端点（全部熔断时不参与竞速）"""
+        if backend == "jina":
+            return any(
+                self.circuit_breakers.available(f"jina:{base_url}")
+                for base_url in self.JINA_BASE_URLS
+            )
+        return self.circuit_breakers.available(backend)
+
+    def _race_delays(self, domain, names):
+        """按域名历史统计生成各后端的启动延迟（数据不足或探索时返回 None）"""
+        delays = None
+        if random.random() >= self.EXPLORE_RATE:  # 偶尔全量竞速以刷新统计
+            delays = self.backend_stats.plan(domain, names)
+        if delays:
+            logger.debug("%s 自适应路由: %s", domain, delays)
+        return delays
+
+    def _race(self, backends, token, delays=None, observer=None):
+        """首个成功者胜出的竞速引擎
+
+        每个后端在独立的守护线程中运行，胜者出现后立即返回，
+        并通过 token 向其余后端发出取消信号（中断其 HTTP 读取或浏览器页面），
+        不等待失败方结束。
+
+        Args:
+            backends: [(name, callable, args), ...]
+            token: 共享截止时间的 _CancelToken
+            delays: {name: 秒} 各后端的启动延迟（对冲），在途后端全部失败时提前启动；
+                值为 None 的后端只在其余后端全部失败后启动；未列出的立即启动
+            observer: 后端结束时回调 observer(name, ok, elapsed)，被取消的后端不回调
+
+        Returns:
+            tuple: (胜出后端名, 结果)，全部失败或超时返回 (None, None)
+        """
+        delays = delays or {}
+        started_at = time.monotonic()
+        scheduled = sorted(
+            (b for b in backends if delays.get(b[0], 0) is not None),
+            key=lambda b: delays.get(b[0], 0),
+        )
+        fallback = [b for b in backends if delays.get(b[0], 0) is None]
+        results = queue.SimpleQueue()
+        active = 0
+
+        def launch(name, fn, args):
+            nonlocal active
+            ctx = contextvars.copy_context()
+            threading.Thread(
+                target=ctx.run,
+                args=(self._race_worker, token, results, name, fn, args),
+                name=f"docai-{name}",
+                daemon=True,
+            ).start()
+            active += 1
+
+        try:
+            while True:
+                # 启动到期的后端；在途后端全部失败时不再等待，直接启动下一个
+                while scheduled and (
+                    active == 0
+                    or started_at + delays.get(scheduled[0][0], 0) <= time.monotonic()
+                ):
+                    launch(*scheduled.pop(0))
+                if active == 0:
+                    if not fallback:
+                        break
+                    for entry in fallback:
+                        launch(*entry)
+                    fallback = []
+
+                timeout = token.remaining()
+                if scheduled:
+                    next_start = started_at + delays.get(scheduled[0][0], 0)
+                    until_next = max(0.0, next_start - time.monotonic())
+                    timeout = (
+                        until_next if timeout is None else min(timeout, until_next)
+                    )
+                try:
+                    name, result, elapsed, cancelled = results.get(timeout=timeout)
+                except queue.Empty:
+                    if token.cancelled:
+                        logger.warning("并行转换超时，已取消剩余方法")
+                        break
+                    continue
+
+                active -= 1
+                if observer is not None and not cancelled:
+                    observer(name, bool(result), elapsed)
+                if result:
+                    return name, result
+        finally:
+            token.cancel()
+        return None, None
+
+    @staticmethod
+    def _race_worker(token, results, name, fn, args):
+        """竞速工作线程：在令牌上下文中运行后端，结果放入队列"""
+        _current_token.set(token)
+        result = None
+        started = time.monotonic()
+        try:
+            if not token.cancelled:
+                result = fn(*args)
+        except _Cancelled:
+            logger.debug("%s 已取消", name)
+        except Exception as e:
+            logger.debug("%s 失败: %s", name, e)
+        cancelled = token.cancelled and not result
+        elapsed = time.monotonic() - started
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(
+                "backend",
+                elapsed,
+                start=started,
+                backend=name,
+                ok=bool(result) and not cancelled,
+                cancelled=cancelled,
+            )
+        results.put((name, None if cancelled else result, elapsed, cancelled))
+
+    def _http(self, method, url, timeout, **kwargs):
+        """发起可取消的 HTTP 请求
+
+        超时受当前竞速截止时间约束；响应体以流式读取，
+        读取期间若令牌被取消则关闭底层 socket 立即中断下载。
+        """
+        token = _current_token.get()
+        if token is None:
+            return self._send(method, url, timeout, "http.request", **kwargs)
+
+        with self._http_stream(method, url, timeout, **kwargs) as response:
+            response.content  # 在可中断状态下读取完整响应体
+        token.check()
+        return response
+
+    @contextlib.contextmanager
+    def _http_stream(self, method, url, timeout, **kwargs):
+        """发起流式 HTTP 请求，响应体由调用方在 with 块内读取
+
+        读取期间若当前令牌被取消，底层 socket 被关闭，读取方收到 _Cancelled。
+        """
+        token = _current_token.get()
+        if token is not None:
+            token.check()
+        # 首字节：从发出请求到收到响应头（含建连）
+        response = self._send(method, url, timeout, "http.ttfb", stream=True, **kwargs)
+        unregister = (
+            token.on_cancel(lambda: self._abort_response(response))
+            if token is not None
+            else lambda: None
+        )
+        try:
+            with _span("http.download", url=url) as span:
+                yield response
+                span["bytes"] = _wire_bytes(response)
+                span["encoding"] = response.headers.get("content-encoding")
+        except Exception:
+            if token is not None and token.cancelled:
+                raise _Cancelled()
+            raise
+        finally:
+            unregister()
+            response.close()
+
+    def _send(self, method, url, timeout, span_name, send=None, **kwargs):
+        """经主机限速器发送请求，返回响应（流式请求时尚未读取响应体）
+
+        429 时由 rate_limiter 按 Retry-After 暂停该主机（所有并发转换一起退让），
+        放行后重试，最多 RETRY_TOTAL 次。send 为 send(url, timeout=..., **kwargs)
+        形式的发送函数，默认使用 self.session。
+        """
+        send = send or getattr(self.session, method.lower())
+        host = self._host(url)
+        for attempt in range(self.RETRY_TOTAL + 1):
+            self._throttle(host)
+            with _span(span_name, method=method, url=url) as span:
+                response = send(url, timeout=_budget_timeout(timeout), **kwargs)
+                span["status"] = response.status_code
+                span["version"] = getattr(response.raw, "version_string", None)
+                if not kwargs.get("stream"):
+                    span["bytes"] = _wire_bytes(response)
+                    span["encoding"] = response.headers.get("content-encoding")
+            self.rate_limiter.observe(
+                host, response.status_code, response.headers.get("retry-after")
+            )
+            if response.status_code != 429 or attempt == self.RETRY_TOTAL:
+                break
+            response.close()
+        return response
+
+    def _throttle(self, host):
+        """等待主机限速器放行；等待期间可被取消，需要的等待超出时间预算时放弃"""
+        wait = self.rate_limiter.reserve(host, max_wait=_budget_remaining())
+        if wait is None:
+            logger.debug("%s 限流等待超出时间预算，放弃请求", host)
+            raise _Cancelled()
+        if wait > 0:
+            with _span("http.throttle", host=host, wait=round(wait, 3)):
+                token = _current_token.get()
+                if token is None:
+                    time.sleep(wait)
+                else:
+                    token.sleep(wait)
+
+    @staticmethod
+    def _abort_response(response):
+        """从其他线程中断正在读取的响应（shutdown 可唤醒阻塞的 recv）
+
+        以连接关闭界定长度的响应（HTTP/1.0、Connection: close 且无 Content-Length）
+        的 socket 已交给 http.client 的响应对象，connection.sock 为 None：优先用
+        urllib3 2.x 的 HTTPResponse.shutdown()，否则从响应的底层文件对象取 socket。
+        """
+        raw = getattr(response, "raw", None)
+        shutdown = getattr(raw, "shutdown", None)
+        try:
+            if shutdown is None:
+                raise AttributeError("shutdown")
+            shutdown()
+        except (AttributeError, ValueError, RuntimeError, OSError):
+            sock = getattr(getattr(raw, "connection", None), "sock", None)
+            if sock is None:
+                # http.client.HTTPResponse.fp -> BufferedReader -> SocketIO
+                fp = getattr(getattr(raw, "_fp", None), "fp", None)
+                sock = getattr(getattr(fp, "raw", None), "_sock", None)
+            if sock is not None:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        response.close()
+
+    def _try_jina_reader(self, url, pure_text):
+        """尝试使用 Jina Reader API（各镜像对冲竞速，取最先返回的有效内容）
+
+        用法: https://r.jina.ai/https://www.breezedeus.com/article/ai-agent-context-engineering
+        """
+        names, delays = self._jina_plan()
+        if not names:
+            return None
+
+        # 镜像竞速使用独立令牌，外层竞速取消时一并取消
+        with _child_token(self.TIMEOUT_JINA * len(names)) as token:
+            _, result = self._race(
+                [
+                    (name, self._try_jina_mirror, (name, url, pure_text))
+                    for name in names
+                ],
+                token,
+                delays=delays,
+                observer=self._record_jina_mirror,
+            )
+        return result
+
+    def _jina_plan(self):
+        """镜像竞速方案：按近期成功率和延迟排序未熔断的镜像
+
+        Returns:
+            tuple: (镜像名列表, {镜像名: 启动延迟秒数})，镜像名为 "jina:<地址>"，
+            首选镜像立即启动，其余依次间隔一个对冲延迟启动
+        """
+        names = [
+            f"jina:{base_url}"
+            for base_url in self.JINA_BASE_URLS
+            if self.circuit_breakers.available(f"jina:{base_url}")
+        ]
+        ranked = self.backend_stats.rank(_JINA_STATS_KEY, names)
+        if not ranked:
+            return [], {}
+        p95 = ranked[0][1]
+        low, high = self.JINA_HEDGE_DELAY_RANGE
+        hedge = self.JINA_HEDGE_DELAY if p95 is None else min(high, max(low, p95))
+        return (
+            [name for name, _ in ranked],
+            {name: i * hedge for i, (name, _) in enumerate(ranked)},
+        )
+
+    def _record_jina_mirror(self, name, ok, elapsed):
+        self.backend_stats.record(_JINA_STATS_KEY, name, ok, elapsed)
+
+    def _try_jina_mirror(self, name, url, pure_text):
+        """请求单个 Jina 镜像（name 为 "jina:<地址>"，同时是熔断器名）"""
+        if not self.circuit_breakers.allow(name):
+            logger.debug("Jina Reader 熔断中，跳过 %s", name)
+            return None
+        jina_base_url = name.split(":", 1)[1]
+        ok = None
+        try:
+            response = self._http("GET", f"{jina_base_url}/{url}", self.TIMEOUT_JINA)
+            response.raise_for_status()
+            ok = True
+            return self._lazy_result(
+                functools.partial(self._jina_result, response.text),
+                pure_text,
+                raw=response.text,
+                content_type="text/markdown",
+                url=url,
+            )
+        except Exception as e:
+            if ok is None:
+                ok = _blames_url(e)
+            logger.warning("Jina Reader 失败 (%s): %s", jina_base_url, e)
+        finally:
+            self.circuit_breakers.record(name, ok)
+        return None
+
+    def _jina_result(self, content, pure_text):
+        """校验并整理 Jina Reader 的返回内容，内容过短返回 None"""
+        if content and len(content.strip()) > 50:  # 验证有内容
+            if pure_text:
+                return content
+            # Jina 已经返回不错的 Markdown，稍作清理即可
+            return self._clean_jina_markdown(content)
+        return None
+
+    def _try_firecrawl(self, url, pure_text):
+        """尝试使用 Firecrawl API"""
+        if not self.firecrawl_api_key:
+            logger.info("Firecrawl API 密钥未设置 (FIRECRAWL_API_KEY)")
+            return None
+
+        if not self.circuit_breakers.allow("firecrawl"):
+            logger.debug("Firecrawl 熔断中，跳过")
+            return None
+
+        ok = None
+        try:
+            response = self._http(
+                "POST",
+                self.FIRECRAWL_URL,
+                self.TIMEOUT_FIRECRAWL,
+                headers={"Authorization": f"Bearer {self.firecrawl_api_key}"},
+                json={"url": url, "formats": ["markdown"]},
+            )
+            ok = not _is_endpoint_failure(response.status_code)
+
+            if response.status_code == 200:
+                return self._firecrawl_lazy_result(response.json(), pure_text, url)
+            else:
+                logger.warning("Firecrawl 错误: %s", response.status_code)
+        except Exception as e:
+            if ok is None:
+                ok = _blames_url(e)
+            logger.warning("Firecrawl 失败: %s", e)
+        finally:
+            self.circuit_breakers.record("firecrawl", ok)
+        return None
+
+    def _firecrawl_lazy_result(self, data, pure_text, url):
+        return self._lazy_result(
+            functools.partial(self._firecrawl_result, data),
+            pure_text,
+            raw=data.get("data", {}).get("markdown"),
+            content_type="text/markdown",
+            url=url,
+        )
+
+    def _firecrawl_result(self, data, pure_text):
+        """从 Firecrawl 的 JSON 响应中取出 Markdown"""
+        if data.get("success") and data.get("data", {}).get("markdown"):
+            markdown = data["data"]["markdown"]
+            if pure_text:
+                # 从 Markdown 提取纯文本
+                return re.sub(r"[\*\#\`\[\]\(\)]", "", markdown)
+            return markdown
+        return None
+
+    def _try_playwright(self, url, pure_text):
+        """尝试使用 Playwright 获取动态页面"""
+        try:
+            content = self._get_with_playwright(url)
+            if not content or len(content.strip()) < 50:
+                return None
+            return self._page_result(content, pure_text, url)
+        except Exception as e:
+            logger.warning("Playwright 失败: %s", e)
+        return None
+
+    @_locked_cached_property
+    def wespy_fetcher(self):
+        """复用的 WeSpy ArticleFetcher（首次转换公众号文章时创建，并在此时才导入 WeSpy）
+
+        各线程共享同一个 fetcher（并发的首次访问只创建一次），批量转换的 cookie 与
+        连接池在请求间复用；
+        请求经转换器发送（见 _converter_session），保留 WeSpy 模拟浏览器的请求头，
+        Accept-Encoding 改为本进程能解码的格式。
+        """
+        from wespy import ArticleFetcher
+
+        fetcher = ArticleFetcher()
+        session = _converter_session()(self)
+        session.headers.update(fetcher.session.headers)
+        session.headers["Accept-Encoding"] = self.session.headers["Accept-Encoding"]
+        fetcher.session.close()
+        fetcher.session = session
+        return fetcher
+
+    @_locked_cached_property
+    def _scratch_root(self):
+        """本转换器的暂存目录：优先放在内存文件系统 /dev/shm，关闭转换器时删除"""
+        base = "/dev/shm" if os.access("/dev/shm", os.W_OK) else None
+        return Path(tempfile.mkdtemp(prefix="docai-", dir=base))
+
+    def _try_wespy(self, url, pure_text):
+        """尝试使用 WeSpy 获取微信公众号内容（复用同一个 fetcher，见 _fetch_wespy_markdown）"""
+        try:
+            fetcher = self.wespy_fetcher
+        except ImportError as e:
+            logger.warning("WeSpy 未安装: %s", e)
+            return None
+
+        try:
+            markdown = self._fetch_wespy_markdown(fetcher, url)
+            if not markdown:
+                return None
+
+            return self._lazy_result(
+                functools.partial(self._wespy_result, markdown),
+                pure_text,
+                raw=markdown,
+                content_type="text/markdown",
+                url=url,
+            )
+        except Exception as e:
+            logger.warning("WeSpy 失败: %s", e)
+        return None
+
+    def _fetch_wespy_markdown(self, fetcher, url):
+        """用 WeSpy 获取文章并读回其生成的 Markdown（含标题、作者等信息头）
+
+        WeSpy 只把 Markdown 写入文件：写到本线程复用的暂存目录（优先在内存文件系统
+        /dev/shm 上）后读回并删除，只依赖 fetch_article 的公开参数。
+        正文为空（验证页等）时返回 None，交给后续方法。
+        """
+        output_dir = self._scratch_root / f"wespy-{threading.get_ident()}"
+        article_info = fetcher.fetch_article(
+            url=url,
+            output_dir=str(output_dir),
+            save_markdown=True,
+            save_html=False,
+            save_json=False,
+        )
+        markdown = self._read_wespy_markdown(output_dir)
+        if not isinstance(article_info, dict) or not markdown:
+            return None  # 专辑等非单篇文章页面
+        _, separator, body = markdown.partition("\n---")
+        if separator and not body.strip():
+            return None
+        return markdown
+
+    def _wespy_result(self, markdown, pure_text):
+        if pure_text:
+            return self._markdown_to_plain_text(markdown)
+        return markdown.strip()
+
+    def _python_convert(self, url, pure_text):
+        """Python实现（回退方法）
+
+        是否需要浏览器渲染按主机记录（见 _needs_browser）。未判定的主机不单独发 HEAD
+        探测，而是直接 GET 并从结果中学习；同一主机的首次判定串行进行，
+        批量任务中每个主机只需判定一次。等待期间响应取消信号与时间预算；首次抓取
+        未能判定（失败或被取消）时不再串行，各调用方各自抓取判定。
+        """
+        use_browser = self._needs_browser(url)
+        if use_browser is None:
+            host = self._host(url)
+            with self._render_hosts_lock:
+                lock = None
+                if host not in self._unserialized_hosts:
+                    lock = self._host_locks.setdefault(host, threading.Lock())
+            if lock is not None:
+                self._acquire_cancellable(lock)
+                try:
+                    use_browser = self._needs_browser(url)
+                    if use_browser is None and host not in self._unserialized_hosts:
+                        try:
+                            return self._learn_render_mode(url, pure_text)
+                        finally:
+                            self._release_host_lock(host)
+                finally:
+                    lock.release()
+            if use_browser is None:
+                return self._learn_render_mode(url, pure_text)
+
+        if use_browser:
+            return self._page_result(self._get_with_playwright(url), pure_text, url)
+
+        content, is_pdf = self._get_with_requests(url)
+        if is_pdf:
+            return self._process_spooled_pdf(content, pure_text, url)
+
+        return self._page_result(content, pure_text, url)
+
+    def _learn_render_mode(self, url, pure_text):
+        """抓取未判定主机的页面，并据结果记录该主机是否需要浏览器"""
+        content, is_pdf = self._get_with_requests(url, spa_probe=True)
+        if content is None:  # 响应头显示为 SPA
+            self._remember_render_mode(url, True)
+            return self._page_result(self._get_with_playwright(url), pure_text, url)
+        if is_pdf:
+            return self._process_spooled_pdf(content, pure_text, url)
+
+        result = self._page_result(content, pure_text, url)
+        if not self._is_spa_shell(content, result):
+            self._remember_render_mode(url, False)
+            return result
+        logger.info("静态页面内容单薄且为 SPA 外壳，改用浏览器渲染")
+        try:
+            rendered = self._page_result(self._get_with_playwright(url), pure_text, url)
+        except _Cancelled:
+            logger.info("浏览器渲染未完成（已取消或超出时间预算），使用静态抓取结果")
+            return result
+        except Exception as e:
+            logger.warning("浏览器渲染失败，使用静态抓取结果: %s", e)
+            return result
+        self._remember_render_mode(url, True)
+        return rendered
+
+    def _is_spa_shell(self, html, result):
+        """静态抓取结果内容单薄且页面是 SPA 外壳（如 <div id="root">）"""
+        if result and len(result.strip()) >= self.RICH_CONTENT_CHARS:
+            return False
+        return _SPA_SHELL_RE.search(html) is not None
+
+    def _html_result(self, html, pure_text, profile=None):
+        """HTML 转换为 Markdown 或纯文本（profile 为站点提取配置，None 表示默认）"""
+        if self._offloading() and len(html) >= self.HTML_OFFLOAD_MIN_CHARS:
+            return self._offload("_html_result", html, pure_text, profile)
+        if pure_text:
+            return self._to_plain_text(html, profile)
+        else:
+            return self._to_markdown(html, profile)
+
+    def _handle_arxiv(self, url, pure_text):
+        """arXiv Python回退方法：从HTML URL转为PDF下载"""
+        try:
+            pdf_url = self._convert_arxiv_to_pdf(url)
+            logger.info("arXiv Python回退: 下载PDF %s", pdf_url)
+            pdf_path, _ = self._get_with_requests(pdf_url)
+            return self._process_spooled_pdf(pdf_path, pure_text, pdf_url)
+        except Exception as e:
+            logger.error("arXiv PDF失败: %s", e)
+            return None
+
+    def _clean_jina_markdown(self, markdown):
+        """清理 Jina Reader 返回的 Markdown"""
+        # 移除多余的空行
+        markdown = re.sub(r"\n{3,}", "\n\n", markdown)
+        # 移除行尾空格
+        markdown = re.sub(r" +\n", "\n", markdown)
+        return markdown.strip()
+
+    def _markdown_to_plain_text(self, markdown):
+        """从 Markdown 提取纯文本"""
+        text = re.sub(r"!\[[^\]]*\]\([^\)]*\)", "", markdown)
+        text = re.sub(r"\[([^\]]+)\]\([^\)]*\)", r"\1", text)
+        text = re.sub(r"^#{1,6}\s*", "", text, flags=re.MULTILINE)
+        text = re.sub(r"^[>*-]\s*", "", text, flags=re.MULTILINE)
+        text = re.sub(r"[`*_~]", "", text)
+        text = re.sub(r"\n{3,}", "\n\n", text)
+        return text.strip()
+
+    @staticmethod
+    def _read_wespy_markdown(output_dir):
+        """读取并删除 WeSpy 写入暂存目录的 Markdown 文件"""
+        markdown_files = sorted(Path(output_dir).glob("*.md"))
+        try:
+            if not markdown_files:
+                return None
+            return markdown_files[0].read_text(encoding="utf-8").strip()
+        finally:
+            for path in markdown_files:
+                path.unlink(missing_ok=True)
+
+    def _is_twitter(self, url):
+        """检查是否是推特/X URL"""
+        parsed = urlparse(url)
+        netloc = parsed.netloc.lower()
+        return "twitter.com" in netloc or "x.com" in netloc
+
+    def _convert_twitter_to_proxy(self, url):
+        """转换 Twitter/X URL 到支持元数据预览的 fxtwitter 或 fixupx"""
+        parsed = urlparse(url)
+        netloc = parsed.netloc.lower()
+
+        # 将 twitter.com 替换为 fxtwitter.com, x.com 替换为 fixupx.com
+        if "twitter.com" in netloc:
+            new_netloc = netloc.replace("twitter.com", "fxtwitter.com")
+        elif "x.com" in netloc:
+            new_netloc = netloc.replace("x.com", "fixupx.com")
+        else:
+            return url
+
+        return url.replace(netloc, new_netloc)
+
+    def _is_arxiv(self, url):
+        """检测是否为 arXiv 链接"""
+        return "arxiv.org" in url and (
+            "/abs/" in url or "/pdf/" in url or "/html/" in url
+        )
+
+    def _is_wechat(self, url):
+        """检测是否为微信公众号链接"""
+        return "weixin.qq.com" in url
+
+    def _convert_arxiv_to_html(self, url):
+        """转换 arXiv 链接为 HTML URL"""
+        if "/html/" in url:
+            return url
+        if "/pdf/" in url:
+            paper_id = url.split("/pdf/")[-1].split("?")[0].replace(".pdf", "")
+            return f"https://arxiv.org/html/{paper_id}"
+        paper_id = url.split("/abs/")[-1].split("?")[0]
+        return f"https://arxiv.org/html/{paper_id}"
+
+    def _convert_arxiv_to_pdf(self, url):
+        """转换 arXiv 链接为 PDF URL"""
+        if "/pdf/" in url:
+            return url
+        if "/html/" in url:
+            paper_id = url.split("/html/")[-1].split("?")[0]
+            return f"https://arxiv.org/pdf/{paper_id}.pdf"
+        paper_id = url.split("/abs/")[-1].split("?")[0]
+        return f"https://arxiv.org/pdf/{paper_id}.pdf"
+
+    def _is_known_dynamic_site(self, url):
+        """按站点提取配置的渲染提示判断是否为动态网站（纯函数，无网络调用）"""
+        render = self._profile(url).render
+        if render is None:
+            return None  # 未知，需要探测
+        return render == "browser"
+
+    @staticmethod
+    def _compile_profiles(specs):
+        """编译站点提取配置：{域名: ExtractionProfile}（叠加默认配置）"""
+        profiles = {}
+        for domain, spec in specs.items():
+            try:
+                profile = ExtractionProfile(spec, base=_DEFAULT_PROFILE)
+            except (AttributeError, TypeError, ValueError, re.error) as e:
+                raise ValueError(f"站点提取配置 {domain} 无效: {e}") from e
+            profiles[domain.lower().strip(".")] = profile
+        return profiles
+
+    def _profile(self, url):
+        """URL 对应的提取配置：从完整主机名到父域名，取最具体的站点配置"""
+        labels = (urlparse(url).hostname or "").lower().split(".")
+        for i in range(len(labels)):
+            profile = self.profiles.get(".".join(labels[i:]))
+            if profile is not None:
+                return profile
+        return _DEFAULT_PROFILE
+
+    @staticmethod
+    def _is_spa_response(headers):
+        """根据响应头判断是否为 SPA"""
+        content_type = headers.get("content-type", "").lower()
+        if "application/json" in content_type:
+            return True
+
+        server = headers.get("server", "").lower()
+        if any(s in server for s in ["nextjs", "vercel", "vite"]):
+            return True
+        return False
+
+    def _needs_browser(self, url, read_cache=True):
+        """是否需要浏览器渲染（无网络调用）
+
+        已知站点按提取配置的渲染提示判断，其余按记录的主机判定（内存中，启用缓存且
+        read_cache 为真时也从 ResultCache 读取）；尚未判定时返回 None。
+        """
+        known = self._is_known_dynamic_site(url)
+        if known is not None:
+            return known
+
+        host = self._host(url)
+        with self._render_hosts_lock:
+            entry = self._render_hosts.get(host)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        if self.cache is None or not read_cache:
+            return None
+        cached = self.cache.get(f"render:{host}")
+        if cached is None:
+            return None
+        use_browser = cached.value == b"browser"
+        with self._render_hosts_lock:
+            self._render_hosts[host] = (
+                use_browser,
+                time.monotonic() + self.RENDER_DECISION_TTL,
+            )
+        return use_browser
+
+    def _remember_render_mode(self, url, use_browser):
+        """记录主机是否需要浏览器渲染（判定未变化时不重复写入）"""
+        host = self._host(url)
+        expires = time.monotonic() + self.RENDER_DECISION_TTL
+        with self._render_hosts_lock:
+            previous = self._render_hosts.get(host)
+            self._render_hosts[host] = (use_browser, expires)
+            self._unserialized_hosts.discard(host)
+        if previous is not None and previous[0] == use_browser:
+            return
+        logger.debug("%s 判定为%s", host, "动态页面" if use_browser else "静态页面")
+        if self.cache is not None:
+            self.cache.set(
+                f"render:{host}",
+                b"browser" if use_browser else b"static",
+                ttl=self.RENDER_DECISION_TTL,
+            )
+
+    def _release_host_lock(self, host):
+        """首次抓取结束后移除主机的锁（仍在等待的调用方持有引用，获得锁后重新检查）
+
+        未能判定时把主机记为不再串行：等待中和之后的调用方各自抓取，
+        避免失败或很慢的主机把所有 URL 排成一队。
+        """
+        with self._render_hosts_lock:
+            self._host_locks.pop(host, None)
+            if host not in self._render_hosts:
+                if len(self._unserialized_hosts) >= 1024:
+                    self._unserialized_hosts.clear()
+                self._unserialized_hosts.add(host)
+
+    @staticmethod
+    def _acquire_cancellable(lock):
+        """获取锁，等待期间响应当前令牌的取消信号（含时间预算到期）"""
+        token = _current_token.get()
+        if token is None:
+            lock.acquire()
+            return
+        while not lock.acquire(timeout=0.25):
+            token.check()
+
+    @staticmethod
+    def _host(url):
+        return (urlparse(url).hostname or "").lower()
+
+    def _get_with_requests(self, url, spa_probe=False):
+        """使用 requests 获取静态页面或 PDF
+
+        响应体流式读取（见 _read_body）：PDF 写入临时文件，HTML 增量解码，
+        不支持的内容类型和超过大小上限的响应立即中止。
+        配置了缓存时用 ETag / Last-Modified 发起条件请求，304 时直接复用缓存内容
+        （PDF 写回临时文件）。
+
+        Args:
+            spa_probe: 为 True 时，响应头显示为 SPA 则不读取响应体，返回 (None, False)
+
+        Returns:
+            tuple: (content, is_pdf) - content 为 Path(PDF 临时文件，调用方负责删除)
+            或 str(HTML)
+        """
+        key = f"http:{_normalize_url(url)}"
+        cached = self.cache.get(key, allow_stale=True) if self.cache else None
+        headers = {}
+        if cached is not None:
+            if cached.meta.get("etag"):
+                headers["If-None-Match"] = cached.meta["etag"]
+            if cached.meta.get("last_modified"):
+                headers["If-Modified-Since"] = cached.meta["last_modified"]
+
+        with self._http_stream(
+            "GET", url, self.TIMEOUT_REQUESTS, headers=headers
+        ) as response:
+            if cached is not None and response.status_code == 304:
+                _record(revalidated=True)
+                return self._decode_cached_http(cached, url)
+            response.raise_for_status()
+            if spa_probe and self._is_spa_response(response.headers):
+                return None, False
+            content, is_pdf = self._read_body(response, url)
+            self._store_http(key, response, content, is_pdf)
+            return content, is_pdf
+
+    def _store_http(self, key, response, content, is_pdf=False):
+        """缓存带 ETag / Last-Modified 的响应
+
+        HTML 以 UTF-8 保存解码后的文本；PDF 保存临时文件的内容，
+        超过 HTTP_CACHE_PDF_MAX_BYTES 的不缓存。
+        """
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+        if self.cache is None or not (etag or last_modified):
+            return
+        if is_pdf:
+            if content.stat().st_size > self.HTTP_CACHE_PDF_MAX_BYTES:
+                return
+            content = content.read_bytes()
+        self.cache.set(
+            key,
+            content,
+            meta={
+                "etag": etag,
+                "last_modified": last_modified,
+                "is_pdf": is_pdf,
+                "encoding": "utf-8",
+            },
+        )
+
+    def _read_body(self, response, url):
+        """流式读取响应体，内存占用受大小上限约束
+
+        按首个数据块的魔数判断类型：PDF 边下载边写入临时文件，HTML 按字符集增量解码，
+        其他二进制内容立即中止；累计字节数（解压后）超过该类型的上限时中止。
+
+        Returns:
+            tuple: (Path 或 str, is_pdf)
+        """
+        token = _current_token.get()
+        chunks = iter(response.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE))
+        head = next(chunks, b"")
+        kind, limit, decoder = self._body_plan(response, url, head)
+        if kind == "pdf":
+            body = itertools.chain([head], chunks)
+            return self._spool_to_file(body, limit, url), True
+
+        parts = []
+        received = 0
+        for chunk in itertools.chain([head], chunks):
+            if token is not None:
+                token.check()
+            received += len(chunk)
+            self._check_download_size(received, limit, url)
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts), False
+
+    def _body_plan(self, response, url, head):
+        """按首块内容确定类型、大小上限和（HTML 的）增量解码器，不支持的类型抛出 ValueError"""
+        content_type = response.headers.get("content-type", "")
+        kind = _sniff_content(head)
+        if kind is None:
+            raise ValueError(f"不支持的内容类型（{content_type or '未知'}）: {url}")
+        limit = self.max_download_bytes[kind]
+        declared = response.headers.get("content-length", "")
+        if declared.isdigit():
+            self._check_download_size(int(declared), limit, url)
+        if kind == "pdf":
+            return kind, limit, None
+        encoding = _html_encoding(content_type, head)
+        return kind, limit, codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    @staticmethod
+    def _check_download_size(size, limit, url):
+        if size > limit:
+            raise ValueError(
+                f"响应超过大小上限 {limit // (1024 * 1024)} MB，已中止: {url}"
+            )
+
+    def _decode_cached_http(self, entry, url):
+        """把缓存的响应还原为 _get_with_requests 的返回值（PDF 写入临时文件）"""
+        if entry.meta.get("is_pdf"):
+            limit = self.max_download_bytes["pdf"]
+            return self._spool_to_file([entry.value], limit, url), True
+        encoding = entry.meta.get("encoding") or "utf-8"
+        return entry.value.decode(encoding, errors="replace"), False
+
+    def _spool_to_file(self, chunks, limit, url, suffix=".pdf"):
+        """把数据块写入临时文件，返回文件路径（超过 limit 字节时中止并删除）"""
+        token = _current_token.get()
+        received = 0
+        with tempfile.NamedTemporaryFile(
+            prefix="docai-", suffix=suffix, delete=False
+        ) as f:
+            try:
+                for chunk in chunks:
+                    if token is not None:
+                        token.check()
+                    received += len(chunk)
+                    self._check_download_size(received, limit, url)
+                    f.write(chunk)
+            except BaseException:
+                f.close()
+                Path(f.name).unlink(missing_ok=True)
+                raise
+        return Path(f.name)
+
+    def _process_spooled_pdf(self, path, pure_text, url=None):
+        """处理下载到临时文件的 PDF
+
+        临时文件随结果对象一起保留（另一种表示与逐页文本按需再提取），
+        结果对象被回收时删除；处理失败时立即删除。
+        """
+        try:
+            result = self._lazy_result(
+                functools.partial(self._process_pdf, path),
+                pure_text,
+                raw=path,
+                content_type="application/pdf",
+                url=url,
+                pages=functools.partial(self.iter_pdf_pages, path),
+            )
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        if isinstance(result, ConvertResult):
+            weakref.finalize(result, path.unlink, missing_ok=True)
+        else:
+            path.unlink(missing_ok=True)
+        return result
+
+    def _process_pdf(self, pdf_content, pure_text=False):
+        """处理 PDF 内容，返回 Markdown 或纯文本
+
+        Args:
+            pdf_content: PDF 的 bytes 或文件路径（按路径打开，不整体读入内存）
+            pure_text: 是否返回纯文本（无格式）
+        """
+        fitz = _import_fitz()
+
+        try:
+            with _open_pdf(fitz, pdf_content) as doc:
+                metadata = doc.metadata
+                page_count = doc.page_count
+        except Exception as e:
+            raise Exception(f"PDF 处理失败: {e}")
+
+        if page_count < self.PDF_PARALLEL_MIN_PAGES and self._offloading():
+            # 整份交给一个子进程；页数较多时由 _iter_pdf_pages 按页段并行
+            if not isinstance(pdf_content, (bytes, bytearray)):
+                pdf_content = str(pdf_content)
+            return self._offload("_process_pdf", pdf_content, pure_text)
+
+        try:
+            # 提取全文（按页序拼接，避免重复的字符串累加）
+            parts = []
+            first_page_text = None
+            for page_num, page_text in self._iter_pdf_pages(pdf_content, page_count):
+                if page_num == 1:
+                    first_page_text = page_text
+                if page_text.strip():
+                    parts.append(f"--- Page {page_num} ---\n\n{page_text}\n\n")
+            text = "".join(parts).strip()
+
+            if pure_text:
+                return text
+
+            # 提取标题（复用已提取的第一页文本）
+            title = None
+            if metadata and metadata.get("title"):
+                title = metadata["title"]
+            elif first_page_text is not None:
+                lines = [
+                    line.strip() for line in first_page_text.split("\n") if line.strip()
+                ]
+                if lines:
+                    title = " ".join(lines[:2])
+
+            if title:
+                return f"# {title}\n\n{text}"
+            return text
+        except _Cancelled:
+            raise
+        except Exception as e:
+            raise Exception(f"PDF 处理失败: {e}")
 
-    def convert(self, url, pure_text=False, use_python=False):
-        """转换 URL 到 Markdown（并行优先级方法）
+    def iter_pdf_pages(self, pdf_content):
+        """按页序逐页产出 PDF 文本，调用方可在最后一页完成前开始处理
 
-        并行发起 Jina Reader / Firecrawl / Python，取最快成功的结果。
-        微信公众号和 --use-python 模式走直连路径。
+        页数较多时按页段分发到进程池并行提取。
 
         Args:
-            url: 网页 URL
-            pure_text: 是否返回纯文本（无格式）
-            use_python: 强制使用Python方法
+            pdf_content: PDF 的 bytes 或文件路径
 
-        Returns:
-            str: Markdown 或纯文本内容
+        Yields:
+            tuple: (页码（从 1 开始）, 页面文本)
         """
-        url = url.strip()
-
-        # URL 校验
-        parsed = urlparse(url)
-        if parsed.scheme not in ("http", "https") or not parsed.netloc:
-            raise ValueError(f"无效的 URL: {url}")
-
-        # arXiv 特殊处理：转换为 HTML URL
-        if self._is_arxiv(url):
-            url = self._convert_arxiv_to_html(url)
+        fitz = _import_fitz()
+        with _open_pdf(fitz, pdf_content) as doc:
+            page_count = doc.page_count
+        yield from self._iter_pdf_pages(pdf_content, page_count)
 
-        # 微信公众号：优先使用 WeSpy，失败则回退到 Playwright / Python
-        if self._is_wechat(url):
-            result = self._try_wespy(url, pure_text)
-            if result:
-                return result
-            result = self._try_playwright(url, pure_text)
-            if result:
-                return result
-            return self._python_convert(url, pure_text)
+    def _iter_pdf_pages(self, pdf_content, page_count):
+        workers = self.cpu_workers or os.cpu_count() or 1
+        if page_count < self.PDF_PARALLEL_MIN_PAGES or workers < 2 or self._closed:
+            yield from self._iter_pdf_pages_local(pdf_content, 0, page_count)
+            return
 
-        # 推特 X.com 特殊处理：如果URL是twitter/x.com，转换为fxtwitter/fixupx以获取元数据渲染的内容
-        if self._is_twitter(url):
-            url = self._convert_twitter_to_proxy(url)
+        # 子进程按路径打开同一文件，bytes 先落盘以免整份复制给每个进程
+        spooled = None
+        if isinstance(pdf_content, (bytes, bytearray, memoryview)):
+            with tempfile.NamedTemporaryFile(
+                prefix="docai-", suffix=".pdf", delete=False
+            ) as f:
+                f.write(pdf_content)
+            spooled = pdf_content = Path(f.name)
 
-        # 强制 Python 模式
-        if use_python:
-            if self._is_arxiv(url):
-                return self._handle_arxiv(url, pure_text)
-            return self._python_convert(url, pure_text)
+        chunk = max(
+            self.PDF_PAGES_PER_TASK_MIN, -(-page_count // (workers * 4))
+        )  # 向上取整
+        pool = self._get_process_pool()
+        from concurrent.futures.process import BrokenProcessPool
 
-        # 并行发起多种方法，取最快成功的
-        result = self._parallel_convert(url, pure_text)
-        if result:
-            return result
+        futures = [
+            pool.submit(
+                _extract_pdf_pages,
+                str(pdf_content),
+                start,
+                min(start + chunk, page_count),
+            )
+            for start in range(0, page_count, chunk)
+        ]
+        token = _current_token.get()
+        page_num = 0
+        try:
+            trace = _current_trace.get()
+            for future in futures:
+                for page_text, duration in future.result():
+                    page_num += 1
+                    if trace is not None:
+                        trace.add("pdf.page", duration, page=page_num, process=True)
+                    yield page_num, page_text
+                if token is not None:
+                    token.check()
+        except BrokenProcessPool:
+            # 子进程异常退出（内存不足、解析崩溃）：重建进程池，余下页面在当前进程中提取
+            logger.warning("进程池子进程异常退出，余下的 PDF 页面在当前进程中提取")
+            self._reset_process_pool(pool)
+            yield from self._iter_pdf_pages_local(pdf_content, page_num, page_count)
+        finally:
+            for future in futures:
+                future.cancel()
+            if spooled is not None:
+                wait(futures)
+                spooled.unlink(missing_ok=True)
 
-        # 所有并行方法都失败，arXiv 尝试 PDF 回退
-        if self._is_arxiv(url):
-            return self._handle_arxiv(url, pure_text)
+    def _iter_pdf_pages_local(self, pdf_content, start, page_count):
+        """在当前进程中逐页提取 [start, page_count) 的文本"""
+        token = _current_token.get()
+        fitz = _import_fitz()
+        with _open_pdf(fitz, pdf_content) as doc:
+            for index in range(start, page_count):
+                if token is not None:
+                    token.check()
+                with _span("pdf.page", page=index + 1):
+                    page_text = doc[index].get_text()
+                yield index + 1, page_text
 
-        return None
+    def _get_process_pool(self):
+        """CPU 密集型任务使用的常驻进程池（首次使用时创建，子进程预先导入解析库）"""
+        with self._process_pool_lock:
+            if self._process_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
 
-    def _parallel_convert(self, url, pure_text):
-        """并行尝试多种方法，返回最快成功的结果"""
-        futures = {}
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            futures[executor.submit(self._try_jina_reader, url, pure_text)] = "jina"
-
-            if self.firecrawl_api_key:
-                futures[executor.submit(self._try_firecrawl, url, pure_text)] = (
-                    "firecrawl"
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.cpu_workers or os.cpu_count(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
                 )
+            return self._process_pool
 
-            futures[executor.submit(self._python_convert, url, pure_text)] = "python"
-            futures[executor.submit(self._try_playwright, url, pure_text)] = (
-                "playwright"
-            )
+    def _reset_process_pool(self, pool):
+        """丢弃已损坏的进程池（子进程异常退出后不再接受任务），下次使用时重建"""
+        with self._process_pool_lock:
+            if self._process_pool is pool:
+                self._process_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
 
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                except Exception:
-                    continue
-                if result:
-                    for f in futures:
-                        f.cancel()
-                    return result
-        return None
+    def _offloading(self):
+        # 关闭之后（如访问结果对象的其他表示）在当前进程中处理，不重建进程池
+        return (
+            not self._closed
+            and self.cpu_offload
+            and (self.cpu_workers or os.cpu_count() or 1) > 1
+        )
 
-    def _try_jina_reader(self, url, pure_text):
-        """尝试使用 Jina Reader API
+    def _offload(self, method, *args):
+        """在进程池中执行 CPU 密集型方法，等待期间响应取消信号
 
-        用法: https://r.jina.ai/https://www.breezedeus.com/article/ai-agent-context-engineering
+        子进程记录的阶段并入当前追踪（标记 process=True）。
         """
-        jina_base_urls = ["https://r.jinaai.cn", "https://r.jina.ai"]
+        token = _current_token.get()
+        trace = _current_trace.get()
+        pool = self._get_process_pool()
+        from concurrent.futures.process import BrokenProcessPool
+
+        future = None
         try:
-            for jina_base_url in jina_base_urls:
-                jina_url = f"{jina_base_url}/{url}"
+            future = pool.submit(_run_in_worker, method, args, trace is not None)
+            while True:
+                if token is not None:
+                    token.check()
                 try:
-                    response = self.session.get(jina_url, timeout=self.TIMEOUT_JINA)
-                    response.raise_for_status()
-
-                    content = response.text
-                    if content and len(content.strip()) > 50:  # 验证有内容
-                        if pure_text:
-                            return content
-                        # Jina 已经返回不错的 Markdown，稍作清理即可
-                        return self._clean_jina_markdown(content)
-                except Exception as e:
-                    logger.warning("Jina Reader 失败 (%s): %s", jina_base_url, e)
-        except Exception as e:
-            logger.warning("Jina Reader 失败: %s", e)
-        return None
+                    result, started, spans = future.result(timeout=0.25)
+                    break
+                except TimeoutError:
+                    continue
+        except BrokenProcessPool:
+            # 子进程异常退出（内存不足、解析崩溃）：重建进程池，本次在当前进程中执行
+            logger.warning("进程池子进程异常退出，%s 改在当前进程中执行", method)
+            self._reset_process_pool(pool)
+            return getattr(_local_converter(), method)(*args)
+        finally:
+            if future is not None:
+                future.cancel()
 
-    def _try_firecrawl(self, url, pure_text):
-        """尝试使用 Firecrawl API"""
-        if not self.firecrawl_api_key:
-            logger.info("Firecrawl API 密钥未设置 (FIRECRAWL_API_KEY)")
-            return None
+        for span in spans:
+            attrs = {**span, "process": True}
+            name, duration = attrs.pop("name"), attrs.pop("duration")
+            trace.add(name, duration, start=started + attrs.pop("start"), **attrs)
+        return result
 
+    def _get_with_playwright(self, url):
+        """使用 Playwright 获取动态页面（在常驻浏览器池中渲染）"""
         try:
-            response = self.session.post(
-                "https://api.firecrawl.dev/v0/scrape",
-                headers={"Authorization": f"Bearer {self.firecrawl_api_key}"},
-                json={"url": url, "formats": ["markdown"]},
-                timeout=self.TIMEOUT_FIRECRAWL,
+            import playwright.sync_api  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "Playwright 未安装。\n"
+                "请运行: pip install playwright && playwright install chromium"
             )
 
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("success") and data.get("data", {}).get("markdown"):
-                    markdown = data["data"]["markdown"]
-                    if pure_text:
-                        # 从 Markdown 提取纯文本
-                        return re.sub(r"[\*\#\`\[\]\(\)]", "", markdown)
-                    return markdown
-            else:
-                logger.warning("Firecrawl 错误: %s", response.status_code)
-        except Exception as e:
-            logger.warning("Firecrawl 失败: %s", e)
-        return None
+        token = _current_token.get() or _CancelToken()
+        token.check()
+        return self.browser_pool.render(
+            url,
+            lambda page: self._render_page(page, url, token),
+            token,
+            timeout=self.TIMEOUT_BROWSER,
+        )
 
-    def _try_playwright(self, url, pure_text):
-        """尝试使用 Playwright 获取动态页面"""
-        try:
-            content = self._get_with_playwright(url)
-            if not content or len(content.strip()) < 50:
-                return None
-            if pure_text:
-                return self._to_plain_text(content)
-            return self._to_markdown(content)
-        except Exception as e:
-            logger.warning("Playwright 失败: %s", e)
-        return None
+    def _render_options(self, url):
+        """当前 URL 的渲染设置：默认值依次叠加父域名到完整主机名的覆盖"""
+        options = {"mode": self.render_mode, "wait_for": None}
+        labels = (urlparse(url).hostname or "").lower().split(".")
+        for i in range(len(labels) - 1, -1, -1):
+            options.update(self.render_overrides.get(".".join(labels[i:]), {}))
+        return options
 
-    def _try_wespy(self, url, pure_text):
-        """尝试使用 WeSpy 获取微信公众号内容"""
-        try:
-            from wespy import ArticleFetcher
-        except ImportError as e:
-            logger.warning("WeSpy 未安装: %s", e)
-            return None
+    @staticmethod
+    def _route_request(route):
+        """快速渲染模式的请求拦截"""
+        request = route.request
+        if _is_blocked_request(request.resource_type, request.url):
+            route.abort()
+        else:
+            route.continue_()
 
-        try:
-            fetcher = ArticleFetcher()
-            with tempfile.TemporaryDirectory() as output_dir:
-                article_info = fetcher.fetch_article(
-                    url=url,
-                    output_dir=output_dir,
-                    save_markdown=True,
-                    save_html=False,
-                    save_json=False,
-                )
-                if not article_info:
-                    return None
+    def _render_page(self, page, url, token):
+        """在浏览器页面中导航并等待渲染完成，返回 HTML（在池工作线程中执行）"""
+        from playwright.sync_api import Error as PlaywrightError
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 
-                markdown = self._read_wespy_markdown(output_dir, article_info)
-                if not markdown:
-                    return None
+        # 微信公众号使用移动 UA
+        if "weixin.qq.com" in url:
+            page.set_extra_http_headers(
+                {
+                    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0) AppleWebKit/605.1.15"
+                }
+            )
+        options = self._render_options(url)
+        fast = options["mode"] == "fast"
+        if fast:
+            page.route("**/*", self._route_request)
 
-                if pure_text:
-                    return self._markdown_to_plain_text(markdown)
-                return markdown.strip()
-        except Exception as e:
-            logger.warning("WeSpy 失败: %s", e)
-        return None
+        # 渲染等待在截止前留出余量，超出时间预算时返回已渲染的内容
+        budget = token.timeout(self.TIMEOUT_PLAYWRIGHT / 1000)
+        settle_deadline = time.monotonic() + budget - self.RENDER_CONTENT_RESERVE
+        with _span("browser.navigate", url=url):
+            page.goto(url, wait_until="domcontentloaded", timeout=budget * 1000)
+        # 分片等待，每片之间检查取消信号
+        with _span("browser.settle", url=url, mode=options["mode"]):
+            if fast:
+                tracker = _SettleTracker(
+                    self.RENDER_SETTLE_QUIET, self.RENDER_SETTLE_FALLBACK
+                )
+                selector = options["wait_for"] or self._profile(url).content_css
+                while time.monotonic() < settle_deadline:
+                    token.check()
+                    try:
+                        if tracker.ready(page.evaluate(_SNAPSHOT_JS, selector)):
+                            break
+                    except PlaywrightError as e:  # 页面跳转中，执行上下文被销毁
+                        logger.debug("页面快照失败: %s", e)
+                    page.wait_for_timeout(250)
+            else:
+                while time.monotonic() < settle_deadline:
+                    token.check()
+                    try:
+                        page.wait_for_load_state("networkidle", timeout=250)
+                        break
+                    except PlaywrightTimeoutError:
+                        continue
+                # 页面稳定后再固定等待 2 秒，不超出时间预算
+                for _ in range(8):
+                    remaining = token.remaining()
+                    if remaining is not None and remaining <= (
+                        self.RENDER_CONTENT_RESERVE + 0.25
+                    ):
+                        break
+                    token.check()
+                    page.wait_for_timeout(250)
+        return page.content()
 
-    def _python_convert(self, url, pure_text):
-        """Python实现（回退方法）"""
-        # 自动检测是否需要浏览器
-        use_browser = self._needs_browser(url)
+    def _to_markdown(self, html, profile=None):
+        """HTML 转 Markdown
 
-        if use_browser:
-            content = self._get_with_playwright(url)
-            is_pdf = False
-        else:
-            content, is_pdf = self._get_with_requests(url)
+        只解析一次：一次遍历整棵树定位标题和正文，一次遍历正文子树清理噪音，
+        再直接从清理后的树生成 Markdown（不再序列化后二次解析）。
+        """
+        with _span("html.parse", chars=len(html)):
+            soup = _parse_html(html)
 
-        if is_pdf:
-            return self._process_pdf(content, pure_text)
+        with _span("html.clean"):
+            title, content_elem = self._select_content(
+                soup, profile or _DEFAULT_PROFILE
+            )
 
-        # HTML 转换
-        if pure_text:
-            return self._to_plain_text(content)
+        # 构建最终内容
+        if title:
+            markdown = f"# {title}\n\n"
         else:
-            return self._to_markdown(content)
+            markdown = ""
 
-    def _handle_arxiv(self, url, pure_text):
-        """arXiv Python回退方法：从HTML URL转为PDF下载"""
-        try:
-            pdf_url = self._convert_arxiv_to_pdf(url)
-            logger.info("arXiv Python回退: 下载PDF %s", pdf_url)
-            pdf_content, _ = self._get_with_requests(pdf_url)
-            return self._process_pdf(pdf_content, pure_text)
-        except Exception as e:
-            logger.error("arXiv PDF失败: %s", e)
-            return None
+        from markdownify import MarkdownConverter
 
-    def _clean_jina_markdown(self, markdown):
-        """清理 Jina Reader 返回的 Markdown"""
-        # 移除多余的空行
+        with _span("html.markdownify"):
+            markdown += MarkdownConverter(heading_style="ATX").convert_soup(
+                content_elem
+            )
+
+        # 清理多余空白
         markdown = re.sub(r"\n{3,}", "\n\n", markdown)
-        # 移除行尾空格
-        markdown = re.sub(r" +\n", "\n", markdown)
+        markdown = re.sub(r" +\n", "\n", markdown)  # 行尾空格
+
         return markdown.strip()
 
-    def _markdown_to_plain_text(self, markdown):
-        """从 Markdown 提取纯文本"""
-        text = re.sub(r"!\[[^\]]*\]\([^\)]*\)", "", markdown)
-        text = re.sub(r"\[([^\]]+)\]\([^\)]*\)", r"\1", text)
-        text = re.sub(r"^#{1,6}\s*", "", text, flags=re.MULTILINE)
-        text = re.sub(r"^[>*-]\s*", "", text, flags=re.MULTILINE)
-        text = re.sub(r"[`*_~]", "", text)
+    @staticmethod
+    def _select_content(soup, profile):
+        """按提取配置定位标题和正文，并清理正文中的噪音
+
+        Returns:
+            tuple: (标题或 None, 清理后的正文元素)
+        """
+        from bs4 import Tag
+
+        # 一次遍历收集每个选择器的首个匹配（文档顺序，与 select_one 一致）
+        title_matches = [None] * len(profile.title)
+        content_matches = [None] * len(profile.content)
+        for node in soup.descendants:
+            if isinstance(node, Tag):
+                _match_first(node, profile.title, title_matches)
+                _match_first(node, profile.content, content_matches)
+
+        # 提取标题（微信公众号等），按选择器优先级取第一个非空标题
+        title = None
+        for title_elem in title_matches:
+            if title_elem:
+                title = title_elem.get_text(strip=True)
+                if title:
+                    break
+
+        # 查找正文内容（优先级），需有可见文本
+        content_elem = _first_with_text(content_matches)
+
+        # 如果没找到特定内容，使用 body
+        if not content_elem:
+            content_elem = soup.body or soup
+
+        # 一次遍历移除噪音元素、广告/交互元素和空段落
+        _prune_noise(content_elem, profile)
+        return title, content_elem
+
+    def _to_plain_text(self, html, profile=None):
+        """提取纯文本（优先使用站点配置的正文选择器）"""
+        from bs4 import Tag
+
+        profile = profile or _DEFAULT_PROFILE
+        with _span("html.parse", chars=len(html)):
+            soup = _parse_html(html)
+
+        main = None
+        if profile.site_content:
+            matches = [None] * len(profile.site_content)
+            for node in soup.descendants:
+                if isinstance(node, Tag):
+                    _match_first(node, profile.site_content, matches)
+            main = _first_with_text(matches)
+        main = main or soup.find("main") or soup.find("article") or soup.body
+        if not main:
+            return soup.get_text(separator="\n\n", strip=True)
+
+        with _span("html.text"):
+            _prune_noise(main, profile, empty_paragraphs=False)
+            text = main.get_text(separator="\n\n", strip=True)
+
         text = re.sub(r"\n{3,}", "\n\n", text)
+
         return text.strip()
 
-    def _read_wespy_markdown(self, output_dir, article_info):
-        """从 WeSpy 输出目录或返回值读取 Markdown"""
-        if isinstance(article_info, dict):
-            for key in ("markdown", "markdown_content", "content"):
-                value = article_info.get(key)
-                if isinstance(value, str) and value.strip():
-                    return value.strip()
 
-        markdown_files = sorted(Path(output_dir).rglob("*.md"))
-        if not markdown_files:
-            return None
+class AsyncWebToMarkdown(WebToMarkdown):
+    """asyncio 原生转换器
 
-        return markdown_files[0].read_text(encoding="utf-8").strip()
+    路由、缓存和输出与 WebToMarkdown 一致。HTTP 请求使用带连接池的
+    httpx.AsyncClient，动态页面使用 playwright.async_api；竞速的各后端是同一事件
+    循环中的任务，胜者出现后其余任务被取消（中断其 HTTP 请求、关闭浏览器页面），
+    并在返回前等待它们完成清理。HTML/PDF 解析等 CPU 密集步骤在线程中执行，
+    不阻塞事件循环。
 
-    def _is_twitter(self, url):
-        """检查是否是推特/X URL"""
-        parsed = urlparse(url)
-        netloc = parsed.netloc.lower()
-        return "twitter.com" in netloc or "x.com" in netloc
+    用法:
+        async with AsyncWebToMarkdown() as converter:
+            results = await asyncio.gather(*(converter.aconvert(u) for u in urls))
+    """
 
-    def _convert_twitter_to_proxy(self, url):
-        """转换 Twitter/X URL 到支持元数据预览的 fxtwitter 或 fixupx"""
-        parsed = urlparse(url)
-        netloc = parsed.netloc.lower()
+    def __init__(
+        self,
+        max_concurrency=100,
+        max_connections=None,
+        max_browser_pages=4,
+        client=None,
+        **kwargs,
+    ):
+        """
+        Args:
+            max_concurrency: 同时进行的转换数上限，超出的 aconvert 调用排队等待
+            max_connections: HTTP 连接池大小，默认按 max_concurrency 乘以 RACE_HOSTS
+            max_browser_pages: 同时渲染的浏览器页面数上限
+            client: 自定义 httpx.AsyncClient（调用方负责关闭），默认首次请求时创建
+            **kwargs: 传给 WebToMarkdown（cache、cpu_workers、backend_stats 等）；
+                http2 默认安装了 h2 即启用（任务取消即中止请求，与 HTTP/1.1 一致）
+        """
+        kwargs.setdefault("http2", importlib.util.find_spec("h2") is not None)
+        super().__init__(**kwargs)
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections or max_concurrency * self.RACE_HOSTS
+        self.async_browser_pool = _AsyncBrowserPool(
+            max_concurrency=max_browser_pages,
+            max_pages=kwargs.get("browser_max_pages", 50),
+        )
+        self._client = client
+        self._owns_client = client is None
+        self._semaphore = None
+        self._aflights = {}
+        self._ahost_locks = {}
 
-        # 将 twitter.com 替换为 fxtwitter.com, x.com 替换为 fixupx.com
-        if "twitter.com" in netloc:
-            new_netloc = netloc.replace("twitter.com", "fxtwitter.com")
-        elif "x.com" in netloc:
-            new_netloc = netloc.replace("x.com", "fixupx.com")
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """关闭 HTTP 连接池、浏览器和进程池"""
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+        await self.async_browser_pool.close()
+        self.__exit__(None, None, None)
+
+    def _get_client(self):
+        if self._client is None:
+            try:
+                import httpx
+            except ImportError:
+                raise ImportError("httpx 未安装。\n请运行: pip install httpx")
+
+            limits = httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.HTTP_KEEPALIVE_EXPIRY,
+            )
+            # httpx 默认的 Accept-Encoding 即为它能解码的格式（含已安装的 br / zstd）；
+            # 启用 HTTP/2 时，发往同一主机的并发请求复用一个连接
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": self.USER_AGENT},
+                follow_redirects=True,
+                transport=httpx.AsyncHTTPTransport(
+                    limits=limits,
+                    retries=1,
+                    http2=self.http2,
+                    socket_options=_keepalive_socket_options(self.HTTP_KEEPALIVE_IDLE),
+                ),
+            )
+        return self._client
+
+    async def aconvert(
+        self,
+        url,
+        pure_text=False,
+        use_python=False,
+        refresh=False,
+        trace=None,
+        deadline=None,
+    ):
+        """异步转换 URL 到 Markdown（参数和返回值同 convert）
+
+        时间预算从调用时开始计算，包含排队等待并发名额的时间。
+        """
+        import asyncio
+
+        url = self._prepare_url(url)
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        with self._budget(deadline, asyncio.get_running_loop()):
+            async with self._semaphore:
+                with self._tracing(url, trace):
+                    key = (self._cache_key(url, pure_text, use_python), refresh)
+                    return await self._acoalesce(
+                        key, self._aconvert, url, pure_text, use_python, refresh
+                    )
+
+    async def _acoalesce(self, key, fn, *args):
+        """异步版 _coalesce：同一 key 的并发调用共享同一个任务"""
+        import asyncio
+
+        flight = self._aflights.get(key)
+        leader = flight is None
+        if leader:
+            info = {}
+
+            async def run():
+                _current_info.set(info)
+                started = time.monotonic()
+                result = await fn(*args)
+                self._annotate(result, info, started)
+                return result, info
+
+            # 任务复制当前上下文（追踪、取消令牌），结果信息单独收集
+            task = asyncio.ensure_future(run())
+            flight = self._aflights[key] = [task, 0]
+            task.add_done_callback(lambda _: self._aflights.pop(key, None))
         else:
-            return url
+            logger.debug("合并进行中的转换: %s", key[0])
 
-        return url.replace(netloc, new_netloc)
+        # shield：某个等待方被取消时不影响共享任务和其他等待方；
+        # 所有等待方都取消后才取消任务本身
+        task = flight[0]
+        flight[1] += 1
+        try:
+            result, info = await asyncio.wait_for(
+                asyncio.shield(task), _budget_remaining()
+            )
+        except TimeoutError:
+            logger.warning("超出时间预算，不再等待进行中的转换: %s", key[0])
+            _record(deadline_exceeded=True)
+            # 没有其他等待方时取消任务，不在预算之外继续下载、持有缓存锁或写缓存
+            if not task.done() and flight[1] == 1:
+                task.cancel()
+            return None
+        except asyncio.CancelledError:
+            if not task.done() and flight[1] == 1:
+                task.cancel()
+            raise
+        finally:
+            flight[1] -= 1
+        _record(**info, **({} if leader else {"coalesced": True}))
+        return result
 
-    def _is_arxiv(self, url):
-        """检测是否为 arXiv 链接"""
-        return "arxiv.org" in url and (
-            "/abs/" in url or "/pdf/" in url or "/html/" in url
-        )
+    async def _aconvert(self, url, pure_text, use_python, refresh):
+        """异步版 _convert"""
+        import asyncio
 
-    def _is_wechat(self, url):
-        """检测是否为微信公众号链接"""
-        return "weixin.qq.com" in url
+        key = self._cache_key(url, pure_text, use_python)
+        if not refresh:
+            if self.cache is not None:
+                entry = await asyncio.to_thread(self.cache.get, key)
+                if entry is not None:
+                    _record(backend="cache")
+                    return self._cached_result(entry, pure_text, url)
+            if await self._acached(self._failed_recently, key):
+                logger.info("近期所有方法均失败，跳过: %s", url)
+                _record(negative_cached=True)
+                return None
+
+        if self.cache is None:
+            result = await self._aconvert_within_budget(url, pure_text, use_python)
+            self._store_result(key, url, result, refresh)
+            return result
+
+        # 跨进程锁的等待与 SQLite 读写是阻塞的，放到线程中执行
+        lock = self._cache_lock(key)
+        acquiring = asyncio.ensure_future(asyncio.to_thread(lock.__enter__))
+        try:
+            locked = await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # 线程中的获取无法中途取消：取得后立即释放
+            acquiring.add_done_callback(
+                lambda f: f.cancelled()
+                or f.exception() is not None
+                or lock.__exit__(None, None, None)
+            )
+            raise
+        try:
+            if locked and not refresh:
+                entry = await asyncio.to_thread(self.cache.get, key)
+                if entry is not None:
+                    _record(backend="cache", coalesced=True)
+                    return self._cached_result(entry, pure_text, url)
+            result = await self._aconvert_within_budget(url, pure_text, use_python)
+            await asyncio.to_thread(self._store_result, key, url, result, refresh)
+        finally:
+            await asyncio.to_thread(lock.__exit__, None, None, None)
+        return result
+
+    async def _acached(self, fn, *args, **kwargs):
+        """调用会读写 ResultCache 的同步方法（启用缓存时放到线程中执行）
+
+        SQLite 读写、缓存内容写回临时文件都会阻塞事件循环；未启用缓存时直接调用。
+        """
+        if self.cache is None:
+            return fn(*args, **kwargs)
+        import asyncio
+
+        return await asyncio.to_thread(fn, *args, **kwargs)
+
+    async def _aneeds_browser(self, url):
+        """异步版 _needs_browser：内存中已有判定时直接返回，否则在线程中读取缓存"""
+        use_browser = self._needs_browser(url, read_cache=False)
+        if use_browser is None:
+            use_browser = await self._acached(self._needs_browser, url)
+        return use_browser
+
+    async def _aconvert_within_budget(self, url, pure_text, use_python):
+        """异步版 _convert 的预算处理：超出时间预算时返回已得到的结果"""
+        try:
+            result = await self._aconvert_uncached(url, pure_text, use_python)
+        except _Cancelled:
+            result = None
+        self._note_budget(url)
+        return result
+
+    async def _aconvert_uncached(self, url, pure_text, use_python):
+        """按站点类型路由到各异步转换方法（与 _convert_uncached 一致）"""
+        import asyncio
+
+        if self._is_wechat(url):
+            # WeSpy 只有同步接口，放到线程中执行
+            result = await self._aattempt(
+                "wespy", asyncio.to_thread, self._try_wespy, url, pure_text
+            )
+            if result:
+                _record(backend="wespy")
+                return result
+            result = await self._aattempt(
+                "playwright", self._atry_playwright, url, pure_text
+            )
+            if result:
+                _record(backend="playwright")
+                return result
+            _record(backend="python")
+            return await self._aattempt("python", self._apython_convert, url, pure_text)
+
+        if use_python:
+            if self._is_arxiv(url):
+                _record(backend="arxiv-pdf")
+                return await self._aattempt(
+                    "arxiv-pdf", self._ahandle_arxiv, url, pure_text
+                )
+            _record(backend="python")
+            return await self._aattempt("python", self._apython_convert, url, pure_text)
+
+        result = await self._aparallel_convert(url, pure_text)
+        if result:
+            return result
+
+        if self._is_arxiv(url):
+            _record(backend="arxiv-pdf")
+            return await self._aattempt(
+                "arxiv-pdf", self._ahandle_arxiv, url, pure_text
+            )
+
+        return None
+
+    @staticmethod
+    async def _aattempt(name, fn, *args):
+        """异步版 _attempt"""
+        with _span("backend", backend=name) as span:
+            result = await fn(*args)
+            span["ok"] = bool(result)
+            return result
 
-    def _convert_arxiv_to_html(self, url):
-        """转换 arXiv 链接为 HTML URL"""
-        if "/html/" in url:
-            return url
-        if "/pdf/" in url:
-            paper_id = url.split("/pdf/")[-1].split("?")[0].replace(".pdf", "")
-            return f"https://arxiv.org/html/{paper_id}"
-        paper_id = url.split("/abs/")[-1].split("?")[0]
-        return f"https://arxiv.org/html/{paper_id}"
+    async def _aparallel_convert(self, url, pure_text):
+        """并行尝试多种方法，返回最快成功的结果（自适应路由同 _parallel_convert）"""
+        backends = []
+        if self._endpoint_available("jina"):
+            backends.append(("jina", self._atry_jina_reader))
+        if self.firecrawl_api_key and self._endpoint_available("firecrawl"):
+            backends.append(("firecrawl", self._atry_firecrawl))
+        backends.append(("python", self._apython_convert))
+        backends.append(("playwright", self._atry_playwright))
 
-    def _convert_arxiv_to_pdf(self, url):
-        """转换 arXiv 链接为 PDF URL"""
-        if "/pdf/" in url:
-            return url
-        if "/html/" in url:
-            paper_id = url.split("/html/")[-1].split("?")[0]
-            return f"https://arxiv.org/pdf/{paper_id}.pdf"
-        paper_id = url.split("/abs/")[-1].split("?")[0]
-        return f"https://arxiv.org/pdf/{paper_id}.pdf"
+        domain = _registrable_domain(url)
+        delays = self._race_delays(domain, [name for name, _ in backends])
+        name, result = await self._arace(
+            [(name, fn, (url, pure_text)) for name, fn in backends],
+            delays=delays,
+            observer=lambda backend, ok, elapsed: self.backend_stats.record(
+                domain, backend, ok, elapsed
+            ),
+        )
+        if result:
+            self.backend_stats.record_win(domain, name)
+            _record(backend=name)
+        return result
 
-    def _is_known_dynamic_site(self, url):
-        """检测是否为已知的动态网站（纯函数，无网络调用）"""
-        parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-
-        dynamic_domains = [
-            "x.com",
-            "twitter.com",
-            "medium.com",
-            "substack.com",
-            "github.com",
-            "reddit.com",
-        ]
+    async def _arace(self, backends, delays=None, observer=None):
+        """首个成功者胜出的异步竞速（delays / observer 语义同 _race）
 
-        for dynamic in dynamic_domains:
-            if domain.endswith(dynamic):
-                return True
+        Returns:
+            tuple: (胜出后端名, 结果)，全部失败或超时返回 (None, None)
+        """
+        import asyncio
 
-        if "weixin.qq.com" in domain:
-            return False
+        delays = delays or {}
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        deadline = started_at + self.TIMEOUT_RACE
+        remaining = _budget_remaining()
+        if remaining is not None:
+            deadline = min(deadline, started_at + remaining)
+        scheduled = sorted(
+            (b for b in backends if delays.get(b[0], 0) is not None),
+            key=lambda b: delays.get(b[0], 0),
+        )
+        fallback = [b for b in backends if delays.get(b[0], 0) is None]
+        tasks = {}
 
-        return None  # 未知，需要探测
+        def launch(name, fn, args):
+            task = asyncio.create_task(
+                self._arace_worker(name, fn, args), name=f"docai-{name}"
+            )
+            tasks[task] = name
 
-    def _probe_for_spa(self, url):
-        """通过 HEAD 请求探测是否为 SPA（有网络调用）"""
         try:
-            response = self.session.head(
-                url, timeout=self.TIMEOUT_HEAD, allow_redirects=True
-            )
-            content_type = response.headers.get("content-type", "").lower()
+            while True:
+                # 启动到期的后端；在途后端全部失败时不再等待，直接启动下一个
+                while scheduled and (
+                    not tasks
+                    or started_at + delays.get(scheduled[0][0], 0) <= loop.time()
+                ):
+                    launch(*scheduled.pop(0))
+                if not tasks:
+                    if not fallback:
+                        break
+                    for entry in fallback:
+                        launch(*entry)
+                    fallback = []
 
-            if "application/json" in content_type:
-                return True
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    logger.warning("并行转换超时，已取消剩余方法")
+                    break
+                if scheduled:
+                    next_start = started_at + delays.get(scheduled[0][0], 0)
+                    timeout = min(timeout, max(0.0, next_start - loop.time()))
 
-            server = response.headers.get("server", "").lower()
-            if any(s in server for s in ["nextjs", "vercel", "vite"]):
-                return True
-        except Exception:
-            return True
+                done, _ = await asyncio.wait(
+                    tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    name = tasks.pop(task)
+                    result, elapsed = task.result()
+                    if observer is not None:
+                        observer(name, bool(result), elapsed)
+                    if result:
+                        return name, result
+        finally:
+            # 取消其余后端，并等待它们完成清理（关闭连接、页面）
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        return None, None
 
-        return False
+    @staticmethod
+    async def _arace_worker(name, fn, args):
+        """竞速任务：运行后端协程，返回 (结果, 耗时)"""
+        import asyncio
 
-    def _needs_browser(self, url):
-        """自动检测是否需要浏览器渲染"""
-        known = self._is_known_dynamic_site(url)
-        if known is not None:
-            return known
-        return self._probe_for_spa(url)
+        result = None
+        started = time.monotonic()
+        with _span("backend", backend=name) as span:
+            try:
+                result = await fn(*args)
+            except asyncio.CancelledError:
+                span["cancelled"] = True
+                raise
+            except _Cancelled:  # 时间预算已用尽
+                span["cancelled"] = True
+            except Exception as e:
+                logger.debug("%s 失败: %s", name, e)
+            span["ok"] = bool(result)
+        return result, time.monotonic() - started
 
-    def _get_with_requests(self, url):
-        """使用 requests 获取静态页面或 PDF
+    @contextlib.asynccontextmanager
+    async def _astream(self, method, url, timeout, **kwargs):
+        """发起流式 HTTP 请求（429/5xx 按重试策略重试），响应体由调用方读取
 
-        Returns:
-            tuple: (content, is_pdf) - content 为 bytes(PDF) 或 str(HTML)
+        每次尝试的超时和重试前的退避等待都以剩余时间预算为上限，
+        剩余时间不够退避时不再重试，直接返回最后一次响应。
         """
-        response = self.session.get(url, timeout=self.TIMEOUT_REQUESTS)
-        response.raise_for_status()
-        content_type = response.headers.get("content-type", "").lower()
-        is_pdf = "application/pdf" in content_type or url.lower().endswith(".pdf")
-        if is_pdf:
-            return response.content, True
-        return response.text, False
+        import asyncio
 
-    def _process_pdf(self, pdf_content, pure_text=False):
-        """处理 PDF 内容，返回 Markdown 或纯文本（只打开一次文档）"""
+        client = self._get_client()
+        trace = _current_trace.get()
+        if trace is not None:
+            kwargs["extensions"] = {"trace": _HttpcoreTrace(trace).acall}
+        host = self._host(url)
+        for attempt in range(self.RETRY_TOTAL + 1):
+            await self._athrottle(host)
+            request = client.build_request(
+                method, url, timeout=_budget_timeout(timeout), **kwargs
+            )
+            # 首字节：从发出请求到收到响应头（含建连）
+            with _span("http.ttfb", method=method, url=url) as span:
+                response = await client.send(request, stream=True)
+                span["status"] = response.status_code
+                span["version"] = response.http_version
+            self.rate_limiter.observe(
+                host, response.status_code, response.headers.get("retry-after")
+            )
+            # 429 的等待由限速器在下次发送前完成
+            backoff = 0 if response.status_code == 429 else 2**attempt if attempt else 0
+            remaining = _budget_remaining()
+            if (
+                response.status_code not in self.RETRY_STATUSES
+                or attempt == self.RETRY_TOTAL
+                or (remaining is not None and remaining <= backoff)
+            ):
+                break
+            await response.aclose()
+            await asyncio.sleep(backoff)
         try:
-            import fitz  # PyMuPDF
-        except ImportError:
-            raise ImportError("PDF 处理需要 PyMuPDF。\n" "请运行: pip install pymupdf")
+            with _span("http.download", url=url) as span:
+                yield response
+                span["bytes"] = response.num_bytes_downloaded
+                span["encoding"] = response.headers.get("content-encoding")
+        finally:
+            await response.aclose()
 
-        try:
-            doc = fitz.open(stream=pdf_content, filetype="pdf")
+    async def _athrottle(self, host):
+        """异步版 _throttle"""
+        import asyncio
 
-            # 提取全文
-            text = ""
-            for page_num, page in enumerate(doc):
-                page_text = page.get_text()
-                if page_text.strip():
-                    text += f"--- Page {page_num + 1} ---\n\n"
-                    text += page_text + "\n\n"
-            text = text.strip()
+        wait = self.rate_limiter.reserve(host, max_wait=_budget_remaining())
+        if wait is None:
+            logger.debug("%s 限流等待超出时间预算，放弃请求", host)
+            raise _Cancelled()
+        if wait > 0:
+            with _span("http.throttle", host=host, wait=round(wait, 3)):
+                await asyncio.sleep(wait)
 
-            if pure_text:
-                return text
+    async def _ahttp(self, method, url, timeout, **kwargs):
+        """发起 HTTP 请求并读取完整响应体"""
+        async with self._astream(method, url, timeout, **kwargs) as response:
+            await response.aread()
+        return response
 
-            # 提取标题
-            title = None
-            metadata = doc.metadata
-            if metadata and metadata.get("title"):
-                title = metadata["title"]
-            elif doc.page_count > 0:
-                first_page = doc[0]
-                lines = [
-                    line.strip()
-                    for line in first_page.get_text().split("\n")
-                    if line.strip()
-                ]
-                if lines:
-                    title = " ".join(lines[:2])
+    async def _atry_jina_reader(self, url, pure_text):
+        """异步版 _try_jina_reader"""
+        names, delays = self._jina_plan()
+        if not names:
+            return None
+        _, result = await self._arace(
+            [(name, self._atry_jina_mirror, (name, url, pure_text)) for name in names],
+            delays=delays,
+            observer=self._record_jina_mirror,
+        )
+        return result
 
-            if title:
-                return f"# {title}\n\n{text}"
-            return text
+    async def _atry_jina_mirror(self, name, url, pure_text):
+        """异步版 _try_jina_mirror"""
+        if not self.circuit_breakers.allow(name):
+            logger.debug("Jina Reader 熔断中，跳过 %s", name)
+            return None
+        jina_base_url = name.split(":", 1)[1]
+        ok = None
+        try:
+            response = await self._ahttp(
+                "GET", f"{jina_base_url}/{url}", self.TIMEOUT_JINA
+            )
+            response.raise_for_status()
+            ok = True
+            return self._lazy_result(
+                functools.partial(self._jina_result, response.text),
+                pure_text,
+                raw=response.text,
+                content_type="text/markdown",
+                url=url,
+            )
         except Exception as e:
-            raise Exception(f"PDF 处理失败: {e}")
+            if ok is None:
+                ok = _blames_url(e)
+            logger.warning("Jina Reader 失败 (%s): %s", jina_base_url, e)
+        finally:
+            self.circuit_breakers.record(name, ok)
+        return None
 
-    def _get_with_playwright(self, url):
-        """使用 Playwright 获取动态页面"""
+    async def _atry_firecrawl(self, url, pure_text):
+        """异步版 _try_firecrawl"""
+        if not self.firecrawl_api_key:
+            logger.info("Firecrawl API 密钥未设置 (FIRECRAWL_API_KEY)")
+            return None
+
+        if not self.circuit_breakers.allow("firecrawl"):
+            logger.debug("Firecrawl 熔断中，跳过")
+            return None
+
+        ok = None
         try:
-            from playwright.sync_api import sync_playwright
-        except ImportError:
-            raise ImportError(
-                "Playwright 未安装。\n"
-                "请运行: pip install playwright && playwright install chromium"
+            response = await self._ahttp(
+                "POST",
+                self.FIRECRAWL_URL,
+                self.TIMEOUT_FIRECRAWL,
+                headers={"Authorization": f"Bearer {self.firecrawl_api_key}"},
+                json={"url": url, "formats": ["markdown"]},
             )
+            ok = not _is_endpoint_failure(response.status_code)
+            if response.status_code == 200:
+                return self._firecrawl_lazy_result(response.json(), pure_text, url)
+            logger.warning("Firecrawl 错误: %s", response.status_code)
+        except Exception as e:
+            if ok is None:
+                ok = _blames_url(e)
+            logger.warning("Firecrawl 失败: %s", e)
+        finally:
+            self.circuit_breakers.record("firecrawl", ok)
+        return None
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            page = browser.new_page()
+    async def _atry_playwright(self, url, pure_text):
+        """异步版 _try_playwright"""
+        import asyncio
 
-            # 微信公众号使用移动 UA
-            if "weixin.qq.com" in url:
-                page.set_extra_http_headers(
-                    {
-                        "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0) AppleWebKit/605.1.15"
-                    }
-                )
+        try:
+            content = await self._aget_with_playwright(url)
+            if not content or len(content.strip()) < 50:
+                return None
+            return await asyncio.to_thread(self._page_result, content, pure_text, url)
+        except Exception as e:
+            logger.warning("Playwright 失败: %s", e)
+        return None
 
-            try:
-                page.goto(
-                    url, wait_until="networkidle", timeout=self.TIMEOUT_PLAYWRIGHT
-                )
-                page.wait_for_timeout(2000)
-                content = page.content()
-            finally:
-                browser.close()
+    async def _apython_convert(self, url, pure_text):
+        """异步版 _python_convert"""
+        import asyncio
 
-            return content
+        use_browser = await self._aneeds_browser(url)
+        if use_browser is None:
+            host = self._host(url)
+            if host not in self._unserialized_hosts:
+                lock = self._ahost_locks.setdefault(host, asyncio.Lock())
+                async with lock:
+                    use_browser = await self._aneeds_browser(url)
+                    if use_browser is None and host not in self._unserialized_hosts:
+                        try:
+                            return await self._alearn_render_mode(url, pure_text)
+                        finally:
+                            self._ahost_locks.pop(host, None)
+                            self._release_host_lock(host)
+            if use_browser is None:
+                # 首次抓取未能判定：不再串行，各自抓取判定
+                return await self._alearn_render_mode(url, pure_text)
 
-    def _to_markdown(self, html):
-        """HTML 转 Markdown"""
-        soup = BeautifulSoup(html, "html.parser")
+        if use_browser:
+            content = await self._aget_with_playwright(url)
+            return await asyncio.to_thread(self._page_result, content, pure_text, url)
 
-        # 提取标题（微信公众号等）
-        title = None
-        # 尝试多种标题来源
-        title_selectors = ["title", "h1#activity-name", ".rich_media_title", "h1"]
-        for selector in title_selectors:
-            title_elem = soup.select_one(selector)
-            if title_elem:
-                title = title_elem.get_text(strip=True)
-                if title:
-                    break
+        content, is_pdf = await self._aget_with_requests(url)
+        if is_pdf:
+            return await asyncio.to_thread(
+                self._process_spooled_pdf, content, pure_text, url
+            )
+        return await asyncio.to_thread(self._page_result, content, pure_text, url)
 
-        # 查找正文内容（优先级）
-        content_elem = None
-        content_selectors = [
-            "#js_content",  # 微信公众号
-            ".rich_media_content",  # 微信公众号
-            "#activity-detail",  # 微信公众号
-            "article",  # 标准文章
-            "main",  # 标准主内容
-            ".post-content",  # 博客
-            ".article-content",  # 博客
-        ]
+    async def _alearn_render_mode(self, url, pure_text):
+        """异步版 _learn_render_mode"""
+        import asyncio
 
-        for selector in content_selectors:
-            elem = soup.select_one(selector)
-            if elem and elem.get_text(strip=True):
-                content_elem = elem
-                break
+        content, is_pdf = await self._aget_with_requests(url, spa_probe=True)
+        if content is None:
+            await self._acached(self._remember_render_mode, url, True)
+            html = await self._aget_with_playwright(url)
+            return await asyncio.to_thread(self._page_result, html, pure_text, url)
+        if is_pdf:
+            return await asyncio.to_thread(
+                self._process_spooled_pdf, content, pure_text, url
+            )
 
-        # 如果没找到特定内容，使用 body
-        if not content_elem:
-            content_elem = soup.body or soup
+        result = await asyncio.to_thread(self._page_result, content, pure_text, url)
+        if not self._is_spa_shell(content, result):
+            await self._acached(self._remember_render_mode, url, False)
+            return result
+        logger.info("静态页面内容单薄且为 SPA 外壳，改用浏览器渲染")
+        try:
+            html = await self._aget_with_playwright(url)
+            rendered = await asyncio.to_thread(self._page_result, html, pure_text, url)
+        except Exception as e:
+            logger.warning("浏览器渲染失败，使用静态抓取结果: %s", e)
+            return result
+        await self._acached(self._remember_render_mode, url, True)
+        return rendered
 
-        # 移除噪音元素
-        for tag in content_elem(
-            ["script", "style", "nav", "footer", "header", "iframe", "aside"]
-        ):
-            tag.decompose()
-
-        # 移除广告和交互元素
-        for tag in content_elem.find_all(
-            class_=lambda x: x
-            and any(
-                w in x.lower()
-                for w in [
-                    "ad",
-                    "banner",
-                    "cookie",
-                    "consent",
-                    "popup",
-                    "modal",
-                    "share",
-                    "like",
-                    "comment",
-                ]
+    async def _ahandle_arxiv(self, url, pure_text):
+        """异步版 _handle_arxiv"""
+        import asyncio
+
+        try:
+            pdf_url = self._convert_arxiv_to_pdf(url)
+            logger.info("arXiv Python回退: 下载PDF %s", pdf_url)
+            pdf_path, _ = await self._aget_with_requests(pdf_url)
+            return await asyncio.to_thread(
+                self._process_spooled_pdf, pdf_path, pure_text, pdf_url
             )
-        ):
-            tag.decompose()
+        except Exception as e:
+            logger.error("arXiv PDF失败: %s", e)
+            return None
 
-        # 移除按钮和链接区域
-        for tag in content_elem.find_all(
-            class_=lambda x: x
-            and any(w in x.lower() for w in ["btn", "button", "share", "reward"])
-        ):
-            tag.decompose()
+    async def _aget_with_requests(self, url, spa_probe=False):
+        """异步版 _get_with_requests（PDF 流式落盘，HTML 条件请求复用缓存）"""
+        key = f"http:{_normalize_url(url)}"
+        cached = None
+        if self.cache is not None:
+            cached = await self._acached(self.cache.get, key, allow_stale=True)
+        headers = {}
+        if cached is not None:
+            if cached.meta.get("etag"):
+                headers["If-None-Match"] = cached.meta["etag"]
+            if cached.meta.get("last_modified"):
+                headers["If-Modified-Since"] = cached.meta["last_modified"]
 
-        # 移除空段落
-        for tag in content_elem.find_all("p"):
-            if not tag.get_text(strip=True):
-                tag.decompose()
+        async with self._astream(
+            "GET", url, self.TIMEOUT_REQUESTS, headers=headers
+        ) as response:
+            if cached is not None and response.status_code == 304:
+                _record(revalidated=True)
+                return await self._acached(self._decode_cached_http, cached, url)
+            response.raise_for_status()
+            if spa_probe and self._is_spa_response(response.headers):
+                return None, False
+            content, is_pdf = await self._aread_body(response, url)
+            await self._acached(self._store_http, key, response, content, is_pdf)
+            return content, is_pdf
 
-        # 构建最终内容
-        if title:
-            markdown = f"# {title}\n\n"
-        else:
-            markdown = ""
+    async def _aread_body(self, response, url):
+        """异步版 _read_body（每个数据块之间检查取消信号与时间预算）"""
+        token = _current_token.get()
+        chunks = response.aiter_bytes(self.DOWNLOAD_CHUNK_SIZE)
+        head = await anext(chunks, b"")
+        kind, limit, decoder = self._body_plan(response, url, head)
+        if kind == "pdf":
+            return await self._aspool_to_file(head, chunks, limit, url), True
 
-        cleaned_html = str(content_elem)
-        markdown += md(cleaned_html, heading_style="ATX")
+        parts = [decoder.decode(head)]
+        received = len(head)
+        self._check_download_size(received, limit, url)
+        async for chunk in chunks:
+            if token is not None:
+                token.check()
+            received += len(chunk)
+            self._check_download_size(received, limit, url)
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts), False
 
-        # 清理多余空白
-        markdown = re.sub(r"\n{3,}", "\n\n", markdown)
-        markdown = re.sub(r" +\n", "\n", markdown)  # 行尾空格
+    async def _aspool_to_file(self, head, chunks, limit, url, suffix=".pdf"):
+        """把首块和其余数据块写入临时文件，返回文件路径（超过 limit 字节时中止并删除）"""
+        token = _current_token.get()
+        received = len(head)
+        with tempfile.NamedTemporaryFile(
+            prefix="docai-", suffix=suffix, delete=False
+        ) as f:
+            try:
+                self._check_download_size(received, limit, url)
+                f.write(head)
+                async for chunk in chunks:
+                    if token is not None:
+                        token.check()
+                    received += len(chunk)
+                    self._check_download_size(received, limit, url)
+                    f.write(chunk)
+            except BaseException:
+                f.close()
+                Path(f.name).unlink(missing_ok=True)
+                raise
+        return Path(f.name)
 
-        return markdown.strip()
+    async def _aget_with_playwright(self, url):
+        """使用 async Playwright 获取动态页面"""
+        import asyncio
+
+        try:
+            import playwright.async_api  # noqa: F401
+        except ImportError:
+            raise ImportError(
+                "Playwright 未安装。\n"
+                "请运行: pip install playwright && playwright install chromium"
+            )
 
-    def _to_plain_text(self, html):
-        """提取纯文本"""
-        soup = BeautifulSoup(html, "html.parser")
+        return await asyncio.wait_for(
+            self.async_browser_pool.render(lambda page: self._arender_page(page, url)),
+            _budget_remaining(),
+        )
 
-        main = soup.find("main") or soup.find("article") or soup.body
-        if not main:
-            return soup.get_text(separator="\n\n", strip=True)
+    async def _arender_page(self, page, url):
+        """在浏览器页面中导航并等待渲染完成，返回 HTML
 
-        for tag in main(["script", "style", "nav", "footer", "header", "aside"]):
-            tag.decompose()
+        任务被取消时 CancelledError 从当前 await 处抛出，页面随上下文关闭。
+        """
+        from playwright.async_api import Error as PlaywrightError
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
 
-        text = main.get_text(separator="\n\n", strip=True)
+        # 微信公众号使用移动 UA
+        if "weixin.qq.com" in url:
+            await page.set_extra_http_headers(
+                {
+                    "User-Agent": "Mozilla/5.0 (iPhone; CPU iPhone OS 14_0) AppleWebKit/605.1.15"
+                }
+            )
+        options = self._render_options(url)
+        fast = options["mode"] == "fast"
+        if fast:
+            await page.route("**/*", self._aroute_request)
 
-        text = re.sub(r"\n{3,}", "\n\n", text)
+        # 渲染等待在截止前留出余量，超出时间预算时返回已渲染的内容
+        budget = _budget_timeout(self.TIMEOUT_PLAYWRIGHT / 1000)
+        settle_deadline = time.monotonic() + budget - self.RENDER_CONTENT_RESERVE
+        with _span("browser.navigate", url=url):
+            await page.goto(url, wait_until="domcontentloaded", timeout=budget * 1000)
+        with _span("browser.settle", url=url, mode=options["mode"]):
+            if fast:
+                tracker = _SettleTracker(
+                    self.RENDER_SETTLE_QUIET, self.RENDER_SETTLE_FALLBACK
+                )
+                selector = options["wait_for"] or self._profile(url).content_css
+                while time.monotonic() < settle_deadline:
+                    try:
+                        snapshot = await page.evaluate(_SNAPSHOT_JS, selector)
+                        if tracker.ready(snapshot):
+                            break
+                    except PlaywrightError as e:  # 页面跳转中，执行上下文被销毁
+                        logger.debug("页面快照失败: %s", e)
+                    await page.wait_for_timeout(250)
+            else:
+                try:
+                    await page.wait_for_load_state(
+                        "networkidle",
+                        timeout=max(settle_deadline - time.monotonic(), 0.001) * 1000,
+                    )
+                except PlaywrightTimeoutError:
+                    pass
+                remaining = _budget_remaining()
+                grace = 2.0
+                if remaining is not None:
+                    grace = min(grace, remaining - self.RENDER_CONTENT_RESERVE)
+                if grace > 0:
+                    await page.wait_for_timeout(grace * 1000)
+        return await page.content()
 
-        return text.strip()
+    @staticmethod
+    async def _aroute_request(route):
+        """异步版 _route_request"""
+        request = route.request
+        if _is_blocked_request(request.resource_type, request.url):
+            await route.abort()
+        else:
+            await route.continue_()
 
 
 def main():
@@ -628,6 +5216,9 @@ def main():
         stream=sys.stderr,
     )
 
+    if sys.argv[1:2] == ["serve"]:
+        sys.exit(_serve(_serve_parser().parse_args(sys.argv[2:])))
+
     parser = argparse.ArgumentParser(
         description="将网页转换为 Markdown 格式（优先使用非Python方法）",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -641,10 +5232,12 @@ def main():
   %(prog)s https://arxiv.org/abs/2601.04500v1 --output paper.md
   %(prog)s https://x.com/user/status/123 --pure-text
   %(prog)s https://www.breezedeus.com/article/ai-agent-context-engineering --use-python  # 强制使用Python方法
+  %(prog)s --input urls.txt --jobs 16 -o results.jsonl  # 批量转换
+  %(prog)s serve  # 启动常驻守护进程，单个 URL 的转换自动交给它执行
         """,
     )
 
-    parser.add_argument("url", help="要转换的网页 URL")
+    parser.add_argument("url", nargs="?", help="要转换的网页 URL")
     parser.add_argument(
         "--pure-text", action="store_true", help="输出纯文本（无 Markdown 格式）"
     )
@@ -654,30 +5247,412 @@ def main():
         help="强制使用Python方法（跳过Jina/Firecrawl）",
     )
     parser.add_argument("--output", "-o", help="输出到文件")
+    parser.add_argument(
+        "--input",
+        "-i",
+        help="批量模式：从文件逐行读取 URL（- 表示标准输入），以 JSONL 输出结果",
+    )
+    parser.add_argument(
+        "--jobs", type=_positive_int, default=8, help="批量模式的全局并发数（默认 8）"
+    )
+    parser.add_argument(
+        "--per-host",
+        type=_positive_int,
+        default=2,
+        help="批量模式下单个主机的并发数（默认 2）",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="不读写本地结果缓存")
+    parser.add_argument(
+        "--refresh", action="store_true", help="忽略已缓存的结果，重新获取并更新缓存"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="缓存目录（默认 $DOCAI_CACHE_DIR 或 ~/.cache/docai-web2md）",
+    )
+    parser.add_argument(
+        "--daemon",
+        help="守护进程地址（默认 $DOCAI_DAEMON 或缓存目录下的 daemon.sock）",
+    )
+    parser.add_argument(
+        "--no-daemon", action="store_true", help="不使用守护进程，在当前进程中转换"
+    )
+    parser.add_argument(
+        "--trace",
+        choices=["json"],
+        help="输出分阶段耗时追踪：单个 URL 写到标准错误，批量模式附在每条结果中",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        help="每个 URL 的总时间预算（秒）：所有方法、重试和渲染共享，"
+        "用尽时返回已得到的最佳结果",
+    )
 
     args = parser.parse_args()
+    if bool(args.url) == bool(args.input):
+        parser.error("请提供一个 URL，或使用 --input 指定 URL 列表")
+
+    if args.input:
+        sys.exit(_run_batch(args))
 
     try:
-        with WebToMarkdown() as converter:
-            result = converter.convert(
-                args.url, pure_text=args.pure_text, use_python=args.use_python
+        # 守护进程在运行时交给它转换（复用其连接池、浏览器和缓存）
+        record = None
+        if not args.no_daemon and not args.no_cache:
+            record = _request_daemon(
+                _daemon_address(args),
+                {
+                    "url": args.url,
+                    "pure_text": args.pure_text,
+                    "use_python": args.use_python,
+                    "refresh": args.refresh,
+                    "trace": bool(args.trace),
+                    "deadline": args.deadline,
+                },
             )
+        if record is not None:
+            if args.trace:
+                _write_trace(record.get("trace"))
+            if not record["ok"]:
+                logger.error("转换失败：%s", record["error"])
+                sys.exit(1)
+            result = record["content"]
+        else:
+            trace = ConversionTrace() if args.trace else None
+            with _converter_from_args(args) as converter:
+                try:
+                    result = converter.convert(
+                        args.url,
+                        pure_text=args.pure_text,
+                        use_python=args.use_python,
+                        refresh=args.refresh,
+                        trace=trace,
+                        deadline=args.deadline,
+                    )
+                finally:
+                    if trace is not None:
+                        _write_trace(trace.to_dict())
 
             if result is None:
                 logger.error("转换失败：所有方法均不可用")
                 sys.exit(1)
 
-            if args.output:
-                with open(args.output, "w", encoding="utf-8") as f:
-                    f.write(result)
-                print(f"✓ 已保存到: {args.output}")
-            else:
-                print(result)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(result)
+            print(f"✓ 已保存到: {args.output}")
+        else:
+            print(result)
 
     except Exception as e:
         logger.error("错误: %s", e)
         sys.exit(1)
 
 
+def _positive_int(value):
+    """argparse 类型：不小于 1 的整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"应为不小于 1 的整数: {value!r}")
+    return number
+
+
+def _write_trace(trace):
+    """把追踪以一行 JSON 写到标准错误"""
+    if trace is not None:
+        print(json.dumps(trace, ensure_ascii=False), file=sys.stderr)
+
+
+def _open_cache(args):
+    """按命令行参数打开结果缓存，不可用时返回 None"""
+    if args.no_cache:
+        return None
+    try:
+        path = Path(args.cache_dir) / "cache.sqlite3" if args.cache_dir else None
+        return ResultCache(path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("缓存不可用，已跳过: %s", e)
+        return None
+
+
+def _converter_from_args(args, cpu_offload=False):
+    """按命令行参数创建转换器"""
+    cache = _open_cache(args)
+    stats_dir = Path(args.cache_dir) if args.cache_dir else _default_cache_dir()
+    return WebToMarkdown(
+        cache=cache,
+        backend_stats=BackendStats(
+            None if args.no_cache else stats_dir / "backend-stats.json"
+        ),
+        cpu_offload=cpu_offload,
+    )
+
+
+def _run_batch(args):
+    """批量模式：逐行读取 URL，每完成一个即输出一行 JSON
+
+    Returns:
+        int: 退出码（全部成功为 0，有失败为 1）
+    """
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    succeeded = failed = 0
+    try:
+        # 多个转换并发时 HTML 解析交给进程池，吞吐随 CPU 核数扩展
+        with _converter_from_args(args, cpu_offload=args.jobs > 1) as converter:
+            for record in converter.convert_many(
+                source,
+                pure_text=args.pure_text,
+                use_python=args.use_python,
+                max_workers=args.jobs,
+                per_host=args.per_host,
+                refresh=args.refresh,
+                trace=bool(args.trace),
+                deadline=args.deadline,
+            ):
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                if record["ok"]:
+                    succeeded += 1
+                else:
+                    failed += 1
+                    logger.warning("转换失败 %s: %s", record["url"], record["error"])
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+
+    logger.info("批量转换完成：成功 %d，失败 %d", succeeded, failed)
+    return 0 if failed == 0 else 1
+
+
+def _serve_parser():
+    parser = argparse.ArgumentParser(
+        prog="convert.py serve",
+        description="常驻守护进程：保持转换器、连接池、浏览器池和缓存常驻，"
+        "通过 Unix 套接字或本机 HTTP 提供转换服务",
+    )
+    parser.add_argument(
+        "--listen",
+        dest="daemon",
+        help="监听地址：Unix 套接字路径或本机 host:port（只允许回环地址）"
+        "（默认 $DOCAI_DAEMON 或缓存目录下的 daemon.sock）",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="不读写本地结果缓存")
+    parser.add_argument(
+        "--cache-dir",
+        help="缓存目录（默认 $DOCAI_CACHE_DIR 或 ~/.cache/docai-web2md）",
+    )
+    return parser
+
+
+def _daemon_address(args):
+    """守护进程地址：命令行 > $DOCAI_DAEMON > 缓存目录下的 daemon.sock"""
+    if args.daemon:
+        return args.daemon
+    if os.environ.get("DOCAI_DAEMON"):
+        return os.environ["DOCAI_DAEMON"]
+    cache_dir = Path(args.cache_dir) if args.cache_dir else _default_cache_dir()
+    return str(cache_dir / "daemon.sock")
+
+
+def _parse_address(address):
+    """解析守护进程地址
+
+    Returns:
+        tuple: ("tcp", (host, port)) 或 ("unix", 套接字路径)
+    """
+    match = re.fullmatch(r"([\w.-]*):(\d+)", address)
+    if match:
+        return "tcp", (match.group(1) or "127.0.0.1", int(match.group(2)))
+    return "unix", address
+
+
+def _is_loopback(host):
+    """host 是否为本机回环地址（守护进程不鉴权，只允许本机访问）"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """经 Unix 套接字连接守护进程的 HTTP 连接"""
+
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self._path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self._path)
+
+
+def _daemon_request(address, method, path, payload=None, timeout=300):
+    """向守护进程发送请求
+
+    Returns:
+        tuple: (状态码, JSON 响应)；守护进程未运行（无法连接）时返回 None
+    """
+    kind, target = _parse_address(address)
+    if kind == "unix":
+        if not hasattr(socket, "AF_UNIX") or not os.path.exists(target):
+            return None
+        connection = _UnixHTTPConnection(target, timeout=timeout)
+    else:
+        connection = http.client.HTTPConnection(*target, timeout=timeout)
+
+    body = None if payload is None else json.dumps(payload).encode("utf-8")
+    try:
+        try:
+            connection.connect()
+        except OSError:
+            return None
+        connection.request(
+            method, path, body=body, headers={"Content-Type": "application/json"}
+        )
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def _request_daemon(address, payload):
+    """通过守护进程转换单个 URL
+
+    Returns:
+        dict: 与 convert_many 相同的结果记录；守护进程未运行时返回 None
+    """
+    deadline = payload.get("deadline")
+    timeout = 300 if deadline is None else deadline + 5  # 留出传输结果的余量
+    reply = _daemon_request(address, "POST", "/convert", payload, timeout=timeout)
+    if reply is None:
+        return None
+    status, data = reply
+    if status != 200:
+        raise RuntimeError(data.get("error") or f"守护进程错误: {status}")
+    return data
+
+
+class _DaemonHandler(http.server.BaseHTTPRequestHandler):
+    """守护进程请求处理：POST /convert 转换单个 URL，GET /health 健康检查"""
+
+    server_version = "docai-web2md"
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._send(404, {"error": f"未知路径: {self.path}"})
+            return
+        converter = self.server.converter
+        self._send(
+            200,
+            {
+                "ok": True,
+                "pid": os.getpid(),
+                "breakers": converter.circuit_breakers.snapshot(),
+                "throttled": converter.rate_limiter.snapshot(),
+            },
+        )
+
+    def do_POST(self):
+        if self.path != "/convert":
+            self._send(404, {"error": f"未知路径: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            url = request["url"]
+            deadline = request.get("deadline")
+            deadline = None if deadline is None else float(deadline)
+        except (ValueError, KeyError, TypeError) as e:
+            self._send(400, {"error": f"无效的请求: {e}"})
+            return
+
+        record = self.server.converter._convert_one(
+            url,
+            bool(request.get("pure_text")),
+            bool(request.get("use_python")),
+            bool(request.get("refresh")),
+            bool(request.get("trace")),
+            deadline,
+        )
+        self._send(200, record)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def address_string(self):
+        # Unix 套接字的客户端地址为空字符串
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug("守护进程: " + format, *args)
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _serve(args):
+    """运行守护进程，直到收到 SIGINT / SIGTERM
+
+    Returns:
+        int: 退出码
+    """
+    address = _daemon_address(args)
+    kind, target = _parse_address(address)
+    if kind == "unix":
+        if not hasattr(socket, "AF_UNIX"):
+            logger.error("当前平台不支持 Unix 套接字，请使用 --listen host:port")
+            return 1
+        if os.path.exists(target):
+            if _daemon_request(address, "GET", "/health", timeout=3) is not None:
+                logger.error("守护进程已在运行: %s", address)
+                return 1
+            os.unlink(target)  # 上次异常退出遗留的套接字文件
+        Path(target).parent.mkdir(parents=True, exist_ok=True)
+        server = _UnixHTTPServer(target, _DaemonHandler)
+        os.chmod(target, 0o600)
+    else:
+        if not _is_loopback(target[0]):
+            # 守护进程会抓取任意 URL，对外监听即成为开放代理
+            logger.error(
+                "守护进程只能监听本机回环地址（如 127.0.0.1、localhost）: %s", address
+            )
+            return 1
+        server = http.server.ThreadingHTTPServer(target, _DaemonHandler)
+        server.daemon_threads = True
+
+    # SIGTERM 与 Ctrl-C 一样正常退出，以便关闭浏览器并保存统计
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        # 并发请求的 HTML 解析与 PDF 提取在进程池中进行
+        with _converter_from_args(args, cpu_offload=True) as converter:
+            server.converter = converter
+            logger.info("守护进程已启动: %s", address)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        server.server_close()
+        if kind == "unix":
+            Path(target).unlink(missing_ok=True)
+        logger.info("守护进程已退出")
+    return 0
+
+
 if __name__ == "__main__":
     main()
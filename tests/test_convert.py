@@ -1,16 +1,22 @@
 """Tests for docai-web2md convert module."""
 
+import contextlib
+import json
 import sys
+import threading
+import time
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 import pytest
+import requests
 
 # Add the tools directory to path so we can import convert
 sys.path.insert(
     0, str(Path(__file__).parent.parent / "skills" / "docai-web2md" / "tools")
 )
-from convert import WebToMarkdown  # noqa: E402
+import convert  # noqa: E402
+from convert import WebToMarkdown, _CancelToken, _current_token  # noqa: E402
 
 
 class TestArxivURLs:
@@ -186,6 +192,170 @@ class TestDynamicSiteDetection:
         assert converter._is_known_dynamic_site("https://example.com") is None
 
 
+class TestRenderDecision:
+    """测试按主机记录的渲染方式判定（取代逐 URL 的 HEAD 探测）"""
+
+    RICH = (
+        "<html><body><article>" + "<p>正文内容。</p>" * 200 + "</article></body></html>"
+    )
+    SHELL = (
+        '<html><body><div id="root"></div><script src="/app.js"></script></body></html>'
+    )
+
+    def test_rich_static_page_is_remembered_across_instances(self, tmp_path):
+        cache = convert.ResultCache(tmp_path / "c.sqlite3")
+        converter = WebToMarkdown(cache=cache)
+        fetch = MagicMock(return_value=(self.RICH, False))
+        render = MagicMock()
+        with (
+            patch.object(converter, "_get_with_requests", fetch),
+            patch.object(converter, "_get_with_playwright", render),
+        ):
+            converter._python_convert("https://static.example/a", False)
+            converter._python_convert("https://static.example/b", False)
+        assert fetch.call_args_list[0].kwargs == {"spa_probe": True}
+        assert fetch.call_args_list[1].kwargs == {}
+        render.assert_not_called()
+
+        fresh = WebToMarkdown(cache=convert.ResultCache(tmp_path / "c.sqlite3"))
+        assert fresh._needs_browser("https://static.example/c") is False
+        assert fresh._needs_browser("https://other.example/") is None
+
+    def test_spa_headers_switch_to_browser(self):
+        converter = WebToMarkdown()
+        response = requests.Response()
+        response.status_code = 200
+        response.headers.update({"content-type": "text/html", "server": "Vercel"})
+        response.raw = MagicMock()
+        response.iter_content = MagicMock()
+        converter.session.get = MagicMock(return_value=response)
+        with patch.object(
+            converter, "_get_with_playwright", return_value=self.RICH
+        ) as render:
+            result = converter._python_convert("https://app.example/", False)
+        assert "正文内容" in result
+        response.iter_content.assert_not_called()
+        render.assert_called_once_with("https://app.example/")
+        assert converter._needs_browser("https://app.example/x") is True
+
+    def test_thin_spa_shell_falls_back_to_browser(self):
+        converter = WebToMarkdown()
+        with (
+            patch.object(
+                converter, "_get_with_requests", return_value=(self.SHELL, False)
+            ),
+            patch.object(converter, "_get_with_playwright", return_value=self.RICH),
+        ):
+            result = converter._python_convert("https://shell.example/", False)
+        assert "正文内容" in result
+        assert converter._needs_browser("https://shell.example/next") is True
+
+        # 浏览器不可用时使用静态抓取结果，且不记录判定
+        converter = WebToMarkdown()
+        with (
+            patch.object(
+                converter, "_get_with_requests", return_value=(self.SHELL, False)
+            ),
+            patch.object(
+                converter, "_get_with_playwright", side_effect=RuntimeError("boom")
+            ),
+        ):
+            converter._python_convert("https://shell.example/", False)
+        assert converter._needs_browser("https://shell.example/next") is None
+
+    def test_batch_learns_once_per_host(self):
+        converter = WebToMarkdown()
+        probes = []
+
+        def fetch(url, spa_probe=False):
+            if spa_probe:
+                probes.append(url)
+                time.sleep(0.05)
+            return self.RICH, False
+
+        with patch.object(converter, "_get_with_requests", side_effect=fetch):
+            threads = [
+                threading.Thread(
+                    target=converter._python_convert,
+                    args=(f"https://batch.example/{i}", False),
+                )
+                for i in range(6)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert len(probes) == 1
+        assert converter._host_locks == {}
+
+    def test_failed_learn_stops_serializing_host(self):
+        converter = WebToMarkdown()
+        active, peak, calls = [0], [0], []
+        guard = threading.Lock()
+
+        def learn(url, pure_text):
+            with guard:
+                calls.append(url)
+                first = len(calls) == 1
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                time.sleep(0.1)
+                if first:
+                    raise RuntimeError("boom")
+                return "ok"
+            finally:
+                with guard:
+                    active[0] -= 1
+
+        def run(url):
+            try:
+                converter._python_convert(url, False)
+            except RuntimeError:
+                pass
+
+        with patch.object(converter, "_learn_render_mode", side_effect=learn):
+            threads = [
+                threading.Thread(target=run, args=(f"https://flaky.example/{i}",))
+                for i in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.01)
+            for thread in threads:
+                thread.join()
+        assert len(calls) == 4
+        # 首次判定失败后，其余调用方不再排队逐个抓取
+        assert peak[0] >= 2
+        assert converter._host_locks == {}
+
+    def test_waiting_for_host_lock_honours_deadline(self):
+        converter = WebToMarkdown()
+        release = threading.Event()
+
+        def learn(url, pure_text):
+            release.wait(5)
+            return "ok"
+
+        with patch.object(converter, "_learn_render_mode", side_effect=learn):
+            leader = threading.Thread(
+                target=converter._python_convert,
+                args=("https://slow.example/a", False),
+            )
+            leader.start()
+            time.sleep(0.05)
+            reset = _current_token.set(_CancelToken(deadline=time.monotonic() + 0.2))
+            started = time.monotonic()
+            try:
+                with pytest.raises(convert._Cancelled):
+                    converter._python_convert("https://slow.example/b", False)
+            finally:
+                _current_token.reset(reset)
+                release.set()
+                leader.join()
+        assert time.monotonic() - started < 2
+
+
 class TestToMarkdown:
     """测试 HTML 转 Markdown"""
 
@@ -216,6 +386,33 @@ class TestToMarkdown:
         result = converter._to_markdown(html)
         assert "alert" not in result
 
+    def test_prunes_noise_in_single_pass(self):
+        converter = WebToMarkdown()
+        html = (
+            "<html><head><title>Page</title></head><body>"
+            '<main class="layout">'
+            '<div class="share-bar">分享</div>'
+            "<aside>侧栏</aside>"
+            '<p><span class="like-count">3</span></p>'
+            "<p> </p>"
+            '<p>正文 <a href="/x">链接</a></p>'
+            '<ul><li>保留</li><li class="btn">按钮</li></ul>'
+            "</main></body></html>"
+        )
+        result = converter._to_markdown(html)
+        assert result == "# Page\n\n正文 [链接](/x)\n\n* 保留"
+
+    def test_content_requires_visible_text(self):
+        converter = WebToMarkdown()
+        html = (
+            "<html><body>"
+            "<article><script>var x = 1;</script></article>"
+            "<main><p>主内容</p></main>"
+            "</body></html>"
+        )
+        result = converter._to_markdown(html)
+        assert result == "主内容"
+
 
 class TestToPlainText:
     """测试纯文本提取"""
@@ -233,6 +430,73 @@ class TestToPlainText:
         assert "Just a paragraph" in result
 
 
+class TestExtractionProfiles:
+    """测试站点提取配置"""
+
+    def test_noise_classes_match_words_and_keywords(self):
+        converter = WebToMarkdown()
+        html = (
+            "<html><body><main>"
+            '<div class="header-title">标题区</div>'
+            '<div class="upload-area">上传</div>'
+            '<div class="box-shadow">阴影</div>'
+            '<div class="ad-banner">广告</div>'
+            '<div class="adSlot">广告位</div>'
+            '<div class="adbox">广告框</div>'
+            '<div class="sharebar">分享栏</div>'
+            '<div class="commentlist">评论列表</div>'
+            '<div class="cookiebanner">Cookie 提示</div>'
+            '<div class="likely-answer">正文段落</div>'
+            "</main></body></html>"
+        )
+        result = converter._to_markdown(html)
+        assert "标题区" in result and "上传" in result and "阴影" in result
+        assert "正文段落" in result
+        for noise in ("广告", "分享栏", "评论列表", "Cookie 提示"):
+            assert noise not in result
+
+    def test_user_profile_selected_by_host(self, tmp_path, monkeypatch):
+        path = tmp_path / "profiles.json"
+        profile = {
+            "content": ["div.story"],
+            "remove": {"selectors": ["div#related"], "patterns": ["^promo"]},
+            "render": "browser",
+        }
+        path.write_text(json.dumps({"example.com": profile}), encoding="utf-8")
+        monkeypatch.setenv("DOCAI_PROFILES", str(path))
+        converter = WebToMarkdown()
+        html = (
+            "<html><body><article><p>侧栏文章</p></article>"
+            '<div class="story"><p>正文</p><div id="related">相关阅读</div>'
+            '<p class="promotion">推广</p></div></body></html>'
+        )
+        profile = converter._profile("https://news.example.com/a")
+        assert converter._html_result(html, False, profile) == "正文"
+        assert converter._html_result(html, True, profile) == "正文"
+        assert converter._is_known_dynamic_site("https://news.example.com") is True
+        # 未配置的站点使用默认配置
+        assert converter._to_markdown(html).startswith("侧栏文章")
+
+    def test_render_hint_matches_domain_labels(self):
+        converter = WebToMarkdown()
+        assert converter._is_known_dynamic_site("https://blog.medium.com/p") is True
+        assert converter._is_known_dynamic_site("https://box.com/files") is None
+        assert converter._is_known_dynamic_site("https://netflix.com") is None
+
+    def test_twitter_profile_applies_after_proxy_rewrite(self):
+        converter = WebToMarkdown()
+        for url in ("https://x.com/a/status/1", "https://twitter.com/a/status/1"):
+            prepared = converter._prepare_url(url)
+            assert prepared != url
+            assert converter._is_known_dynamic_site(prepared) is True
+
+    def test_invalid_profile_raises(self):
+        with pytest.raises(ValueError, match="example.com"):
+            WebToMarkdown(profiles={"example.com": {"content": ["div > p"]}})
+        with pytest.raises(ValueError, match="example.com"):
+            WebToMarkdown(profiles={"example.com": {"render": "maybe"}})
+
+
 class TestContextManager:
     """测试上下文管理器"""
 
@@ -247,6 +511,58 @@ class TestContextManager:
         converter.session.close.assert_called_once()
 
 
+class TestJinaMirrorRace:
+    """测试 Jina 镜像对冲竞速"""
+
+    BODY = "# Mirror\n\n" + "Content long enough for the length check. " * 3
+
+    def _converter(self, delays):
+        converter = WebToMarkdown()
+        converter.JINA_HEDGE_DELAY = 0.1
+        requested = []
+
+        def get(url, **kwargs):
+            host = url.split("/")[2]
+            requested.append(host)
+            time.sleep(delays.get(host, 0))
+            response = MagicMock()
+            response.raise_for_status.return_value = None
+            response.text = f"{self.BODY} from {host}"
+            return response
+
+        converter.session.get = MagicMock(side_effect=get)
+        return converter, requested
+
+    def test_hedges_slow_mirror(self):
+        converter, requested = self._converter({"r.jinaai.cn": 2})
+        started = time.monotonic()
+        result = converter._try_jina_reader("https://example.com/a", False)
+        assert time.monotonic() - started < 1
+        assert result.endswith("from r.jina.ai")
+        assert requested == ["r.jinaai.cn", "r.jina.ai"]
+
+    def test_prefers_recently_fastest_mirror(self):
+        converter, requested = self._converter({"r.jinaai.cn": 0.3})
+        converter._try_jina_reader("https://example.com/a", False)
+        names, delays = converter._jina_plan()
+        assert names == ["jina:https://r.jina.ai", "jina:https://r.jinaai.cn"]
+        # 对冲延迟按首选镜像的 p95 延迟计算，不低于下限
+        assert delays["jina:https://r.jinaai.cn"] == converter.JINA_HEDGE_DELAY_RANGE[0]
+
+        requested.clear()
+        converter._try_jina_reader("https://example.com/b", False)
+        assert requested == ["r.jina.ai"]
+
+    def test_configurable_mirrors(self, monkeypatch):
+        converter = WebToMarkdown(jina_mirrors=["https://jina.internal/"])
+        assert converter.JINA_BASE_URLS == ("https://jina.internal",)
+        monkeypatch.setenv("DOCAI_JINA_MIRRORS", "https://a.example, https://b.example")
+        assert WebToMarkdown().JINA_BASE_URLS == (
+            "https://a.example",
+            "https://b.example",
+        )
+
+
 class TestParallelConvert:
     """测试并行转换"""
 
@@ -278,6 +594,1338 @@ class TestParallelConvert:
         assert result == "# Playwright"
 
 
+class TestRaceEngine:
+    """测试首个成功者胜出的竞速引擎"""
+
+    def test_returns_without_waiting_for_losers(self):
+        converter = WebToMarkdown()
+        loser_cancelled = threading.Event()
+
+        def slow_backend(url, pure_text):
+            token = _current_token.get()
+            token.on_cancel(loser_cancelled.set)
+            time.sleep(3)
+            return "# Slow"
+
+        started = time.monotonic()
+        with (
+            patch.object(WebToMarkdown, "_try_jina_reader", return_value="# Jina"),
+            patch.object(WebToMarkdown, "_python_convert", side_effect=slow_backend),
+            patch.object(WebToMarkdown, "_try_playwright", side_effect=slow_backend),
+        ):
+            result = converter._parallel_convert("https://example.com", False)
+
+        assert result == "# Jina"
+        assert time.monotonic() - started < 1
+        assert loser_cancelled.wait(1)
+
+    def test_deadline_stops_race(self):
+        converter = WebToMarkdown()
+        token = _CancelToken(deadline=time.monotonic() + 0.2)
+        name, result = converter._race(
+            [("slow", time.sleep, (2,))],
+            token,
+        )
+        assert (name, result) == (None, None)
+        assert token.cancelled
+
+    def test_cancel_runs_callbacks_once(self):
+        token = _CancelToken()
+        calls = []
+        token.on_cancel(lambda: calls.append(1))
+        token.cancel()
+        token.cancel()
+        assert calls == [1]
+        # 已取消时注册的回调立即执行
+        token.on_cancel(lambda: calls.append(2))
+        assert calls == [1, 2]
+
+
+class TestDeadline:
+    """测试贯穿所有后端的总时间预算"""
+
+    @staticmethod
+    def _until_cancelled(*args):
+        """模拟一直不返回的后端：阻塞到令牌被取消"""
+        cancelled = threading.Event()
+        _current_token.get().on_cancel(cancelled.set)
+        cancelled.wait(5)
+        raise convert._Cancelled()
+
+    def test_race_stops_at_deadline_without_negative_cache(self):
+        converter = WebToMarkdown()
+        started = time.monotonic()
+        with (
+            patch.object(WebToMarkdown, "_try_jina_reader", self._until_cancelled),
+            patch.object(WebToMarkdown, "_python_convert", self._until_cancelled),
+            patch.object(WebToMarkdown, "_try_playwright", self._until_cancelled),
+        ):
+            record = converter._convert_one(
+                "https://slow.example/", False, False, deadline=0.3
+            )
+        assert time.monotonic() - started < 1
+        assert record["ok"] is False
+        assert record["deadline_exceeded"] is True
+        assert record["error"] == "超出时间预算"
+        assert converter._failures == {}
+
+    def test_returns_static_result_when_render_runs_out_of_budget(self):
+        converter = WebToMarkdown()
+        shell = (
+            '<html><body><div id="root"><p>首屏摘要</p></div>'
+            '<script src="/app.js"></script></body></html>'
+        )
+        with (
+            patch.object(converter, "_get_with_requests", return_value=(shell, False)),
+            patch.object(converter, "_get_with_playwright", self._until_cancelled),
+        ):
+            started = time.monotonic()
+            result = converter.convert(
+                "https://shell.example/", use_python=True, deadline=0.3
+            )
+        assert time.monotonic() - started < 1
+        assert "首屏摘要" in result
+        assert converter._needs_browser("https://shell.example/next") is None
+
+    def test_partial_result_is_not_cached(self, tmp_path):
+        converter = WebToMarkdown(cache=convert.ResultCache(tmp_path / "c.sqlite3"))
+        shell = '<html><body><div id="root"><p>首屏摘要</p></div></body></html>'
+        full = "<html><body><article><p>完整正文</p></article></body></html>"
+        with (
+            patch.object(converter, "_get_with_requests", return_value=(shell, False)),
+            patch.object(converter, "_get_with_playwright", self._until_cancelled),
+        ):
+            partial = converter.convert(
+                "https://shell.example/", use_python=True, deadline=0.3
+            )
+        assert partial.info["deadline_exceeded"] is True
+        with (
+            patch.object(converter, "_get_with_requests", return_value=(shell, False)),
+            patch.object(converter, "_get_with_playwright", return_value=full),
+        ):
+            result = converter.convert("https://shell.example/", use_python=True)
+        assert "完整正文" in result
+        assert result.backend != "cache"
+
+    def test_deadline_interrupts_close_delimited_download(self, close_delimited_server):
+        with WebToMarkdown() as converter:
+            started = time.monotonic()
+            result = converter.convert(
+                close_delimited_server, use_python=True, deadline=1.0
+            )
+            elapsed = time.monotonic() - started
+        assert elapsed < 2
+        assert result is None or result.info["deadline_exceeded"] is True
+
+    def test_retry_backoff_is_capped_by_budget(self):
+        retry = convert._budget_retry()(total=5, backoff_factor=1)
+        for _ in range(3):
+            retry = retry.increment(method="GET", url="/", error=OSError())
+        assert retry.get_backoff_time() == 4
+        assert not retry.is_exhausted()
+
+        response = MagicMock()
+        response.headers = {"Retry-After": "60"}
+        reset = _current_token.set(_CancelToken(deadline=time.monotonic() + 1))
+        try:
+            assert retry.is_exhausted()  # 剩余 1 秒不够退避 4 秒
+            assert retry.get_retry_after(response) <= 1
+        finally:
+            _current_token.reset(reset)
+
+    def test_aconvert_deadline(self):
+        import asyncio
+
+        converter = convert.AsyncWebToMarkdown()
+
+        async def hang(self, url, pure_text):
+            await asyncio.sleep(5)
+
+        async def run():
+            async with converter:
+                return await converter.aconvert("https://slow.example/", deadline=0.3)
+
+        started = time.monotonic()
+        with (
+            patch.object(convert.AsyncWebToMarkdown, "_atry_jina_reader", hang),
+            patch.object(convert.AsyncWebToMarkdown, "_apython_convert", hang),
+            patch.object(convert.AsyncWebToMarkdown, "_atry_playwright", hang),
+        ):
+            assert asyncio.run(run()) is None
+        assert time.monotonic() - started < 1
+        assert converter._failures == {}
+
+    def test_aconvert_deadline_cancels_background_task(self, tmp_path):
+        import asyncio
+
+        converter = convert.AsyncWebToMarkdown(
+            cache=convert.ResultCache(tmp_path / "c.sqlite3")
+        )
+        cancelled = []
+
+        async def hang(self, url, pure_text):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            return "# Late"
+
+        async def run():
+            async with converter:
+                result = await converter.aconvert(
+                    "https://slow.example/", use_python=True, deadline=0.3
+                )
+                await asyncio.sleep(0.2)
+                # 预算到期后任务已被取消，而不是在后台继续运行
+                return result, list(cancelled), dict(converter._aflights)
+
+        with patch.object(convert.AsyncWebToMarkdown, "_apython_convert", hang):
+            assert asyncio.run(run()) == (None, ["https://slow.example/"], {})
+        key = converter._cache_key("https://slow.example/", False, True)
+        assert converter.cache.get(key) is None
+
+    def test_budget_does_not_start_thread_per_call(self):
+        converter = WebToMarkdown()
+        fired = []
+        with converter._budget(0.05) as token:
+            token.on_cancel(lambda: fired.append("first"))
+        threads = threading.active_count()
+        contexts = [converter._budget(0.2) for _ in range(20)]
+        tokens = [context.__enter__() for context in contexts]
+        assert threading.active_count() == threads
+        tokens[-1].on_cancel(lambda: fired.append("last"))
+        time.sleep(0.4)
+        for context in reversed(contexts):
+            context.__exit__(None, None, None)
+        # 退出前未到期的预算不会再触发取消
+        assert fired == ["last"]
+        assert all(token.cancelled for token in tokens)
+
+    def test_aconvert_budget_uses_event_loop_timer(self):
+        import asyncio
+
+        converter = convert.AsyncWebToMarkdown()
+
+        async def run():
+            threads = threading.active_count()
+            with converter._budget(0.1, asyncio.get_running_loop()) as token:
+                fired = asyncio.Event()
+                token.on_cancel(fired.set)
+                assert threading.active_count() == threads
+                await asyncio.wait_for(fired.wait(), 1)
+            return token.cancelled
+
+        assert asyncio.run(run()) is True
+
+
+class TestAdaptiveRouting:
+    """测试按域名统计的自适应路由"""
+
+    def test_registrable_domain(self):
+        assert (
+            convert._registrable_domain("https://blog.example.com/a") == "example.com"
+        )
+        assert convert._registrable_domain("https://news.bbc.co.uk/") == "bbc.co.uk"
+        assert convert._registrable_domain("http://127.0.0.1:8000/") == "127.0.0.1"
+
+    def _dominated_stats(self, path=None):
+        stats = convert.BackendStats(path)
+        for _ in range(10):
+            stats.record("example.com", "jina", True, 1.0)
+            stats.record_win("example.com", "jina")
+        stats.record("example.com", "python", True, 3.0)
+        stats.record_win("example.com", "python")
+        return stats
+
+    def test_plan_requires_enough_data(self):
+        stats = convert.BackendStats()
+        stats.record("example.com", "jina", True, 1.0)
+        stats.record_win("example.com", "jina")
+        assert stats.plan("example.com", ["jina", "python"]) is None
+
+    def test_plan_prefers_best_and_hedges_second(self):
+        stats = self._dominated_stats()
+        plan = stats.plan("example.com", ["jina", "python", "playwright"])
+        assert plan == {"jina": 0, "python": 1.0, "playwright": None}
+
+    def test_stats_persist(self, tmp_path):
+        path = tmp_path / "stats.json"
+        self._dominated_stats(path).save()
+        reloaded = convert.BackendStats(path)
+        assert reloaded.plan("example.com", ["jina", "python"])["jina"] == 0
+
+    def test_routed_race_skips_fallback_backends(self):
+        converter = WebToMarkdown(backend_stats=self._dominated_stats())
+        converter.EXPLORE_RATE = 0
+        with (
+            patch.object(WebToMarkdown, "_try_jina_reader", return_value="# Jina"),
+            patch.object(WebToMarkdown, "_python_convert") as mock_python,
+            patch.object(WebToMarkdown, "_try_playwright") as mock_playwright,
+        ):
+            result = converter._parallel_convert("https://www.example.com/a", False)
+        assert result == "# Jina"
+        mock_python.assert_not_called()
+        mock_playwright.assert_not_called()
+
+    def test_falls_back_to_full_race_when_favored_fails(self):
+        converter = WebToMarkdown(backend_stats=self._dominated_stats())
+        converter.EXPLORE_RATE = 0
+        with (
+            patch.object(WebToMarkdown, "_try_jina_reader", return_value=None),
+            patch.object(WebToMarkdown, "_python_convert", return_value=None),
+            patch.object(WebToMarkdown, "_try_playwright", return_value="# Playwright"),
+        ):
+            result = converter._parallel_convert("https://example.com/a", False)
+        assert result == "# Playwright"
+
+    def test_hedge_starts_after_delay(self):
+        converter = WebToMarkdown()
+        started = {}
+
+        def backend(name, delay, value):
+            def run():
+                started[name] = time.monotonic()
+                time.sleep(delay)
+                return value
+
+            return run
+
+        begin = time.monotonic()
+        name, result = converter._race(
+            [
+                ("slow", backend("slow", 1, "# Slow"), ()),
+                ("hedge", backend("hedge", 0, "# Hedge"), ()),
+                ("rest", backend("rest", 0, "# Rest"), ()),
+            ],
+            _CancelToken(),
+            delays={"slow": 0, "hedge": 0.2, "rest": None},
+        )
+        assert (name, result) == ("hedge", "# Hedge")
+        assert started["hedge"] - begin >= 0.2
+        assert "rest" not in started
+
+
+class TestConvertMany:
+    """测试批量转换"""
+
+    def test_streams_results_and_survives_failures(self):
+        converter = WebToMarkdown()
+
+        def fake_convert(url, **kwargs):
+            if "bad" in url:
+                raise RuntimeError("boom")
+            convert._record(backend="jina")
+            return f"# {url}"
+
+        urls = ["https://a.com/1", "", "# comment", "https://b.com/bad"]
+        with patch.object(converter, "convert", side_effect=fake_convert):
+            records = {r["url"]: r for r in converter.convert_many(urls)}
+
+        assert set(records) == {"https://a.com/1", "https://b.com/bad"}
+        assert records["https://a.com/1"]["ok"]
+        assert records["https://a.com/1"]["backend"] == "jina"
+        assert records["https://a.com/1"]["content"] == "# https://a.com/1"
+        assert not records["https://b.com/bad"]["ok"]
+        assert records["https://b.com/bad"]["error"] == "boom"
+
+    def test_per_host_limit(self):
+        converter = WebToMarkdown()
+        lock = threading.Lock()
+        active = {}
+        peak = {}
+
+        def fake_convert(url, **kwargs):
+            host = url.split("/")[2]
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                peak[host] = max(peak.get(host, 0), active[host])
+            time.sleep(0.02)
+            with lock:
+                active[host] -= 1
+            return "# ok"
+
+        urls = [f"https://a.com/{i}" for i in range(6)]
+        urls += [f"https://b.com/{i}" for i in range(6)]
+        with patch.object(converter, "convert", side_effect=fake_convert):
+            records = list(converter.convert_many(urls, max_workers=8, per_host=2))
+
+        assert len(records) == 12
+        assert all(r["ok"] for r in records)
+        assert peak == {"a.com": 2, "b.com": 2}
+
+    def test_rejects_non_positive_limits(self, monkeypatch, capsys):
+        converter = WebToMarkdown()
+        with pytest.raises(ValueError, match="per_host"):
+            converter.convert_many(["https://a.com/1"], per_host=0)
+        with pytest.raises(ValueError, match="max_workers"):
+            converter.convert_many(["https://a.com/1"], max_workers=0)
+
+        monkeypatch.setattr(
+            sys, "argv", ["convert.py", "--input", "-", "--per-host", "0"]
+        )
+        with pytest.raises(SystemExit) as exc:
+            convert.main()
+        assert exc.value.code == 2
+        assert "--per-host" in capsys.readouterr().err
+
+    def test_cli_batch_writes_jsonl(self, tmp_path, monkeypatch):
+        url_file = tmp_path / "urls.txt"
+        url_file.write_text("https://a.com/1\nhttps://a.com/2\n", encoding="utf-8")
+        out_file = tmp_path / "out.jsonl"
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "convert.py",
+                "--input",
+                str(url_file),
+                "-o",
+                str(out_file),
+                "--no-cache",
+            ],
+        )
+        with (
+            patch.object(WebToMarkdown, "convert", return_value="# ok"),
+            pytest.raises(SystemExit) as exc,
+        ):
+            convert.main()
+
+        assert exc.value.code == 0
+        lines = out_file.read_text(encoding="utf-8").splitlines()
+        assert sorted(json.loads(line)["url"] for line in lines) == [
+            "https://a.com/1",
+            "https://a.com/2",
+        ]
+
+
+class TestResultCache:
+    """测试磁盘结果缓存"""
+
+    def test_normalize_url(self):
+        assert (
+            convert._normalize_url("HTTPS://Example.COM:443/a?b=2&a=1#frag")
+            == "https://example.com/a?a=1&b=2"
+        )
+
+    def test_ttl_expiry(self, tmp_path):
+        cache = convert.ResultCache(tmp_path / "c.sqlite3")
+        cache.set("k", "value", ttl=-1)
+        assert cache.get("k") is None
+        entry = cache.get("k", allow_stale=True)
+        assert entry.value == b"value"
+        assert not entry.fresh
+
+    def test_lru_eviction_by_bytes(self, tmp_path):
+        cache = convert.ResultCache(tmp_path / "c.sqlite3", max_bytes=250)
+        cache.set("a", b"x" * 100)
+        time.sleep(0.01)
+        cache.set("b", b"x" * 100)
+        time.sleep(0.01)
+        cache.get("a")  # a 最近被访问，应保留
+        time.sleep(0.01)
+        cache.set("c", b"x" * 100)
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+        assert cache.total_bytes() <= 250
+
+    @patch.object(WebToMarkdown, "_parallel_convert", return_value="# Fresh")
+    def test_convert_uses_cache(self, mock_parallel, tmp_path):
+        converter = WebToMarkdown(cache=convert.ResultCache(tmp_path / "c.sqlite3"))
+        assert converter.convert("https://example.com/a") == "# Fresh"
+        assert converter.convert("https://EXAMPLE.com/a#top") == "# Fresh"
+        assert mock_parallel.call_count == 1
+        # 不同模式使用不同的缓存键
+        converter.convert("https://example.com/a", pure_text=True)
+        assert mock_parallel.call_count == 2
+        # refresh 跳过缓存读取
+        converter.convert("https://example.com/a", refresh=True)
+        assert mock_parallel.call_count == 3
+
+    def test_revalidates_with_etag(self, tmp_path):
+        converter = WebToMarkdown(cache=convert.ResultCache(tmp_path / "c.sqlite3"))
+        first = MagicMock(status_code=200)
+        first.iter_content.return_value = [b"<p>hi</p>"]
+        first.headers = {"content-type": "text/html", "etag": '"v1"'}
+        not_modified = MagicMock(status_code=304)
+        converter.session.get = MagicMock(side_effect=[first, not_modified])
+
+        assert converter._get_with_requests("https://example.com/") == (
+            "<p>hi</p>",
+            False,
+        )
+        assert converter._get_with_requests("https://example.com/") == (
+            "<p>hi</p>",
+            False,
+        )
+        second_call = converter.session.get.call_args_list[1]
+        assert second_call.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+    def test_revalidates_pdf_to_temp_file(self, tmp_path):
+        converter = WebToMarkdown(cache=convert.ResultCache(tmp_path / "c.sqlite3"))
+        pdf = b"%PDF-1.4 body"
+        first = MagicMock(status_code=200)
+        first.iter_content.return_value = [pdf]
+        first.headers = {"content-type": "application/pdf", "etag": '"v1"'}
+        not_modified = MagicMock(status_code=304)
+        converter.session.get = MagicMock(side_effect=[first, not_modified])
+
+        for _ in range(2):
+            path, is_pdf = converter._get_with_requests("https://example.com/a.pdf")
+            assert is_pdf is True
+            assert path.read_bytes() == pdf
+            path.unlink()
+        second_call = converter.session.get.call_args_list[1]
+        assert second_call.kwargs["headers"]["If-None-Match"] == '"v1"'
+
+
+class TestBoundedDownload:
+    """测试流式下载的大小上限、魔数识别与增量解码"""
+
+    def _response(self, chunks, headers=None):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers.update(headers or {})
+        response.raw = MagicMock()
+        consumed = []
+
+        def iter_content(chunk_size=1):
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        response.iter_content = iter_content
+        return response, consumed
+
+    def test_decodes_charset_incrementally(self):
+        converter = WebToMarkdown()
+        html = '<html><head><meta charset="gbk"></head><body>中文内容</body></html>'
+        data = html.encode("gbk")
+        # 在多字节字符中间切分数据块
+        chunks = [data[:48], data[48:49], data[49:]]
+        response, _ = self._response(chunks, {"content-type": "text/html"})
+        converter.session.get = MagicMock(return_value=response)
+        content, is_pdf = converter._get_with_requests("https://example.com/")
+        assert not is_pdf and content == html
+
+        data = "<p>标题</p>".encode("utf-8")
+        response, _ = self._response(
+            [data[:4], data[4:]], {"content-type": "text/html"}
+        )
+        converter.session.get = MagicMock(return_value=response)
+        assert converter._get_with_requests("https://example.com/b")[0] == "<p>标题</p>"
+
+    def test_sniffs_pdf_without_headers(self):
+        converter = WebToMarkdown()
+        response, _ = self._response([b"%PDF-1.7\n", b"rest"], {})
+        converter.session.get = MagicMock(return_value=response)
+        path, is_pdf = converter._get_with_requests("https://example.com/download")
+        try:
+            assert is_pdf and path.read_bytes() == b"%PDF-1.7\nrest"
+        finally:
+            path.unlink()
+
+        # 声称是 PDF 的 HTML 错误页按 HTML 处理
+        response, _ = self._response([b"<html>error</html>"], {})
+        converter.session.get = MagicMock(return_value=response)
+        assert converter._get_with_requests("https://example.com/a.pdf") == (
+            "<html>error</html>",
+            False,
+        )
+
+    def test_aborts_unsupported_binary_after_first_chunk(self):
+        converter = WebToMarkdown()
+        response, consumed = self._response(
+            [b"\x89PNG\r\n\x1a\n" + b"\x00" * 100] * 1000,
+            {"content-type": "application/octet-stream"},
+        )
+        converter.session.get = MagicMock(return_value=response)
+        with pytest.raises(ValueError, match="不支持的内容类型"):
+            converter._get_with_requests("https://example.com/big")
+        assert len(consumed) == 1
+
+    def test_enforces_size_caps(self, tmp_path, monkeypatch):
+        converter = WebToMarkdown(max_download_bytes={"html": 100, "pdf": 200})
+        response, consumed = self._response(
+            [b"<p>" + b"x" * 60] * 10, {"content-type": "text/html"}
+        )
+        converter.session.get = MagicMock(return_value=response)
+        with pytest.raises(ValueError, match="大小上限"):
+            converter._get_with_requests("https://example.com/endless")
+        assert len(consumed) == 2
+
+        response, consumed = self._response(
+            [b"<p>x</p>"], {"content-type": "text/html", "content-length": "5000"}
+        )
+        converter.session.get = MagicMock(return_value=response)
+        with pytest.raises(ValueError, match="大小上限"):
+            converter._get_with_requests("https://example.com/declared")
+
+        # 超限的 PDF 临时文件被删除
+        monkeypatch.setattr(convert.tempfile, "tempdir", str(tmp_path))
+        response, _ = self._response([b"%PDF-1.7\n" + b"x" * 150] * 3, {})
+        converter.session.get = MagicMock(return_value=response)
+        with pytest.raises(ValueError, match="大小上限"):
+            converter._get_with_requests("https://example.com/huge.pdf")
+        assert list(tmp_path.iterdir()) == []
+
+    def test_async_reader_applies_same_rules(self):
+        import asyncio
+
+        httpx = pytest.importorskip("httpx")
+
+        def handler(request):
+            if request.url.path == "/gbk":
+                body = '<meta charset="gb2312"><p>中文</p>'.encode("gbk")
+                return httpx.Response(200, content=body)
+            return httpx.Response(200, content=b"<p>" + b"x" * 500)
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            converter = convert.AsyncWebToMarkdown(
+                client=client, max_download_bytes={"html": 100}
+            )
+            html, _ = await converter._aget_with_requests("https://example.com/gbk")
+            with pytest.raises(ValueError, match="大小上限"):
+                await converter._aget_with_requests("https://example.com/big")
+            await client.aclose()
+            return html
+
+        assert asyncio.run(run()) == '<meta charset="gb2312"><p>中文</p>'
+
+
+def _make_pdf(pages, title=None):
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"Heading {i + 1}\nBody of page {i + 1}")
+    if title:
+        doc.set_metadata({"title": title})
+    return doc.tobytes()
+
+
+class TestConvertResult:
+    """测试保留原始内容、按需生成各种表示的转换结果"""
+
+    HTML = (
+        "<html><head><title>Doc Title</title></head><body><article>"
+        + "<h2>Section</h2><p>Some <b>bold</b> text.</p>" * 80
+        + "</article></body></html>"
+    )
+
+    def test_one_fetch_serves_markdown_and_text(self):
+        converter = WebToMarkdown()
+        fetch = MagicMock(return_value=(self.HTML, False))
+        with patch.object(converter, "_get_with_requests", fetch):
+            result = converter.convert("https://example.com/doc", use_python=True)
+            assert isinstance(result, str)
+            assert result == converter._to_markdown(self.HTML)
+            assert result.markdown == result
+            assert result.text == converter._to_plain_text(self.HTML)
+            assert result.pages == [(1, result.text)]
+        assert fetch.call_count == 1
+        assert result.backend == "python"
+        assert result.content_type == "text/html" and result.raw == self.HTML
+        assert result.url == "https://example.com/doc"
+        assert result.title == "Doc Title"
+        assert result.elapsed >= 0
+
+    def test_jina_views_match_mode_specific_output(self):
+        converter = WebToMarkdown()
+        content = "# Title\n\n\n\nBody text that is long enough to be accepted.   \n"
+        response = MagicMock()
+        response.text = content
+        converter.session.get = MagicMock(return_value=response)
+        result = converter._try_jina_reader("https://example.com/a", False)
+        assert result == converter._jina_result(content, False)
+        assert result.text == converter._jina_result(content, True)
+        assert converter.session.get.call_count == 1
+
+    def test_pdf_pages_and_temp_file_lifetime(self, tmp_path):
+        import gc
+
+        path = tmp_path / "spooled.pdf"
+        path.write_bytes(_make_pdf(2))
+        converter = WebToMarkdown()
+        result = converter._process_spooled_pdf(path, True, "https://example.com/p")
+        assert result.startswith("--- Page 1 ---")
+        assert result.markdown.startswith("# Heading 1")
+        assert [number for number, _ in result.pages] == [1, 2]
+        assert result.content_type == "application/pdf" and path.exists()
+        del result
+        gc.collect()
+        assert not path.exists()
+
+    def test_cached_result_and_serialization(self, tmp_path):
+        import pickle
+
+        converter = WebToMarkdown(cache=convert.ResultCache(tmp_path / "c.sqlite3"))
+        markdown = "# Title\n\nSome **bold** [link](https://example.com)."
+        with patch.object(converter, "_parallel_convert", return_value=markdown):
+            converter.convert("https://example.com/c")
+        result = converter.convert("https://example.com/c")
+        assert result.backend == "cache"
+        assert result.text == "Title\n\nSome bold link."
+        assert json.dumps(result) == json.dumps(markdown)
+        restored = pickle.loads(pickle.dumps(result))
+        assert type(restored) is str and restored == markdown
+
+
+class TestSingleFlight:
+    """测试同一 URL 并发转换的合并"""
+
+    def _run_concurrently(self, fn, count=5):
+        results = [None] * count
+
+        def call(i):
+            try:
+                results[i] = fn()
+            except Exception as e:
+                results[i] = e
+
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_concurrent_calls_share_one_conversion(self):
+        converter = WebToMarkdown()
+        calls = []
+
+        def slow(url, pure_text, use_python):
+            calls.append(url)
+            time.sleep(0.2)
+            convert._record(backend="jina")
+            return "# Shared"
+
+        with patch.object(converter, "_convert_uncached", side_effect=slow):
+            results = self._run_concurrently(
+                lambda: converter._convert_one(
+                    "https://arxiv.org/abs/2601.04500v1", False, False
+                )
+            )
+        assert len(calls) == 1
+        assert all(r["content"] == "# Shared" for r in results)
+        assert all(r["backend"] == "jina" for r in results)
+        assert sum(bool(r.get("coalesced")) for r in results) == 4
+        assert converter._flights == {}
+
+    def test_exception_is_shared(self):
+        converter = WebToMarkdown()
+        calls = []
+
+        def failing(url, pure_text, use_python):
+            calls.append(url)
+            time.sleep(0.2)
+            raise RuntimeError("boom")
+
+        with patch.object(converter, "_convert_uncached", side_effect=failing):
+            results = self._run_concurrently(
+                lambda: converter.convert("https://example.com/a")
+            )
+        assert len(calls) == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_different_modes_are_not_merged(self):
+        converter = WebToMarkdown()
+        calls = []
+
+        def slow(url, pure_text, use_python):
+            calls.append(pure_text)
+            time.sleep(0.1)
+            return "text" if pure_text else "# md"
+
+        modes = iter([True, False])
+        with patch.object(converter, "_convert_uncached", side_effect=slow):
+            results = self._run_concurrently(
+                lambda: converter.convert("https://example.com/a", next(modes)), 2
+            )
+        assert sorted(calls) == [False, True]
+        assert sorted(results) == ["# md", "text"]
+
+    def test_cache_lock_serializes_processes(self, tmp_path):
+        cache = convert.ResultCache(tmp_path / "cache.db")
+        events = []
+
+        def holder():
+            with cache.lock("k") as locked:
+                events.append(("holder", locked))
+                time.sleep(0.2)
+            events.append(("released", None))
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        time.sleep(0.05)
+        # 同进程内另开文件描述符，与其他进程竞争锁的行为一致
+        with cache.lock("k", timeout=5) as locked:
+            events.append(("waiter", locked))
+        thread.join()
+        assert events == [("holder", True), ("released", None), ("waiter", True)]
+        assert list((tmp_path / "locks").iterdir()) == []
+
+        with cache.lock("k") as locked:
+            with cache.lock("k", timeout=0.1) as second:
+                assert locked and not second
+
+    def test_waiter_reads_result_written_by_lock_holder(self, tmp_path):
+        cache = convert.ResultCache(tmp_path / "cache.db")
+        converter = WebToMarkdown(cache=cache)
+        url = "https://example.com/a"
+        key = converter._cache_key(url, False, False)
+
+        def other_process():
+            with cache.lock(key):
+                time.sleep(0.2)
+                cache.set(key, "# From other process")
+
+        thread = threading.Thread(target=other_process)
+        thread.start()
+        time.sleep(0.05)
+        info = {}
+        token = convert._current_info.set(info)
+        try:
+            with patch.object(converter, "_convert_uncached") as mock_convert:
+                assert converter.convert(url) == "# From other process"
+        finally:
+            convert._current_info.reset(token)
+        thread.join()
+        mock_convert.assert_not_called()
+        assert info == {"backend": "cache", "coalesced": True}
+
+    def test_aconvert_shares_task(self):
+        import asyncio
+
+        converter = convert.AsyncWebToMarkdown()
+        calls = []
+
+        async def slow(self, url, pure_text, use_python):
+            calls.append(url)
+            await asyncio.sleep(0.1)
+            return "# Shared"
+
+        async def run():
+            async with converter:
+                return await asyncio.gather(
+                    *(converter.aconvert("https://example.com/a") for _ in range(5))
+                )
+
+        with patch.object(convert.AsyncWebToMarkdown, "_aconvert_uncached", slow):
+            assert asyncio.run(run()) == ["# Shared"] * 5
+        assert len(calls) == 1
+        assert converter._aflights == {}
+
+
+class TestCircuitBreakers:
+    """测试远程端点熔断与失败缓存"""
+
+    def test_opens_after_threshold_and_probes_once(self):
+        breakers = convert.CircuitBreakers(failure_threshold=2, cooldown=0.1)
+        for _ in range(2):
+            assert breakers.allow("jina")
+            breakers.record("jina", False)
+        assert breakers.state("jina") == "open"
+        assert not breakers.available("jina") and not breakers.allow("jina")
+
+        time.sleep(0.12)
+        assert breakers.state("jina") == "half-open"
+        assert breakers.allow("jina")
+        assert not breakers.allow("jina")  # 只放行一个探测请求
+        breakers.record("jina", None)  # 探测被取消：释放名额，状态不变
+        assert breakers.allow("jina")
+        breakers.record("jina", False)  # 探测失败：重新熔断，冷却加倍
+        assert breakers.snapshot()["jina"]["retry_in"] > 0.1
+
+        time.sleep(0.22)
+        assert breakers.allow("jina")
+        breakers.record("jina", True)
+        assert breakers.state("jina") == "closed"
+
+    def test_skips_open_jina_mirror(self):
+        converter = WebToMarkdown(
+            circuit_breakers=convert.CircuitBreakers(failure_threshold=1)
+        )
+        response = MagicMock()
+        response.raise_for_status.return_value = None
+        response.text = "# Mirror\n\n" + "Content long enough for the check. " * 3
+
+        def get(url, **kwargs):
+            if url.startswith("https://r.jinaai.cn/"):
+                raise requests.ConnectionError("down")
+            return response
+
+        converter.session.get = MagicMock(side_effect=get)
+        for _ in range(2):
+            assert converter._try_jina_reader("https://example.com/a", False)
+        mirrors = [
+            c.args[0].split("/")[2] for c in converter.session.get.call_args_list
+        ]
+        assert mirrors == ["r.jinaai.cn", "r.jina.ai", "r.jina.ai"]
+        assert converter.circuit_breakers.state("jina:https://r.jinaai.cn") == "open"
+        assert converter._jina_plan() == (
+            ["jina:https://r.jina.ai"],
+            {"jina:https://r.jina.ai": 0},
+        )
+
+    def test_url_errors_do_not_trip(self):
+        converter = WebToMarkdown(
+            circuit_breakers=convert.CircuitBreakers(failure_threshold=1)
+        )
+        response = requests.Response()
+        response.status_code = 404
+        converter.session.get = MagicMock(return_value=response)
+        assert converter._try_jina_reader("https://example.com/missing", False) is None
+        assert converter.circuit_breakers.snapshot() == {
+            f"jina:{base}": {"state": "closed", "failures": 0, "retry_in": 0.0}
+            for base in converter.JINA_BASE_URLS
+        }
+
+    @patch.object(WebToMarkdown, "_try_jina_reader", return_value="# Jina")
+    @patch.object(WebToMarkdown, "_python_convert", return_value="# Python")
+    @patch.object(WebToMarkdown, "_try_playwright", return_value=None)
+    def test_race_excludes_fully_open_backend(self, _pw, _py, jina):
+        converter = WebToMarkdown(
+            circuit_breakers=convert.CircuitBreakers(failure_threshold=1)
+        )
+        for base in converter.JINA_BASE_URLS:
+            converter.circuit_breakers.record(f"jina:{base}", False)
+        assert converter._parallel_convert("https://example.com", False) == "# Python"
+        jina.assert_not_called()
+
+    def test_negative_cache(self, tmp_path):
+        converter = WebToMarkdown()
+        with patch.object(
+            converter, "_convert_uncached", return_value=None
+        ) as mock_convert:
+            assert converter.convert("https://example.com/a") is None
+            assert converter.convert("https://example.com/a") is None
+            assert mock_convert.call_count == 1
+            converter.convert("https://example.com/a", refresh=True)
+            assert mock_convert.call_count == 2
+
+        # 启用 ResultCache 时，共享缓存的其他转换器（进程）同样跳过
+        cache = convert.ResultCache(tmp_path / "cache.db")
+        with patch.object(WebToMarkdown, "_convert_uncached", return_value=None):
+            WebToMarkdown(cache=cache).convert("https://example.com/b")
+        other = WebToMarkdown(cache=cache)
+        with patch.object(other, "_convert_uncached", return_value="# B") as mock_b:
+            record = other._convert_one("https://example.com/b", False, False)
+            assert record["negative_cached"] and not record["ok"]
+            assert other.convert("https://example.com/b", refresh=True) == "# B"
+            assert other.convert("https://example.com/b") == "# B"
+            assert mock_b.call_count == 1
+
+
+class TestRateLimiter:
+    """测试按主机的限速与 Retry-After 退让"""
+
+    @staticmethod
+    def _response(status, retry_after=None):
+        response = requests.Response()
+        response.status_code = status
+        if retry_after is not None:
+            response.headers["Retry-After"] = retry_after
+        response.raw = MagicMock()
+        return response
+
+    def test_retry_after_pauses_host_and_learns_rate(self):
+        limiter = convert.RateLimiter(rate_step=1.0)
+        for _ in range(5):
+            assert limiter.reserve("api.example") == 0
+        limiter.observe("api.example", 429, "0.5")
+        assert 0.4 < limiter.delay("api.example") <= 0.5
+        assert limiter.delay("other.example") == 0
+        assert limiter.reserve("api.example", max_wait=0.1) is None  # 超出预算不预约
+        learned = limiter.snapshot()["api.example"]["rate"]
+        assert learned == 2.5  # 最近 1 秒内 5 个请求，减半
+
+        # 同一轮限流中的其他 429 不重复降速；未被限流的响应逐步恢复速率
+        limiter.observe("api.example", 429, "0.5")
+        assert limiter.snapshot()["api.example"]["rate"] == learned
+        limiter.observe("api.example", 200)
+        assert limiter.snapshot()["api.example"]["rate"] == learned + 1
+
+        assert convert._parse_retry_after("3") == 3.0
+        assert convert._parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert convert._parse_retry_after("soon") is None
+
+    def test_configured_limit_spaces_requests(self):
+        limiter = convert.RateLimiter(limits={"example.com": 10.0}, burst=1)
+        assert limiter.reserve("api.example.com") == 0
+        assert limiter.reserve("api.example.com") == pytest.approx(0.1, abs=0.01)
+        assert limiter.reserve("example.org") == 0
+
+    def test_429_pauses_all_requests_to_the_host(self):
+        converter = WebToMarkdown(rate_limiter=convert.RateLimiter(min_rate=20))
+        sent = []
+
+        def get(url, **kwargs):
+            sent.append((url, time.monotonic()))
+            if len(sent) == 1:
+                return self._response(429, "0.3")
+            return self._response(200)
+
+        converter.session.get = MagicMock(side_effect=get)
+        started = time.monotonic()
+        assert converter._http("GET", "https://api.example/a", 5).status_code == 200
+        # 限流期间同一主机的其他请求也等待，其他主机不受影响
+        converter._http("GET", "https://api.example/b", 5)
+        converter._http("GET", "https://other.example/", 5)
+        assert [url for url, _ in sent] == [
+            "https://api.example/a",
+            "https://api.example/a",
+            "https://api.example/b",
+            "https://other.example/",
+        ]
+        assert sent[1][1] - started >= 0.3
+        assert sent[1][1] < sent[2][1]
+
+    def test_convert_many_serves_idle_hosts_first(self):
+        converter = WebToMarkdown()
+        converter.rate_limiter.observe("slow.example", 429, "0.3")
+        started_at = {}
+
+        def fake_convert(url, **kwargs):
+            started_at[url] = time.monotonic()
+            return "# ok"
+
+        with patch.object(converter, "convert", side_effect=fake_convert):
+            records = list(
+                converter.convert_many(
+                    ["https://slow.example/1", "https://idle.example/1"],
+                    max_workers=1,
+                )
+            )
+        assert [r["url"] for r in records] == [
+            "https://idle.example/1",
+            "https://slow.example/1",
+        ]
+        assert (
+            started_at["https://slow.example/1"] - started_at["https://idle.example/1"]
+            > 0.2
+        )
+
+
+@pytest.fixture
+def close_delimited_server():
+    """以连接关闭界定长度的 HTTP/1.0 替身服务器：响应体缓慢流式写出约 6 秒"""
+    import http.server
+
+    stop = threading.Event()
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.0"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.end_headers()  # 没有 Content-Length
+            self.wfile.write(b"<html><body><article><p>start</p>")
+            self.wfile.flush()
+            for _ in range(12):
+                if stop.wait(0.5):
+                    return
+                try:
+                    self.wfile.write(b"<p>more</p>")
+                    self.wfile.flush()
+                except OSError:
+                    return
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/page"
+    stop.set()
+    server.shutdown()
+    server.server_close()
+
+
+class TestHttpTransport:
+    """测试连接池、压缩、DNS 缓存与 HTTP/2 适配器"""
+
+    def test_session_is_created_once_under_concurrency(self):
+        converter = WebToMarkdown()
+        barrier = threading.Barrier(8)
+        sessions = []
+
+        def first_use():
+            barrier.wait()
+            sessions.append(converter.session)
+
+        threads = [threading.Thread(target=first_use) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len({id(session) for session in sessions}) == 1
+        assert converter.session is sessions[0]
+
+    @staticmethod
+    def _gzip_server(body):
+        import gzip
+        import http.server
+
+        payload = gzip.compress(body)
+        seen = []
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                seen.append(self.headers.get("Accept-Encoding"))
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, payload, seen
+
+    def test_trace_shows_connection_reuse_and_wire_bytes(self):
+        body = b"<html><body><article><p>" + b"compressible " * 2000 + b"</p>"
+        server, payload, seen = self._gzip_server(body)
+        url = f"http://localhost:{server.server_address[1]}/page"
+        try:
+            with WebToMarkdown() as converter:
+                traces = []
+                for _ in range(2):
+                    trace = convert.ConversionTrace()
+                    token = convert._current_trace.set(trace)
+                    try:
+                        html, is_pdf = converter._get_with_requests(url)
+                    finally:
+                        convert._current_trace.reset(token)
+                    traces.append(trace.to_dict())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert html == body.decode() and not is_pdf
+        assert "gzip" in seen[0]
+        assert traces[0]["http"] == {"requests": 1, "connections": 1, "reused": 0}
+        assert traces[1]["http"] == {"requests": 1, "connections": 0, "reused": 1}
+        download = [s for s in traces[1]["spans"] if s["name"] == "http.download"]
+        assert download[0]["bytes"] == len(payload) < len(body)
+        assert download[0]["encoding"] == "gzip"
+        names = [s["name"] for s in traces[0]["spans"]]
+        assert "http.dns" in names and "http.connect" in names
+
+    def test_dns_cache_resolves_once_and_forgets_failed_hosts(self):
+        cache = convert._DnsCache()
+        infos = [(None, None, None, "", ("10.0.0.1", 80))] * 2
+        with patch.object(convert.socket, "getaddrinfo", return_value=infos) as gai:
+            assert cache.resolve("example.com", 80) == (["10.0.0.1"], False)
+            assert cache.resolve("example.com", 80) == (["10.0.0.1"], True)
+            assert gai.call_count == 1
+            cache.forget("example.com", 80)
+            cache.resolve("example.com", 80)
+            assert gai.call_count == 2
+
+    def test_convert_many_grows_connection_pool(self):
+        converter = WebToMarkdown()
+        adapter = converter.session.get_adapter("https://example.com")
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 16
+        with patch.object(
+            WebToMarkdown, "_convert_one", side_effect=lambda url, *a, **k: {"url": url}
+        ):
+            list(converter.convert_many(["https://a.com"], max_workers=24))
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 24
+        assert converter.session.get_adapter("http://x.org") is adapter
+
+    def test_http2_adapter_retries_and_decodes_like_urllib3(self):
+        import gzip
+
+        httpx = pytest.importorskip("httpx")
+        from urllib3.util.retry import Retry
+
+        requests_seen = []
+
+        def handler(request):
+            requests_seen.append(request)
+            # 以流的形式返回，与真实连接一致（iter_raw 读取线上字节）
+            if len(requests_seen) == 1:
+                return httpx.Response(503, stream=httpx.ByteStream(b""))
+            return httpx.Response(
+                200,
+                headers={"content-encoding": "gzip"},
+                stream=httpx.ByteStream(gzip.compress(b"# Title")),
+            )
+
+        converter = WebToMarkdown(http2=False)
+        adapter = convert._http2_adapter()(
+            max_retries=Retry(total=1, status_forcelist=[503], backoff_factor=0),
+            client=httpx.Client(transport=httpx.MockTransport(handler)),
+        )
+        converter.session.mount("https://r.jina.ai/", adapter)
+        response = converter._http("GET", "https://r.jina.ai/https://a.com", 5)
+
+        assert response.status_code == 200
+        assert response.text == "# Title"
+        assert len(requests_seen) == 2
+        assert "gzip" in requests_seen[-1].headers["accept-encoding"]
+
+    def test_http2_adapter_streams_and_aborts(self):
+        httpx = pytest.importorskip("httpx")
+        from urllib3.util.retry import Retry
+
+        sent = []
+
+        class Body(httpx.SyncByteStream):
+            def __iter__(self):
+                for chunk in (b"a" * 8, b"b" * 8):
+                    sent.append(chunk)
+                    yield chunk
+
+        adapter = convert._http2_adapter()(
+            max_retries=Retry(total=0),
+            client=httpx.Client(
+                transport=httpx.MockTransport(
+                    lambda request: httpx.Response(200, stream=Body())
+                )
+            ),
+        )
+        converter = WebToMarkdown()
+        assert converter.http2 is False  # 同步引擎默认不启用 HTTP/2
+        converter.session.mount("https://r.jina.ai/", adapter)
+        response = converter.session.get("https://r.jina.ai/x", stream=True)
+        assert sent == []  # 响应体在返回后才读取
+        chunks = response.iter_content(8)
+        assert next(chunks) == b"a" * 8
+        WebToMarkdown._abort_response(response)
+        with pytest.raises(requests.exceptions.RequestException):
+            next(chunks)
+        assert sent == [b"a" * 8]
+
+    def test_abort_interrupts_close_delimited_body(self, close_delimited_server):
+        converter = WebToMarkdown()
+        response = converter.session.get(close_delimited_server, stream=True)
+        assert "content-length" not in response.headers
+        threading.Timer(0.3, WebToMarkdown._abort_response, (response,)).start()
+        started = time.monotonic()
+        body = b""
+        # 连接关闭界定长度时中断表现为提前结束（由调用方的令牌检查判定为取消）
+        with contextlib.suppress(requests.exceptions.RequestException):
+            for chunk in response.iter_content(64 * 1024):
+                body += chunk
+        assert time.monotonic() - started < 2
+        assert body.count(b"more") < 12
+
+
+class TestProcessPdf:
+    """测试 PDF 提取流水线"""
+
+    def test_markdown_with_first_page_title(self):
+        converter = WebToMarkdown()
+        result = converter._process_pdf(_make_pdf(2))
+        assert result.startswith("# Heading 1 Body of page 1\n\n--- Page 1 ---")
+        assert "--- Page 2 ---\n\nHeading 2" in result
+
+    def test_metadata_title_and_path_input(self, tmp_path):
+        converter = WebToMarkdown()
+        path = tmp_path / "paper.pdf"
+        path.write_bytes(_make_pdf(1, title="Paper Title"))
+        assert converter._process_pdf(path).startswith("# Paper Title\n\n")
+        assert converter._process_pdf(path, pure_text=True).startswith("--- Page 1 ---")
+
+    def test_parallel_extraction_matches_sequential(self):
+        pdf = _make_pdf(12)
+        sequential = WebToMarkdown()._process_pdf(pdf)
+        with WebToMarkdown(cpu_workers=2) as converter:
+            converter.PDF_PARALLEL_MIN_PAGES = 4
+            converter.PDF_PAGES_PER_TASK_MIN = 2
+            assert converter._process_pdf(pdf) == sequential
+            pages = list(converter.iter_pdf_pages(pdf))
+        assert [number for number, _ in pages] == list(range(1, 13))
+        assert pages[11][1].startswith("Heading 12")
+
+    def test_pdf_download_is_spooled_to_disk(self):
+        converter = WebToMarkdown()
+        pdf = _make_pdf(1)
+        response = MagicMock(status_code=200)
+        response.headers = {"content-type": "application/pdf"}
+        response.iter_content.return_value = [pdf[:100], pdf[100:]]
+        converter.session.get = MagicMock(return_value=response)
+
+        path, is_pdf = converter._get_with_requests("https://example.com/paper.pdf")
+        try:
+            assert is_pdf
+            assert path.read_bytes() == pdf
+        finally:
+            path.unlink()
+
+
+class TestCpuOffload:
+    """测试 HTML 解析与 PDF 提取的进程池卸载"""
+
+    HTML = (
+        "<html><body><nav>menu</nav><article><h1>Title</h1>"
+        + "<p>Paragraph text.</p>" * 2000
+        + "</article></body></html>"
+    )
+
+    def test_offloaded_results_match_and_are_traced(self, tmp_path):
+        expected = WebToMarkdown()._html_result(self.HTML, False)
+        pdf = _make_pdf(2)
+        path = tmp_path / "paper.pdf"
+        path.write_bytes(pdf)
+        with WebToMarkdown(cpu_workers=2, cpu_offload=True) as converter:
+            trace = convert.ConversionTrace()
+            reset = convert._current_trace.set(trace)
+            try:
+                assert converter._html_result(self.HTML, False) == expected
+            finally:
+                convert._current_trace.reset(reset)
+            assert converter._process_pdf(pdf) == WebToMarkdown()._process_pdf(pdf)
+            assert converter._process_pdf(path, pure_text=True).startswith(
+                "--- Page 1 ---"
+            )
+            assert converter._process_pool is not None
+        parse = [span for span in trace.spans if span["name"] == "html.parse"]
+        assert parse and parse[0]["process"] is True
+        assert parse[0]["chars"] == len(self.HTML)
+
+    def test_broken_pool_is_rebuilt(self):
+        import os
+        from concurrent.futures.process import BrokenProcessPool
+
+        expected = WebToMarkdown()._html_result(self.HTML, False)
+        with WebToMarkdown(cpu_workers=2, cpu_offload=True) as converter:
+            broken = converter._get_process_pool()
+            with pytest.raises(BrokenProcessPool):
+                broken.submit(os._exit, 1).result()  # 模拟子进程崩溃
+            assert converter._html_result(self.HTML, False) == expected
+            assert converter._process_pool is not broken
+            assert converter._html_result(self.HTML, False) == expected
+            assert converter._process_pool is not None
+
+    def test_views_after_close_do_not_recreate_pool(self):
+        with WebToMarkdown(cpu_workers=2, cpu_offload=True) as converter:
+            result = converter._page_result(self.HTML, False, "https://example.com/")
+            assert converter._process_pool is not None
+        assert converter._process_pool is None
+        assert "Paragraph text." in result.text
+        assert converter._process_pool is None
+
+    def test_small_pages_and_default_stay_in_process(self):
+        with WebToMarkdown(cpu_workers=2, cpu_offload=True) as converter:
+            assert converter._html_result("<p>short</p>", False) == "short"
+            assert converter._process_pool is None
+        with WebToMarkdown(cpu_workers=2) as converter:
+            converter._html_result(self.HTML, True)
+            assert converter._process_pool is None
+
+
 class TestTryPlaywright:
     """测试 Playwright 方法"""
 
@@ -329,6 +1977,205 @@ class TestTryPlaywright:
         assert result is None
 
 
+class _FakeBrowser:
+    def __init__(self, launches):
+        launches.append(self)
+        self.closed = False
+
+    def new_context(self):
+        context = MagicMock()
+        context.new_page.return_value = MagicMock()
+        return context
+
+    def is_connected(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_playwright(monkeypatch):
+    """以假的 sync_playwright 替代真实浏览器，记录每次 launch"""
+    launches = []
+    p = MagicMock()
+    p.chromium.launch.side_effect = lambda: _FakeBrowser(launches)
+    manager = MagicMock()
+    manager.__enter__.return_value = p
+    module = MagicMock()
+    module.sync_playwright.return_value = manager
+    monkeypatch.setitem(sys.modules, "playwright", MagicMock())
+    monkeypatch.setitem(sys.modules, "playwright.sync_api", module)
+    return launches
+
+
+class TestBrowserPool:
+    """测试常驻浏览器池"""
+
+    def test_reuses_browser_across_renders(self, fake_playwright):
+        converter = WebToMarkdown(max_browsers=1)
+        token = _CancelToken()
+        for _ in range(3):
+            html = converter.browser_pool.render(
+                "https://example.com", lambda page: "<html></html>", token
+            )
+            assert html == "<html></html>"
+        converter.__exit__(None, None, None)
+        assert len(fake_playwright) == 1
+        assert fake_playwright[0].closed
+
+    def test_recycles_after_max_pages(self, fake_playwright):
+        converter = WebToMarkdown(max_browsers=1, browser_max_pages=2)
+        token = _CancelToken()
+        for i in range(5):
+            converter.browser_pool.render(f"https://example.com/{i}", str, token)
+        converter.__exit__(None, None, None)
+        assert len(fake_playwright) == 3
+        assert all(browser.closed for browser in fake_playwright)
+
+    def test_render_error_propagates(self, fake_playwright):
+        converter = WebToMarkdown(max_browsers=1)
+
+        def broken(page):
+            raise RuntimeError("navigation failed")
+
+        with pytest.raises(RuntimeError, match="navigation failed"):
+            converter.browser_pool.render("https://example.com", broken, _CancelToken())
+        converter.__exit__(None, None, None)
+
+    def test_render_without_deadline_is_bounded(self, fake_playwright):
+        converter = WebToMarkdown(max_browsers=1)
+        converter.TIMEOUT_BROWSER = 0.2
+        release = threading.Event()
+        with patch.object(
+            converter, "_render_page", lambda page, url, token: release.wait(5)
+        ):
+            started = time.monotonic()
+            with pytest.raises(TimeoutError, match="浏览器渲染超时"):
+                converter._get_with_playwright("https://hung.example/")
+        assert time.monotonic() - started < 1
+        release.set()
+        converter.__exit__(None, None, None)
+
+    def test_rss_counts_only_own_driver_tree(self):
+        import types
+
+        def proc(pid, cmdline, rss_mb, children=()):
+            process = MagicMock()
+            process.pid = pid
+            process.cmdline.return_value = cmdline
+            process.memory_info.return_value.rss = rss_mb * 1024 * 1024
+            process.children.return_value = list(children)
+            return process
+
+        driver = proc(11, ["node", "cli.js", "run-driver"], 50, [proc(12, [], 300)])
+        other = proc(21, ["node", "cli.js", "run-driver"], 50, [proc(22, [], 700)])
+        worker = proc(
+            31, ["python", "-c", "from multiprocessing.spawn import main"], 900
+        )
+        processes = {11: driver, 21: other}
+        children = [worker, other]
+        psutil = types.SimpleNamespace(
+            Error=LookupError,
+            Process=lambda pid=None: (
+                proc(1, ["python"], 0, children) if pid is None else processes[pid]
+            ),
+        )
+        pool = convert._BrowserPool(max_memory_mb=500)
+        with patch.dict(sys.modules, {"psutil": psutil}):
+            known = pool._driver_pids()
+            assert known == {21}
+            children.append(driver)  # 当前工作线程启动了自己的驱动
+            assert pool._own_driver(known) == 11
+            # 每个工作线程只统计自己的驱动进程树，不计入其他浏览器
+            assert pool._browser_rss_mb(11) == 350
+            assert not pool._should_recycle(1, 11)
+            assert pool._should_recycle(1, 21)
+            assert pool._browser_rss_mb(None) is None
+            assert pool._browser_rss_mb(99) is None
+            assert pool._own_driver({11, 21}) is None
+
+
+class TestRenderPage:
+    """测试快速渲染模式：资源拦截与智能等待"""
+
+    @pytest.fixture
+    def playwright_errors(self, monkeypatch):
+        module = MagicMock()
+        module.Error = type("Error", (Exception,), {})
+        module.TimeoutError = type("TimeoutError", (module.Error,), {})
+        monkeypatch.setitem(sys.modules, "playwright", MagicMock())
+        monkeypatch.setitem(sys.modules, "playwright.sync_api", module)
+        return module
+
+    def test_blocks_heavy_resources_and_trackers(self):
+        assert convert._is_blocked_request("image", "https://example.com/a.png")
+        assert convert._is_blocked_request(
+            "script", "https://www.google-analytics.com/analytics.js"
+        )
+        assert convert._is_blocked_request("script", "https://hm.baidu.com/hm.js")
+        assert not convert._is_blocked_request("script", "https://baidu.com/app.js")
+        assert not convert._is_blocked_request("document", "https://example.com/")
+
+    def test_settle_tracker(self):
+        tracker = convert._SettleTracker(quiet=0.5, fallback_quiet=2.0)
+        assert not tracker.ready([False, 10, 100], now=0)
+        assert not tracker.ready([True, 20, 500], now=0.25)  # DOM 仍在变化
+        assert not tracker.ready([True, 20, 500], now=0.5)
+        assert tracker.ready([True, 20, 500], now=0.75)
+
+        tracker = convert._SettleTracker(quiet=0.5, fallback_quiet=2.0)
+        tracker.ready([False, 20, 500], now=0)
+        assert not tracker.ready([False, 20, 500], now=1.0)
+        assert tracker.ready([False, 20, 500], now=2.0)
+
+    def test_render_options_overrides(self):
+        converter = WebToMarkdown(
+            render_overrides={
+                "example.com": {"mode": "full"},
+                "docs.example.com": {"mode": "fast", "wait_for": ".doc-body"},
+            }
+        )
+        assert converter._render_options("https://other.org/") == {
+            "mode": "fast",
+            "wait_for": None,
+        }
+        assert converter._render_options("https://www.example.com/")["mode"] == "full"
+        assert converter._render_options("https://docs.example.com/x") == {
+            "mode": "fast",
+            "wait_for": ".doc-body",
+        }
+
+    def test_fast_mode_stops_when_content_is_stable(self, playwright_errors):
+        converter = WebToMarkdown()
+        converter.RENDER_SETTLE_QUIET = 0
+        page = MagicMock()
+        page.evaluate.side_effect = [
+            playwright_errors.Error("Execution context was destroyed"),
+            [False, 5, 10],
+            [True, 40, 900],
+            [True, 40, 900],
+        ]
+        page.content.return_value = "<html></html>"
+
+        assert converter._render_page(page, "https://example.com", _CancelToken())
+        page.route.assert_called_once()
+        assert page.evaluate.call_args.args[1] == convert._DEFAULT_PROFILE.content_css
+        assert page.evaluate.call_count == 4
+        page.wait_for_load_state.assert_not_called()
+
+    def test_full_mode_waits_for_network_idle(self, playwright_errors):
+        converter = WebToMarkdown(render_mode="full")
+        page = MagicMock()
+        page.content.return_value = "<html></html>"
+
+        converter._render_page(page, "https://example.com", _CancelToken())
+        page.route.assert_not_called()
+        page.evaluate.assert_not_called()
+        page.wait_for_load_state.assert_called_once()
+        assert page.wait_for_timeout.call_count == 8
+
+
 class TestWechatRouting:
     """测试微信公众号优先级路由"""
 
@@ -364,3 +2211,452 @@ class TestWechatRouting:
         mock_playwright.assert_called_once()
         mock_python.assert_called_once()
         assert result == "# Python fallback"
+
+
+class TestWespyFetcher:
+    """测试 WeSpy 复用 fetcher、经暂存目录读回 Markdown"""
+
+    URL = "https://mp.weixin.qq.com/s/abc"
+
+    @classmethod
+    def _fake_wespy(cls, body="正文"):
+        """模拟 WeSpy 0.2：fetch_article 按 save_markdown 写文件，返回文章信息"""
+        import types
+
+        calls = []
+
+        class ArticleFetcher:
+            instances = 0
+
+            def __init__(self):
+                ArticleFetcher.instances += 1
+                time.sleep(0.02)
+                self.session = requests.Session()
+                self.session.headers["User-Agent"] = "Browser"
+
+            def fetch_article(
+                self, url, output_dir, save_html, save_json, save_markdown
+            ):
+                calls.append((output_dir, save_markdown))
+                Path(output_dir).mkdir(parents=True, exist_ok=True)
+                if save_markdown:
+                    Path(output_dir, "标题_1.md").write_text(
+                        "# 标题\n\n**作者**: 作者\n**发布时间**: 2026-01-01\n"
+                        f"**原文链接**: {url}\n\n---\n\n{body}",
+                        "utf-8",
+                    )
+                return {"title": "标题", "url": url}
+
+        return types.SimpleNamespace(ArticleFetcher=ArticleFetcher), calls
+
+    def test_reuses_fetcher_and_reads_markdown_from_scratch_dir(self):
+        wespy, calls = self._fake_wespy()
+        with patch.dict(sys.modules, {"wespy": wespy}):
+            with WebToMarkdown() as converter:
+                first = converter._try_wespy(self.URL, False)
+                second = converter._try_wespy(self.URL, True)
+                fetcher = converter.wespy_fetcher
+                scratch = converter._scratch_root
+                assert Path(calls[0][0]).parent == scratch
+                assert not list(scratch.rglob("*.md"))
+            assert not scratch.exists()
+
+        assert wespy.ArticleFetcher.instances == 1
+        assert first.startswith("# 标题\n\n**作者**: 作者\n") and first.endswith("正文")
+        assert "**" not in second and second.endswith("正文")
+        assert [save for _, save in calls] == [True, True]
+        # WeSpy 的请求经转换器发送（限速、时间预算），保留其浏览器请求头
+        assert fetcher.session.headers["User-Agent"] == "Browser"
+        with patch.object(WebToMarkdown, "_send", return_value="ok") as send:
+            assert fetcher.session.get(self.URL, timeout=30) == "ok"
+        assert send.call_args.args[:4] == ("GET", self.URL, 30, "http.request")
+
+    def test_fetcher_is_created_once_under_concurrency(self):
+        wespy, _ = self._fake_wespy()
+        with patch.dict(sys.modules, {"wespy": wespy}), WebToMarkdown() as converter:
+            threads = [
+                threading.Thread(target=lambda: converter.wespy_fetcher)
+                for _ in range(6)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert wespy.ArticleFetcher.instances == 1
+
+    def test_empty_article_falls_through(self):
+        wespy, _ = self._fake_wespy(body="")
+        with patch.dict(sys.modules, {"wespy": wespy}), WebToMarkdown() as converter:
+            assert converter._try_wespy(self.URL, False) is None
+            assert not list(converter._scratch_root.rglob("*.md"))
+
+
+class TestAsyncConvert:
+    """测试 asyncio 原生转换器"""
+
+    def test_race_cancels_losers(self):
+        import asyncio
+
+        converter = convert.AsyncWebToMarkdown()
+        cancelled = []
+
+        async def fast(url, pure_text):
+            return "# Fast"
+
+        async def slow(url, pure_text):
+            try:
+                await asyncio.sleep(3)
+            except asyncio.CancelledError:
+                cancelled.append(url)
+                raise
+            return "# Slow"
+
+        async def run():
+            return await converter._arace(
+                [("fast", fast, ("a", False)), ("slow", slow, ("b", False))]
+            )
+
+        started = time.monotonic()
+        assert asyncio.run(run()) == ("fast", "# Fast")
+        assert time.monotonic() - started < 1
+        # 返回前已等待失败方完成取消
+        assert cancelled == ["b"]
+
+    def test_aconvert_routes_and_caches(self, tmp_path):
+        import asyncio
+
+        converter = convert.AsyncWebToMarkdown(
+            cache=convert.ResultCache(tmp_path / "cache.db")
+        )
+        calls = []
+
+        async def jina(self, url, pure_text):
+            calls.append(url)
+            return "# Jina"
+
+        async def failing(self, url, pure_text):
+            return None
+
+        async def run():
+            async with converter:
+                first = await converter.aconvert("https://arxiv.org/abs/2601.04500v1")
+                second = await converter.aconvert("https://arxiv.org/abs/2601.04500v1")
+            return first, second
+
+        with (
+            patch.object(convert.AsyncWebToMarkdown, "_atry_jina_reader", jina),
+            patch.object(convert.AsyncWebToMarkdown, "_apython_convert", failing),
+            patch.object(convert.AsyncWebToMarkdown, "_atry_playwright", failing),
+        ):
+            assert asyncio.run(run()) == ("# Jina", "# Jina")
+        assert calls == ["https://arxiv.org/html/2601.04500v1"]
+
+    def test_cache_access_stays_off_the_event_loop(self, tmp_path):
+        import asyncio
+
+        cache = convert.ResultCache(tmp_path / "cache.db")
+        converter = convert.AsyncWebToMarkdown(cache=cache)
+        loop_thread = threading.get_ident()
+        blocking = []
+
+        def watch(method):
+            def wrapper(*args, **kwargs):
+                blocking.append((method.__name__, threading.get_ident() == loop_thread))
+                return method(*args, **kwargs)
+
+            return wrapper
+
+        async def fetch(self, url, spa_probe=False):
+            return TestRenderDecision.RICH, False
+
+        async def run():
+            async with converter:
+                return await converter.aconvert(
+                    "https://static.example/a", use_python=True
+                )
+
+        with (
+            patch.object(cache, "get", watch(cache.get)),
+            patch.object(cache, "set", watch(cache.set)),
+            patch.object(convert.AsyncWebToMarkdown, "_aget_with_requests", fetch),
+        ):
+            result = asyncio.run(run())
+        assert "正文内容" in result
+        assert {name for name, _ in blocking} == {"get", "set"}
+        assert not any(on_loop for _, on_loop in blocking)
+
+    def test_download_stops_at_deadline(self):
+        import asyncio
+
+        httpx = pytest.importorskip("httpx")
+        sent = []
+
+        class Body(httpx.AsyncByteStream):
+            async def __aiter__(self):
+                yield b"<html><body><p>start</p>"
+                for _ in range(30):
+                    await asyncio.sleep(0.1)
+                    sent.append(1)
+                    yield b"<p>more</p>" * 8192  # 每次一个完整的下载块
+
+        def handler(request):
+            return httpx.Response(
+                200, headers={"content-type": "text/html"}, stream=Body()
+            )
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with convert.AsyncWebToMarkdown(client=client) as converter:
+                reset = _current_token.set(
+                    _CancelToken(deadline=time.monotonic() + 0.3)
+                )
+                try:
+                    await converter._aget_with_requests("https://slow.example/")
+                finally:
+                    _current_token.reset(reset)
+            await client.aclose()
+
+        with pytest.raises(convert._Cancelled):
+            asyncio.run(run())
+        assert len(sent) < 10
+
+    def test_http_backends_with_pooled_client(self):
+        import asyncio
+
+        httpx = pytest.importorskip("httpx")
+        requested = []
+
+        def handler(request):
+            url = str(request.url)
+            requested.append((request.method, url))
+            if url.startswith("https://r.jinaai.cn/"):
+                return httpx.Response(503)
+            if url.startswith("https://r.jina.ai/"):
+                return httpx.Response(200, text="# Title\n\n\n\n" + "Content " * 20)
+            if request.method == "HEAD":
+                return httpx.Response(200, headers={"content-type": "text/html"})
+            return httpx.Response(
+                200,
+                headers={"content-type": "text/html; charset=utf-8"},
+                text="<html><body><article><h2>Hi</h2><p>Body</p></article></body></html>",
+            )
+
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            async with convert.AsyncWebToMarkdown(client=client) as converter:
+                converter.RETRY_TOTAL = 0
+                jina = await converter._atry_jina_reader("https://example.com", False)
+                python = await converter._apython_convert("https://example.com", False)
+            await client.aclose()
+            return jina, python
+
+        jina, python = asyncio.run(run())
+        assert jina.startswith("# Title\n\nContent")
+        assert "\n\n\n" not in jina
+        assert python == "## Hi\n\nBody"
+        assert [method for method, _ in requested] == ["GET", "GET", "GET"]
+
+
+class TestDaemon:
+    """测试常驻守护进程与命令行自动复用"""
+
+    @pytest.fixture
+    def daemon(self, tmp_path):
+        path = str(tmp_path / "d.sock")
+        server = convert._UnixHTTPServer(path, convert._DaemonHandler)
+        server.converter = WebToMarkdown()
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield path
+        server.shutdown()
+        server.server_close()
+
+    def test_parse_address(self):
+        assert convert._parse_address("127.0.0.1:8765") == (
+            "tcp",
+            ("127.0.0.1", 8765),
+        )
+        assert convert._parse_address(":8765") == ("tcp", ("127.0.0.1", 8765))
+        assert convert._parse_address("/tmp/d.sock") == ("unix", "/tmp/d.sock")
+
+    def test_refuses_non_loopback_listen(self):
+        args = convert._serve_parser().parse_args(["--listen", "0.0.0.0:8765"])
+        with patch.object(convert.http.server, "ThreadingHTTPServer") as server:
+            assert convert._serve(args) == 1
+        server.assert_not_called()
+        assert convert._is_loopback("127.0.0.1") and convert._is_loopback("::1")
+        assert convert._is_loopback("localhost")
+        assert not convert._is_loopback("192.168.1.10")
+
+    def test_not_running_returns_none(self, tmp_path):
+        assert convert._request_daemon(str(tmp_path / "none.sock"), {}) is None
+
+    def test_convert_and_health(self, daemon):
+        with patch.object(WebToMarkdown, "convert", return_value="# ok") as mock:
+            record = convert._request_daemon(
+                daemon, {"url": "https://example.com", "pure_text": True}
+            )
+        assert record["ok"] and record["content"] == "# ok"
+        assert mock.call_args.kwargs["pure_text"] is True
+        status, health = convert._daemon_request(daemon, "GET", "/health")
+        assert status == 200 and health["ok"]
+
+        with pytest.raises(RuntimeError):
+            convert._request_daemon(daemon, {"pure_text": True})
+
+    def test_cli_uses_running_daemon(self, daemon, monkeypatch, capsys):
+        monkeypatch.setattr(
+            sys, "argv", ["convert.py", "https://example.com", "--daemon", daemon]
+        )
+        with (
+            patch.object(WebToMarkdown, "convert", return_value="# from daemon"),
+            patch.object(convert, "_converter_from_args") as in_process,
+        ):
+            convert.main()
+        assert capsys.readouterr().out.strip() == "# from daemon"
+        in_process.assert_not_called()
+
+
+class TestConversionTrace:
+    """测试分阶段耗时追踪"""
+
+    def test_race_records_backends_and_winner(self):
+        hooked = []
+        converter = WebToMarkdown(trace_hook=hooked.append)
+        trace = convert.ConversionTrace()
+        with (
+            patch.object(WebToMarkdown, "_try_jina_reader", return_value="# Jina"),
+            patch.object(WebToMarkdown, "_python_convert", return_value=None),
+            patch.object(WebToMarkdown, "_try_playwright", return_value=None),
+            patch.object(convert.random, "random", return_value=0.0),
+        ):
+            converter.convert("https://example.com", trace=trace)
+
+        assert hooked == [trace]
+        data = trace.to_dict()
+        assert data["url"] == "https://example.com"
+        assert data["backend"] == "jina"
+        backends = {s["backend"] for s in data["spans"] if s["name"] == "backend"}
+        assert "jina" in backends
+
+    def test_html_stages(self):
+        converter = WebToMarkdown()
+        trace = convert.ConversionTrace()
+        token = convert._current_trace.set(trace)
+        try:
+            converter._to_markdown(
+                "<html><body><article><p>Hi</p></article></body></html>"
+            )
+        finally:
+            convert._current_trace.reset(token)
+        names = [span["name"] for span in trace.to_dict()["spans"]]
+        assert names == ["html.parse", "html.clean", "html.markdownify"]
+
+    def test_bytes_skips_unknown_sizes(self):
+        # _wire_bytes 无法获取线上字节数时记录 None
+        trace = convert.ConversionTrace()
+        trace.spans.append({"name": "http.download", "bytes": 1024})
+        trace.spans.append({"name": "http.download", "bytes": None})
+        assert trace.bytes == 1024
+
+    def test_disabled_by_default(self):
+        converter = WebToMarkdown()
+        with patch.object(WebToMarkdown, "_parallel_convert", return_value="# ok"):
+            assert converter.convert("https://example.com") == "# ok"
+        assert convert._current_trace.get() is None
+
+
+class TestStartup:
+    """测试启动路径不导入重量级依赖"""
+
+    HEAVY = ("requests", "urllib3", "bs4", "markdownify", "multiprocessing", "asyncio")
+
+    def _loaded_after(self, code):
+        import subprocess
+
+        script = (
+            "import sys\n"
+            f"{code}\n"
+            f"heavy = [m for m in {self.HEAVY!r} if m in sys.modules]\n"
+            "print(heavy)"
+        )
+        completed = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=Path(convert.__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return completed.stdout.strip().splitlines()
+
+    def test_import_is_light(self):
+        assert self._loaded_after("import convert") == ["[]"]
+
+    def test_cache_hit_skips_http_and_html_stacks(self, tmp_path):
+        path = tmp_path / "c.sqlite3"
+        converter = WebToMarkdown(cache=convert.ResultCache(path))
+        key = converter._cache_key("https://example.com/a", False, False)
+        converter.cache.set(key, "# Cached")
+        code = (
+            "import convert\n"
+            f"cache = convert.ResultCache({str(path)!r})\n"
+            "with convert.WebToMarkdown(cache=cache) as c:\n"
+            "    print(c.convert('https://example.com/a'))"
+        )
+        assert self._loaded_after(code) == ["# Cached", "[]"]
+
+
+class TestBenchmarks:
+    """测试离线基准测试工具（替身服务器、用例运行与基线比较）"""
+
+    @pytest.fixture(autouse=True)
+    def bench(self, monkeypatch):
+        monkeypatch.syspath_prepend(str(Path(__file__).parent.parent / "benchmarks"))
+        import bench_convert
+
+        return bench_convert
+
+    def test_parallel_convert_against_stub_server(self, bench):
+        from stub_server import StubServer
+
+        with (
+            StubServer(failure_rate={"firecrawl": 1.0}) as server,
+            bench._stub_converter(server) as converter,
+        ):
+            result = converter._parallel_convert(
+                f"{server.url}/site/blog-0.html", False
+            )
+        assert result.startswith("# ")
+        assert "\n\n\n" not in result
+        # 加大的监听队列只作用于替身服务器自己的子类
+        import http.server
+
+        import stub_server
+
+        assert stub_server._Server.request_queue_size == 256
+        assert http.server.ThreadingHTTPServer.request_queue_size == 5
+
+    def test_run_case_reports_metrics(self, bench):
+        metrics = bench.run_case("to_plain_text[blog]", quick=True)
+        assert metrics["iterations"] >= 2
+        assert metrics["p95_ms"] >= metrics["p50_ms"] > 0
+        assert metrics["peak_rss_mb"] > 0
+        assert metrics["child_rss_mb"] >= 0
+
+    def test_import_time_parsing(self, bench):
+        log = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   argparse\n"
+            "import time:     40000 |      98000 | convert\n"
+        )
+        assert bench._import_time(log, "convert") == 0.098
+        with pytest.raises(RuntimeError):
+            bench._import_time(log, "requests")
+
+    def test_compare_flags_regressions(self, bench):
+        baseline = {"x": {"p50_ms": 10.0, "p95_ms": 20.0, "peak_rss_mb": 50.0}}
+        slower = [{"case": "x", "p50_ms": 20.0, "p95_ms": 21.0, "peak_rss_mb": 52.0}]
+        assert bench.compare(slower, baseline, 0.3) == [
+            "x p50_ms: 10.0 -> 20.0 (+100%)"
+        ]
+        assert bench.compare(slower, baseline, 1.5) == []